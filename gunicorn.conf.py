@@ -0,0 +1,21 @@
+# gunicorn.conf.py -- `gunicorn -c gunicorn.conf.py`
+# WEB_MODE=wsgi (default): sync workers on stock_trades.wsgi
+# WEB_MODE=asgi: uvicorn workers on stock_trades.asgi, so the async APIs (api/async/...) run on the event loop
+import multiprocessing
+import os
+
+mode = os.environ.get('WEB_MODE', 'wsgi').lower()
+if mode not in ('wsgi', 'asgi'):
+    raise ValueError(f"WEB_MODE must be wsgi or asgi, not {mode!r}")
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
+accesslog = '-'
+
+if mode == 'asgi':
+    wsgi_app = 'stock_trades.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'stock_trades.wsgi:application'
+    threads = int(os.environ.get('GUNICORN_THREADS', '1'))
@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
+    'trades.middleware.RequestTimingMiddleware',  # after whitenoise: static files are not timed
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -94,6 +95,12 @@ DATABASES = {
     "CONN_MAX_AGE": 600,
   }
 }
+# DATABASE_URL overrides it, e.g. sqlite:///db.sqlite3 for local runs and `manage.py bench`
+if os.environ.get('DATABASE_URL'):
+    import dj_database_url
+    DATABASES['default'] = dj_database_url.parse(os.environ['DATABASE_URL'], conn_max_age=600)
+# tx_trade_user's INCLUDE columns make it a covering index on Postgres; SQLite builds it as a plain index
+SILENCED_SYSTEM_CHECKS = ['models.W040']
 
 
 
@@ -139,7 +146,69 @@ STATIC_ROOT = BASE_DIR / "staticfiles"  # where collectstatic writes [2]
 STATICFILES_DIRS = [BASE_DIR / "static"]  # if you keep custom assets here [2]
 STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 
+# Uploaded files (queued imports); the worker must see the same directory
+MEDIA_ROOT = Path(os.environ.get('MEDIA_ROOT', BASE_DIR / 'media'))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Plan uploads: rows per INSERT statement
+TRADES_IMPORT_BATCH_SIZE = int(os.environ.get('TRADES_IMPORT_BATCH_SIZE', '1000'))
+# Streaming uploads: rows read and committed per chunk
+TRADES_IMPORT_CHUNK_SIZE = int(os.environ.get('TRADES_IMPORT_CHUNK_SIZE', '5000'))
+# Background uploads (manage.py import_worker)
+TRADES_IMPORT_WORKERS = int(os.environ.get('TRADES_IMPORT_WORKERS', '2'))
+TRADES_IMPORT_POLL_SECONDS = float(os.environ.get('TRADES_IMPORT_POLL_SECONDS', '2'))
+TRADES_IMPORT_STALE_MINUTES = int(os.environ.get('TRADES_IMPORT_STALE_MINUTES', '30'))
+
+# Cache for the plan/news responses and per-user stats (trades/cache.py). Entries are keyed by
+# stamps read from the database, so the per-process local-memory default stays correct; set
+# REDIS_URL in production so web processes share the stored entries.
+if os.environ.get('REDIS_URL'):
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+                          'LOCATION': os.environ['REDIS_URL']}}
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+# Responses that include today expire after this many seconds even without a write
+TRADES_CACHE_TODAY_SECONDS = int(os.environ.get('TRADES_CACHE_TODAY_SECONDS', '300'))
+# Browser/proxy max-age for past-only ranges (they still revalidate with ETag afterwards)
+TRADES_CACHE_PAST_MAX_AGE = int(os.environ.get('TRADES_CACHE_PAST_MAX_AGE', '3600'))
+# Memoized per-user analytics (AI accuracy); writes invalidate earlier, this caps idle entries
+TRADES_STATS_CACHE_SECONDS = int(os.environ.get('TRADES_STATS_CACHE_SECONDS', '86400'))
+# Default output directory of manage.py export_parquet
+TRADES_EXPORT_DIR = Path(os.environ.get('TRADES_EXPORT_DIR', BASE_DIR / 'exports'))
+# Incremental exports re-read this much before the watermark for writes that committed late
+TRADES_EXPORT_LAG_SECONDS = int(os.environ.get('TRADES_EXPORT_LAG_SECONDS', '600'))
+# TradeTransaction keeps this many days of fills; `manage.py archive_transactions` moves older
+# ones to TradeTransactionArchive (still readable through the history view)
+TRADES_HOT_DAYS = int(os.environ.get('TRADES_HOT_DAYS', '90'))
+# Request instrumentation (trades/middleware.py)
+TRADES_SLOW_QUERY_MS = float(os.environ.get('TRADES_SLOW_QUERY_MS', '200'))
+# Log a statement run this many times in one request (likely an N+1 loop)
+TRADES_DUPLICATE_QUERY_MIN = int(os.environ.get('TRADES_DUPLICATE_QUERY_MIN', '5'))
+# Requests at least this slow are logged on trades.requests at WARNING (the rest at INFO)
+TRADES_SLOW_REQUEST_MS = float(os.environ.get('TRADES_SLOW_REQUEST_MS', '1000'))
+# Requests kept per process for Admin -> Request timings
+TRADES_REQUEST_LOG_SIZE = int(os.environ.get('TRADES_REQUEST_LOG_SIZE', '5000'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'plain': {'format': '%(asctime)s %(levelname)s %(name)s %(message)s'},
+    },
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler', 'formatter': 'plain'},
+    },
+    'root': {'handlers': ['console'], 'level': os.environ.get('LOG_LEVEL', 'WARNING')},
+    'loggers': {
+        # one JSON line per request: slow ones by default, TRADES_REQUEST_LOG_LEVEL=INFO for all
+        'trades.requests': {'level': os.environ.get('TRADES_REQUEST_LOG_LEVEL', 'WARNING')},
+        'trades.sql': {'level': 'WARNING'},
+    },
+}
+# Async APIs (api/async/...): concurrent requests per user and worker, and how long extra ones wait before a 429
+TRADES_ASYNC_USER_CONCURRENCY = int(os.environ.get('TRADES_ASYNC_USER_CONCURRENCY', '4'))
+TRADES_ASYNC_QUEUE_SECONDS = float(os.environ.get('TRADES_ASYNC_QUEUE_SECONDS', '5'))
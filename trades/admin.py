@@ -1,12 +1,10 @@
 # trades/admin.py
 from django.contrib import admin
 from django.db.models import Sum, Count, Case, When, F, Value, DecimalField, Q
-from django.db.models.functions import TruncDay, TruncWeek, TruncMonth, TruncYear
 from django.core.serializers.json import DjangoJSONEncoder
 from django.utils import timezone
 import json
 from django.utils.safestring import mark_safe
-import requests
 from django.contrib import admin
 from django.db.models import Sum, Count, Case, When, F, Value, DecimalField
 from django.db.models.functions import TruncDate
@@ -16,33 +14,36 @@ from decimal import Decimal, ROUND_HALF_UP
 from django.urls import reverse
 from decimal import Decimal
 from django.db import transaction
-from django.urls import reverse
-import requests
 from django.contrib import admin
 from django.urls import path
+from django.utils.http import urlencode
 from django.template.response import TemplateResponse
 from django.views import View
 from django.utils import timezone
-from django.db.models import F, ExpressionWrapper, DecimalField
+from django.db.models import F, ExpressionWrapper, DecimalField, FilteredRelation
 from datetime import datetime, time, timedelta
 from django.shortcuts import redirect
 from django.contrib import messages
 from django.forms import modelformset_factory
 
-from .models import TradeMaster, TradeTransaction, TradeProfitLoss, AccountSummary
+from .models import (
+    TradeMaster, TradeTransaction, TradeProfitLoss, AccountSummary, ImportJob, TradeDailyRollup, fills_model,
+)
+from .analytics import PERIODS, accuracy_stats, dashboard_summary, parse_groups
+from .importer import check_upload_name
+from .middleware import slowest_endpoints
+from .search import search_plans
+from .news import NewsConflict, apply_news_edits
+from .jobs import enqueue
+from . import ledger
 from .forms import (
-    TradeProfitLossForm,
-    TradeNewsFormSet,
+    TradeResultEntryFormSet,
     TradeTransactionFormSet,
     TradeTransactionForm
 )
 from django.contrib import messages
 
 
-# Formset for the P/L page
-TradeProfitLossFormSet = modelformset_factory(
-    TradeProfitLoss, form=TradeProfitLossForm, extra=0, can_delete=False
-)
 # ---------------------------------------------------------------------------
 
 
@@ -50,42 +51,34 @@ TradeProfitLossFormSet = modelformset_factory(
 class CustomUploadView(View):
     template_name = 'admin/trades/upload.html'
 
+    def _ctx(self, request):
+        jobs = ImportJob.objects.filter(created_by=request.user).order_by('-created_at')[:10]
+        return {'jobs': jobs}  # recent uploads with progress
+
     def get(self, request):
-        return TemplateResponse(request, self.template_name, {})
+        return TemplateResponse(request, self.template_name, self._ctx(request))
 
     def post(self, request):
         f = request.FILES.get('file')
         if not f:
             messages.error(request, "No file provided.")  # show error banner [21]
-            return TemplateResponse(request, self.template_name, {})
-
-        # Build absolute URL to DRF endpoint
-        api_url = request.build_absolute_uri(reverse('excel_upload_api'))  # stable internal URL [15][9]
+            return TemplateResponse(request, self.template_name, self._ctx(request))
 
         try:
-            files = {'file': (f.name, f.read(), f.content_type or 'text/csv')}  # multipart payload [1][13]
-            resp = requests.post(api_url, files=files, timeout=30)  # call ExcelUploadAPIView [13]
+            check_upload_name(f.name)
+            job = enqueue(f, request.user)  # parsed by manage.py import_worker, not this request
         except Exception as e:
-            messages.error(request, f"Upload failed: {e}")  # network or other error [21]
-            return TemplateResponse(request, self.template_name, {})
-
-        # Surface API result
-        try:
-            data = resp.json()
-        except Exception:
-            data = {'error': resp.text[:300]}
-
-        if resp.ok:
-            messages.success(request, data.get('success', 'Data uploaded successfully.'))  # success banner [21]
-        else:
-            messages.error(request, data.get('error', f"API error {resp.status_code}"))  # error banner [21]
+            messages.error(request, f"Upload failed: {e}")
+            return TemplateResponse(request, self.template_name, self._ctx(request))
 
-        return TemplateResponse(request, self.template_name, {})
+        messages.success(request, f"Upload queued as job #{job.pk}. Progress is shown below.")
+        return redirect(request.path)
 
 # ---------------------------------------------------------------------------
 
 class TradeMasterPlanView(View):
     template_name = 'admin/trades/plan.html'
+    RESULT_FIELDS = ('profit_or_loss', 'profit_amount', 'loss_amount')
 
     def _dates(self, request):
         fmt = '%Y-%m-%d'
@@ -96,72 +89,67 @@ class TradeMasterPlanView(View):
         end = datetime.strptime(e, fmt).date() if e else today
         return start, end  # parse once per request [18]
 
-    def _trades(self, start, end):
+    def _trades(self, start, end, user):
+        # the user's result rides along via LEFT JOIN; no TradeProfitLoss row is needed to render a plan
+        mine = FilteredRelation('pls', condition=Q(pls__created_by=user))
         return (
             TradeMaster.objects
             .filter(created_at__gte=start, created_at__lte=end)
+            .annotate(mine=mine, **{f'pl_{f}': F(f'mine__{f}') for f in self.RESULT_FIELDS})
             .order_by('stock_name')
         )  # date-filtered base trades [18]
 
-    def _ensure_user_tpl(self, trades, user):
-        have = set(
-            TradeProfitLoss.objects
-            .filter(trade__in=trades, created_by=user)
-            .values_list('trade_id', flat=True)
-        )
-        missing = [
-            TradeProfitLoss(trade=t, created_by=user, updated_by=user)
-            for t in trades if t.id not in have
-        ]
-        if missing:
-            TradeProfitLoss.objects.bulk_create(missing)  # seed per-user rows [18]
-
-    def _tpl_queryset(self, trades, user):
-        return (
-            TradeProfitLoss.objects
-            .select_related('trade')
-            .filter(trade__in=trades, created_by=user)
-            .annotate(
-                risk_per_share=ExpressionWrapper(
-                    F('trade__option_buy_price') - F('trade__stop_loss_price'),
-                    output_field=DecimalField(max_digits=12, decimal_places=2),
-                ),
-                qty=ExpressionWrapper(
-                    F('trade__capital_required') / F('trade__option_buy_price'),
-                    output_field=DecimalField(max_digits=12, decimal_places=2),
-                ),
-            )
-            .order_by('trade__stock_name')
-        )  # compute risk/qty via F and ExpressionWrapper [18]
+    def _formset(self, trades, data=None):
+        initial = [{'trade_id': t.id, **{f: getattr(t, f'pl_{f}') for f in self.RESULT_FIELDS}} for t in trades]
+        return TradeResultEntryFormSet(data, initial=initial, prefix='r')
 
     def get(self, request):
         start, end = self._dates(request)
-        trades = list(self._trades(start, end))
-        self._ensure_user_tpl(trades, request.user)
-        qs_tpl = self._tpl_queryset(trades, request.user)
-        formset = TradeProfitLossFormSet(queryset=qs_tpl, prefix='r')
+        trades = list(self._trades(start, end, request.user))
+        formset = self._formset(trades)
         ctx = {**admin.site.each_context(request), 'rows': trades, 'formset': formset, 'start': start, 'end': end}
         return TemplateResponse(request, self.template_name, ctx)
 
     def post(self, request):
         start, end = self._dates(request)
-        trades = list(self._trades(start, end))
-        qs_tpl = self._tpl_queryset(trades, request.user)
-        formset = TradeProfitLossFormSet(request.POST, queryset=qs_tpl, prefix='r')
+        trades = list(self._trades(start, end, request.user))
+        formset = self._formset(trades, request.POST)
         if formset.is_valid():
-            objs = formset.save(commit=False)
-            for obj in objs:
-                obj.updated_by = request.user
-                obj.save()
+            in_range = {t.id for t in trades}
+            changed = [f for f in formset if f.has_changed() and f.cleaned_data['trade_id'] in in_range]
+            self._save_changed(changed, request.user)
             messages.success(request, 'Saved.')
             return redirect(f"{request.path}?start={start}&end={end}")
         ctx = {**admin.site.each_context(request), 'rows': trades, 'formset': formset, 'start': start, 'end': end}
         return TemplateResponse(request, self.template_name, ctx)
 
+    @transaction.atomic
+    def _save_changed(self, changed, user):
+        # the rows that exist are updated in one statement; the first result for a plan creates its row
+        now = timezone.now()
+        ids = [f.cleaned_data['trade_id'] for f in changed]
+        existing = {p.trade_id: p for p in TradeProfitLoss.objects.filter(created_by=user, trade_id__in=ids)}
+        to_update, to_create = [], []
+        for form in changed:
+            tid = form.cleaned_data['trade_id']
+            obj = existing.get(tid) or TradeProfitLoss(trade_id=tid, created_by=user)
+            for f in self.RESULT_FIELDS:
+                setattr(obj, f, form.cleaned_data[f])
+            obj.updated_by = user
+            obj.updated_at = now  # bulk_update skips auto_now
+            (to_update if obj.pk else to_create).append(obj)
+        TradeProfitLoss.objects.bulk_update(to_update, [*self.RESULT_FIELDS, 'updated_by', 'updated_at'])
+        # a fill saved meanwhile may have created the ledger row: keep its net, take the entered result
+        TradeProfitLoss.objects.bulk_create(
+            to_create, update_conflicts=True, unique_fields=['trade', 'created_by'],
+            update_fields=[*self.RESULT_FIELDS, 'updated_by', 'updated_at'],
+        )
+
 # ---------------------------------------------------------------------------
 
 class TradeNewsView(View):
     template_name = 'admin/trades/news.html'
+    SEARCH_LIMIT = 100
 
     def _dates(self, request):
         fmt = '%Y-%m-%d'
@@ -177,20 +165,44 @@ class TradeNewsView(View):
 
     def get(self, request):
         start, end = self._dates(request)
-        rows = self._trades(start, end)
-        ctx = {**admin.site.each_context(request), 'rows': rows, 'start': start, 'end': end}
+        q = request.GET.get('q', '').strip()
+        if q:
+            # ranked catalyst search over every day (trades/search.py), not just the range
+            rows, _ = search_plans(q, limit=self.SEARCH_LIMIT)
+        else:
+            rows = self._trades(start, end)
+        ctx = {**admin.site.each_context(request), 'rows': rows, 'start': start, 'end': end, 'q': q}
         return TemplateResponse(request, self.template_name, ctx)
 
+    def _edits(self, data):
+        # summary-<id>/original-<id>/version-<id> per row; the page only posts rows whose text changed, and rows
+        # equal to their original are dropped here too, so untouched rows are never version-checked.
+        # Browsers post textareas with CRLF line ends: compare and store with LF.
+        edits = []
+        for k, text in data.items():
+            if not k.startswith('summary-'):
+                continue
+            pk, text = int(k[8:]), text.replace('\r\n', '\n')
+            original = data.get(f'original-{pk}')
+            if original is not None and original.replace('\r\n', '\n') == text:
+                continue
+            edits.append((pk, text, int(data.get(f'version-{pk}', ''))))
+        return edits
+
     def post(self, request):
         start, end = self._dates(request)
-        qs = self._trades(start, end)
-        formset = TradeNewsFormSet(request.POST, queryset=qs, prefix='n')
-        if formset.is_valid():
-            formset.save()
-            messages.success(request, "Trade news updated.")
-            return redirect(f"{request.path}?start={start}&end={end}")
-        ctx = {**admin.site.each_context(request), 'formset': formset, 'start': start, 'end': end}
-        return TemplateResponse(request, self.template_name, ctx)
+        back = f"{request.path}?{urlencode({'start': start, 'end': end, 'q': request.POST.get('q', '')})}"
+        try:
+            edits = self._edits(request.POST)
+            written = apply_news_edits(edits) if edits else {}
+        except ValueError:
+            messages.error(request, "Malformed news form; reload the page.")
+        except NewsConflict as e:
+            hint = "Make the text differ from the other plan." if e.duplicate else "Reload and re-apply your edits."
+            messages.error(request, f"Nothing saved: {e}. {hint}")
+        else:
+            messages.success(request, f"Trade news updated ({len(written)} changed).")
+        return redirect(back)
 
 # ---------------------------------------------------------------------------
 
@@ -218,7 +230,17 @@ class TradeTransactionsView(View):
             .select_related('trade')  # relation-only join [21]
             .filter(created_by=request.user, created_at__gte=start_dt, created_at__lt=end_dt)
             .order_by('-created_at')
-        )  # table/formset queryset [18]
+        )  # formset queryset: only hot fills are editable [18]
+
+    def _rows(self, request, start, end):
+        # the table reads the archive too when the range reaches past the hot window; those rows are read-only
+        start_dt, end_dt = self._range(start, end)
+        return (
+            fills_model(start).objects
+            .select_related('trade')
+            .filter(created_by=request.user, created_at__gte=start_dt, created_at__lt=end_dt)
+            .order_by('-created_at')
+        )
 
     def _trade_choices(self, start, end):
         return (
@@ -227,17 +249,66 @@ class TradeTransactionsView(View):
             .order_by('stock_name')
         )  # ModelChoiceField queryset for trade [1][8]
 
+    def _formset(self, qs, start, end, data=None):
+        formset = TradeTransactionFormSet(data, queryset=qs, prefix='t')
+        # a row keeps its own plan even outside the range; its current plan is the initial value,
+        # so an untouched row does not count as changed
+        choices = TradeMaster.objects.filter(
+            Q(created_at__gte=start, created_at__lte=end) | Q(pk__in=qs.values('trade_id')))
+        for form in formset.forms:
+            form.fields['trade'].queryset = choices
+            if form.instance.pk:
+                form.initial['trade'] = form.instance.trade_id
+        return formset
+
     def get(self, request):
         start, end = self._dates(request)
         qs = self._qs(request, start, end)
         add_form = TradeTransactionForm()
         add_form.fields['trade'].queryset = self._trade_choices(start, end)
-        formset = TradeTransactionFormSet(queryset=qs, prefix='t')
-        ctx = {**admin.site.each_context(request), 'rows': qs,'add_form': add_form, 'formset': formset, 'start': start, 'end': end}
+        formset = self._formset(qs, start, end)
+        ctx = {**admin.site.each_context(request), 'rows': self._rows(request, start, end),'add_form': add_form, 'formset': formset, 'start': start, 'end': end}
         return TemplateResponse(request, self.template_name, ctx)
 
 
 
+    TX_FLAG_FIELDS = ['buy_price', 'sell_price', 'quantity', 'is_ai_correct', 'profit_or_loss',
+                      'profit_amount', 'loss_amount', 'updated_by', 'updated_at']
+
+    def _save_changed(self, formset, user):
+        # one bulk_update + one bulk_create + one P/L rollup for the whole formset
+        changed = [f for f in formset.forms if f.has_changed()]
+        if not changed:
+            return
+        now = timezone.now()
+        today = timezone.localdate(now)
+        to_update, to_create, keys, days = [], [], set(), set()
+        for form in changed:
+            obj = form.instance  # already loaded by the formset, cleaned values applied
+            obj.is_ai_correct, obj.profit_or_loss, obj.profit_amount, obj.loss_amount = self._auto_flags(
+                obj.buy_price, obj.sell_price, obj.quantity)
+            obj.updated_by = user
+            if obj.pk:
+                obj.updated_at = now  # bulk_update skips auto_now
+                old = getattr(obj, '_ledger_state', None)
+                if old:
+                    keys.add(old[:2])
+                old_day = getattr(obj, '_rollup_state', None)
+                if old_day:
+                    days.add(old_day[0][:3])
+                to_update.append(obj)
+            else:
+                obj.trade = form.cleaned_data['trade']
+                obj.created_by = user
+                to_create.append(obj)
+            keys.add((obj.trade_id, user.pk))
+            days.add((obj.trade_id, user.pk, today))
+
+        with ledger.batched():
+            TradeTransaction.objects.bulk_update(to_update, self.TX_FLAG_FIELDS)
+            TradeTransaction.objects.bulk_create(to_create)
+            ledger.mark_dirty(keys, days)  # bulk writes skip signals
+
     def _auto_flags(self, buy, sell, qty):
         # Profit if selling price minus cost price is non-negative; scale by quantity
         amt = (Decimal(sell) - Decimal(buy)) * Decimal(qty)
@@ -255,7 +326,7 @@ class TradeTransactionsView(View):
             if action == 'add':
                 add_form = TradeTransactionForm(request.POST)
                 add_form.fields['trade'].queryset = self._trade_choices(start, end)
-                formset = TradeTransactionFormSet(queryset=table_qs, prefix='t')  # unbound on add
+                formset = self._formset(table_qs, start, end)  # unbound on add
 
                 posted_id = request.POST.get('trade')
                 if posted_id and not add_form.fields['trade'].queryset.filter(pk=posted_id).exists():
@@ -296,43 +367,10 @@ class TradeTransactionsView(View):
             # Edit branch
             add_form = TradeTransactionForm()
             add_form.fields['trade'].queryset = self._trade_choices(start, end)
-            formset = TradeTransactionFormSet(request.POST, queryset=table_qs, prefix='t')  # bound
+            formset = self._formset(table_qs, start, end, request.POST)  # bound
 
             if formset.is_valid():
-                for form in formset.forms:
-                    if not form.has_changed():
-                        continue
-                    cd = form.cleaned_data
-                    pk = form.instance.pk
-                    is_ok, pol, profit_amt, loss_amt = self._auto_flags(cd['buy_price'], cd['sell_price'], cd['quantity'])  # recompute
-
-                    if pk:
-                        obj, _ = TradeTransaction.objects.update_or_create(
-                            id=pk,
-                            defaults={
-                                'buy_price': cd['buy_price'],
-                                'sell_price': cd['sell_price'],
-                                'quantity': cd['quantity'],
-                                'is_ai_correct': is_ok,
-                                'profit_or_loss': pol,
-                                'profit_amount': profit_amt,
-                                'loss_amount': loss_amt,
-                                'updated_by': request.user,
-                            },
-                        )  # atomic upsert [1][4]
-                    else:
-                        obj = TradeTransaction.objects.create(
-                            trade=cd['trade'],
-                            buy_price=cd['buy_price'],
-                            sell_price=cd['sell_price'],
-                            quantity=cd['quantity'],
-                            is_ai_correct=is_ok,
-                            profit_or_loss=pol,
-                            profit_amount=profit_amt,
-                            loss_amount=loss_amt,
-                            created_by=request.user,
-                            updated_by=request.user,
-                        )
+                self._save_changed(formset, request.user)
                 messages.success(request, "Transactions saved.")
                 return redirect(f"{request.path}?start={start}&end={end}")
 
@@ -343,6 +381,58 @@ class TradeTransactionsView(View):
 
 # ---------------------------------------------------------------------------
 
+class AccuracyView(View):
+    template_name = 'admin/trades/accuracy.html'
+    GROUP_CHOICES = [('stock', 'Stock'), ('strike', 'Strike/Expiry')]
+    PERIOD_CHOICES = [('', 'All')] + [(p, p.title()) for p in PERIODS]
+
+    def _dates(self, request):
+        fmt = '%Y-%m-%d'
+        e = request.GET.get('end')
+        s = request.GET.get('start')
+        end = datetime.strptime(e, fmt).date() if e else timezone.localdate()
+        start = datetime.strptime(s, fmt).date() if s else end - timedelta(days=89)
+        return start, end  # default: last 90 days
+
+    def get(self, request):
+        start, end = self._dates(request)
+        group = request.GET.get('group') or 'stock'
+        period = request.GET.get('period') or ''
+        try:
+            groups = parse_groups(','.join(g for g in (group, period) if g))
+        except ValueError as e:
+            messages.error(request, str(e))
+            groups = ('stock',)
+        stats = accuracy_stats(request.user, start, end, groups)  # memoized per user/range/grouping
+        rows = [{**r, 'keys': [r[g] for g in stats['groups']]} for r in stats['rows']]
+        ctx = {
+            **admin.site.each_context(request), **stats, 'rows': rows,
+            'start': start, 'end': end, 'group': group, 'period': period,
+            'group_choices': self.GROUP_CHOICES, 'period_choices': self.PERIOD_CHOICES,
+        }
+        return TemplateResponse(request, self.template_name, ctx)
+
+# ---------------------------------------------------------------------------
+
+class RequestTimingsView(View):
+    template_name = 'admin/trades/requests.html'
+    WINDOW_CHOICES = [(5, '5 min'), (15, '15 min'), (60, '1 hour'), (360, '6 hours'), (1440, '24 hours')]
+
+    def get(self, request):
+        try:
+            minutes = int(request.GET.get('minutes') or 60)
+            limit = max(1, min(int(request.GET.get('limit') or 20), 200))
+        except ValueError:
+            minutes, limit = 60, 20
+        ctx = {
+            **admin.site.each_context(request),
+            'rows': slowest_endpoints(minutes * 60, limit),  # this process's ring buffer only
+            'minutes': minutes, 'limit': limit, 'window_choices': self.WINDOW_CHOICES,
+        }
+        return TemplateResponse(request, self.template_name, ctx)
+
+# ---------------------------------------------------------------------------
+
 class TradeMasterAdmin(admin.ModelAdmin):
     def get_model_perms(self, request):
         return {}  # hide model from index; URLs still work [18]
@@ -354,6 +444,8 @@ class TradeMasterAdmin(admin.ModelAdmin):
             path('upload/', self.admin_site.admin_view(CustomUploadView.as_view()), name='trades_upload'),
             path('news/', self.admin_site.admin_view(TradeNewsView.as_view()), name='trades_news'),
             path('transactions/', self.admin_site.admin_view(TradeTransactionsView.as_view()), name='trades_transactions'),
+            path('accuracy/', self.admin_site.admin_view(AccuracyView.as_view()), name='trades_accuracy'),
+            path('requests/', self.admin_site.admin_view(RequestTimingsView.as_view()), name='trades_requests'),
         ]
         return custom + urls
 
@@ -408,19 +500,6 @@ admin.site.register(TradeTransaction, HiddenTradeTransactionAdmin)
 
 
 
-GRAN_MAP = {
-    "day": TruncDay("updated_at"),
-    "week": TruncWeek("updated_at"),
-    "month": TruncMonth("updated_at"),
-    "year": TruncYear("updated_at"),
-}  # Trunc* for grouping periods [20]
-
-# Capital = quantity * buy_price (computed in DB)
-CAPITAL_EXPR = ExpressionWrapper(
-    F("quantity") * F("buy_price"),
-    output_field=DecimalField(max_digits=18, decimal_places=2),
-)  # expression with proper numeric type [1]
-
 def _parse_date(s: str):
     if not s:
         return None
@@ -435,8 +514,7 @@ def _parse_date(s: str):
 class AccountSummaryAdmin(admin.ModelAdmin):
     change_list_template = "admin/trades/accountsummary/change_list.html"  # custom top filters + charts [12]
     list_display = ("trade", "created_by", "profit_or_loss", "profit_amount", "loss_amount", "updated_at")  # grid [12]
-
-    TX_CAPITAL_EXPR = ExpressionWrapper(F("quantity") * F("buy_price"),output_field=DecimalField(max_digits=18, decimal_places=2),)
+    show_full_result_count = False  # skip the extra unfiltered COUNT(*)
 
     def _capture_params(self, request):
         # Read GET; if blank, defaulting to today is applied in get_queryset [12]
@@ -472,48 +550,24 @@ class AccountSummaryAdmin(admin.ModelAdmin):
             today = timezone.localdate()
             start, end = today, today  # default to today's data [1][2]
 
-        # Build TradeTransaction queryset for charts/KPIs (user + date + optional filters)
-        tx_qs = (TradeTransaction.objects
-                .filter(created_by=request.user)
-                .filter(updated_at__date__gte=start)
-                .filter(updated_at__date__lte=end))
+        # Daily rollup for charts/KPIs (user + date + optional filters); never scans raw fills
+        roll_qs = TradeDailyRollup.objects.filter(created_by=request.user)
+        if start:
+            roll_qs = roll_qs.filter(day__gte=start)
+        if end:
+            roll_qs = roll_qs.filter(day__lte=end)
         if p.get("trade"):
-            tx_qs = tx_qs.filter(trade_id=p["trade"])
+            roll_qs = roll_qs.filter(trade_id=p["trade"])
         if p.get("kind") == "profit":
-            tx_qs = tx_qs.filter(profit_or_loss="Profit")
+            roll_qs = roll_qs.filter(profit_or_loss="Profit")
         elif p.get("kind") == "loss":
-            tx_qs = tx_qs.filter(profit_or_loss="Loss")
-
-        # Grouping granularity
-        gran = (p.get("gran") or "day").lower()
-        trunc = GRAN_MAP.get(gran, GRAN_MAP["day"])  # TruncDay/Week/Month/Year on updated_at [5]
-
-        # Series for charts (from TradeTransaction)
-        grouped = (tx_qs.annotate(period=trunc)
-                        .values("period")
-                        .annotate(
-                            trades=Count("id"),
-                            profit_total=Sum("profit_amount"),
-                            loss_total=Sum("loss_amount"),
-                            capital_total=Sum(self.TX_CAPITAL_EXPR),
-                        )
-                        .order_by("period"))  # [4][3]
-
-        # Overall KPIs (from TradeTransaction)
-        totals = tx_qs.aggregate(
-            trades=Count("id"),
-            profit_total=Sum("profit_amount"),
-            loss_total=Sum("loss_amount"),
-            capital_total=Sum(self.TX_CAPITAL_EXPR),
-        )  # [4][3]
-
-        # Trade dropdown from actual transactions in the active window
-        tx_trade_ids = (tx_qs.values_list("trade_id", flat=True).distinct().order_by())  # [6]
-        trade_choices = list(TradeMaster.objects.filter(id__in=tx_trade_ids)
-                            .values("id", "stock_name").order_by("stock_name"))  # [2]
+            roll_qs = roll_qs.filter(profit_or_loss="Loss")
+
+        # Series, KPIs and trade dropdown from one grouped pass over the rollup [4][3]
+        series, totals, trade_choices = dashboard_summary(roll_qs, p.get("gran"))
 
         response.context_data.update({
-            "series_json": json.dumps(list(grouped), cls=DjangoJSONEncoder),  # charts payload [1]
+            "series_json": json.dumps(series, cls=DjangoJSONEncoder),         # charts payload [1]
             "totals": {k: float(v or 0) for k, v in totals.items()},          # KPI cards [4]
             "filters": p,                                                     # refill form [7]
             "trade_choices": trade_choices,                                   # conditional dropdown [2]
@@ -538,11 +592,11 @@ class AccountSummaryAdmin(admin.ModelAdmin):
             start = today
             end   = today  # default date window [12]
 
-        # Date range
+        # Date range as [start 00:00, day after end 00:00) so (created_by, updated_at) is usable
         if start:
-            qs = qs.filter(updated_at__date__gte=start)
+            qs = qs.filter(updated_at__gte=timezone.make_aware(datetime.combine(start, time.min)))
         if end:
-            qs = qs.filter(updated_at__date__lte=end)
+            qs = qs.filter(updated_at__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)))
 
         # Optional filters
         trade = p.get("trade") or None
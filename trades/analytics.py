@@ -0,0 +1,126 @@
+# trades/analytics.py
+"""Dashboard read queries: account summary over TradeDailyRollup, AI accuracy over TradeTransaction."""
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+from django.db.models import Count, DateField, F, Q, Sum
+from django.db.models.functions import TruncDay, TruncMonth, TruncWeek, TruncYear
+from django.utils import timezone
+
+from .cache import memoize_for_user
+from .models import fills_model
+
+GRAN_MAP = {
+    "day": TruncDay("day"),
+    "week": TruncWeek("day"),
+    "month": TruncMonth("day"),
+    "year": TruncYear("day"),
+}  # Trunc* re-grouping of TradeDailyRollup.day
+
+TOTAL_KEYS = ("trades", "profit_total", "loss_total", "capital_total")
+
+
+def dashboard_summary(rollup_qs, gran="day"):
+    """Series, totals and trade choices for the account summary in one query.
+
+    Groups the filtered rollup by (period, trade) once; the per-period
+    series, the overall totals and the distinct trades are folded from
+    those rows in Python.
+    """
+    trunc = GRAN_MAP.get((gran or "day").lower(), GRAN_MAP["day"])
+    rows = (rollup_qs
+            .annotate(period=trunc)
+            .values("period", "trade_id", "trade__stock_name")
+            .annotate(
+                trades=Sum("count"),
+                profit_total=Sum("profit_total"),
+                loss_total=Sum("loss_total"),
+                capital_total=Sum("capital_total"),
+            )
+            .order_by("period"))
+
+    zero = Decimal("0")
+    series, totals, trades = {}, dict.fromkeys(TOTAL_KEYS, zero), {}
+    for r in rows:
+        bucket = series.setdefault(r["period"], {"period": r["period"], **dict.fromkeys(TOTAL_KEYS, zero)})
+        for k in TOTAL_KEYS:
+            v = r[k] or zero
+            bucket[k] += v
+            totals[k] += v
+        trades[r["trade_id"]] = r["trade__stock_name"]
+
+    trade_choices = [
+        {"id": tid, "stock_name": name}
+        for tid, name in sorted(trades.items(), key=lambda t: (t[1], t[0]))
+    ]
+    return list(series.values()), totals, trade_choices
+
+
+# ---------------------------------------------------------------------------
+# AI accuracy (is_ai_correct) over TradeTransaction
+
+ACCURACY_GROUPS = {
+    'stock': F('trade__stock_name'),
+    'strike': F('trade__option_strike_price_expiry'),
+    'day': TruncDay('created_at', output_field=DateField()),
+    'week': TruncWeek('created_at', output_field=DateField()),
+    'month': TruncMonth('created_at', output_field=DateField()),
+    'year': TruncYear('created_at', output_field=DateField()),
+}
+PERIODS = ('day', 'week', 'month', 'year')
+COUNT_KEYS = ('trades', 'correct', 'wins', 'losses', 'gross_profit', 'gross_loss')
+
+
+def parse_groups(by):
+    """``"stock,week"`` -> ``('stock', 'week')``; at most one period."""
+    groups = tuple(g.strip().lower() for g in (by or 'stock').split(',') if g.strip())
+    unknown = [g for g in groups if g not in ACCURACY_GROUPS]
+    if unknown:
+        raise ValueError(f"Unknown grouping: {', '.join(unknown)}")
+    if sum(g in PERIODS for g in groups) > 1:
+        raise ValueError("Group by at most one period")
+    return groups
+
+
+def _ratios(row):
+    n, wins, losses = row['trades'], row['wins'], row['losses']
+    gp = row['gross_profit'] = Decimal(row['gross_profit']).quantize(Decimal('0.01'))
+    gl = row['gross_loss'] = Decimal(row['gross_loss']).quantize(Decimal('0.01'))
+    row['accuracy'] = round(row['correct'] / n, 4) if n else None
+    row['win_rate'] = round(wins / n, 4) if n else None
+    row['avg_win'] = (gp / wins).quantize(Decimal('0.01')) if wins else None
+    row['avg_loss'] = (gl / losses).quantize(Decimal('0.01')) if losses else None
+    row['profit_factor'] = round(float(gp / gl), 4) if gl else None
+    return row
+
+
+def accuracy_stats(user, start, end, groups=('stock',)):
+    """AI accuracy, win rate, average win/loss and profit factor of ``user``'s fills
+    created in [start, end], grouped by ``groups`` (see ``ACCURACY_GROUPS``).
+
+    One conditional-aggregate query; memoized per (user, range, grouping)
+    until the user's transactions change.
+    """
+    def compute():
+        lo = timezone.make_aware(datetime.combine(start, time.min))
+        hi = timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min))
+        profit, loss = Q(profit_or_loss='Profit'), Q(profit_or_loss='Loss')
+        rows = list(
+            fills_model(start).objects  # archived fills too when the range reaches past the hot window
+            .filter(created_by=user, created_at__gte=lo, created_at__lt=hi)
+            .annotate(**{g: ACCURACY_GROUPS[g] for g in groups})
+            .values(*groups)
+            .annotate(
+                trades=Count('id'),
+                correct=Count('id', filter=Q(is_ai_correct=True)),
+                wins=Count('id', filter=profit),
+                losses=Count('id', filter=loss),
+                gross_profit=Sum('profit_amount', filter=profit, default=Decimal('0')),
+                gross_loss=Sum('loss_amount', filter=loss, default=Decimal('0')),
+            )
+            .order_by(*groups)
+        )
+        totals = {k: sum((r[k] for r in rows), 0) for k in COUNT_KEYS}
+        return {'groups': list(groups), 'rows': [_ratios(r) for r in rows], 'totals': _ratios(totals)}
+
+    return memoize_for_user(user.pk, ('accuracy', start, end, *groups), compute)
@@ -1,32 +1,18 @@
 # trades/apis.py
-from decimal import Decimal
+from django.http import Http404
+from django.urls import reverse
 from rest_framework.parsers import MultiPartParser
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status
-import pandas as pd
-from .models import TradeMaster
 
-NUMERIC_COLS = [
-    'Option Buy Price (₹)',
-    'Intraday Exit Price Target (₹)',
-    'Stop Loss Price (₹)',
-    'Capital Required (₹)',
-    'Max Loss If Stop Loss Hits (₹)',
-    'Max Profit If Target Hits (₹)',
-]
+from .importer import IMPORT_MODES, check_upload_name, import_upload
+from .jobs import enqueue, job_payload
+from .models import ImportJob
 
-def _to_numeric_series(s):
-    # remove ₹ and commas, then coerce to number
-    return pd.to_numeric(
-        s.astype(str).str.replace(r'[₹,]', '', regex=True).str.strip(),
-        errors='coerce'
-    )
-
-def _dec_or_none(v):
-    if pd.isna(v):
-        return None
-    return Decimal(str(v))
+def _int_param(params, key):
+    v = params.get(key)
+    return int(v) if v else None
 
 class ExcelUploadAPIView(APIView):
     parser_classes = [MultiPartParser]
@@ -37,39 +23,34 @@ class ExcelUploadAPIView(APIView):
             return Response({'error': 'No file provided'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            name = file.name.lower()
-            if name.endswith('.csv'):
-                # parse numbers with thousands separators
-                df = pd.read_csv(file, thousands=',')
-            elif name.endswith(('.xlsx', '.xls')):
-                df = pd.read_excel(file)
-            else:
-                return Response({'error': 'File must be .xlsx, .xls or .csv'}, status=status.HTTP_400_BAD_REQUEST)
-
-            # standardize column names (optional, keeps exact headers if already matching)
-            df.columns = [c.strip() for c in df.columns]
-
-            # clean currency/commas and convert to numbers
-            for col in NUMERIC_COLS:
-                if col in df.columns:
-                    df[col] = _to_numeric_series(df[col])
-
-            # create rows
-            for _, row in df.iterrows():
-                TradeMaster.objects.create(
-                    stock_name=str(row['Stock Name']).strip(),
-                    option_strike_price_expiry=str(row['Option Strike Price & Expiry']).strip(),
-                    option_buy_price=_dec_or_none(row['Option Buy Price (₹)']),
-                    intraday_exit_price_target=_dec_or_none(row['Intraday Exit Price Target (₹)']),
-                    stop_loss_price=_dec_or_none(row['Stop Loss Price (₹)']),
-                    support_level=str(row.get('Support Level (₹)', '')).strip(),
-                    resistance_level=str(row.get('Resistance Level (₹)', '')).strip(),
-                    capital_required=_dec_or_none(row['Capital Required (₹)']),
-                    max_loss_if_stop_loss_hits=_dec_or_none(row['Max Loss If Stop Loss Hits (₹)']),
-                    max_profit_if_target_hits=_dec_or_none(row['Max Profit If Target Hits (₹)']),
-                    news_catalyst_summary=str(row.get('News Catalyst Summary', '')).strip(),
-                )
-
-            return Response({'success': 'Data uploaded successfully'}, status=status.HTTP_201_CREATED)
+            params = request.query_params
+            sync = params.get('sync', '').lower() in ('1', 'true')
+            mode = params.get('mode') or ('bulk' if sync else 'stream')  # 'stream' = chunked, one commit per chunk
+            if mode not in IMPORT_MODES:
+                raise ValueError(f"Unknown import mode: {mode}")
+            if not sync:
+                # queue for manage.py import_worker and answer immediately
+                check_upload_name(file.name)
+                job = enqueue(file, request.user, mode=mode)
+                status_url = request.build_absolute_uri(reverse('import_job_status', args=[job.pk]))
+                return Response({'job_id': job.pk, 'status': job.status, 'status_url': status_url},
+                                status=status.HTTP_202_ACCEPTED)
+
+            result = import_upload(
+                file,
+                mode=mode,
+                batch_size=_int_param(params, 'batch_size'),
+                chunk_size=_int_param(params, 'chunk_size'),
+            )
+            return Response({'success': 'Data uploaded successfully', **result}, status=status.HTTP_201_CREATED)
         except Exception as e:
-            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class ImportJobStatusAPIView(APIView):
+    def get(self, request, pk, *args, **kwargs):
+        job = ImportJob.objects.filter(pk=pk).first()
+        user = request.user
+        # only the uploader sees a job (traders are all staff); anonymous uploads only superusers
+        if job is None or not (user.is_superuser or (job.created_by_id and job.created_by_id == user.id)):
+            raise Http404
+        return Response(job_payload(job))
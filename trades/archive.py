@@ -0,0 +1,44 @@
+# trades/archive.py
+"""Move cold TradeTransaction rows to TradeTransactionArchive.
+
+Fills keep their id and every column; reads that span old days go
+through TradeTransactionHistory (``fills_model``), and ledger/rollup
+rebuilds read the same view, so moving a fill changes no totals.
+"""
+from datetime import datetime, time, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import ledger
+from .models import TradeTransaction, TradeTransactionArchive
+
+DEFAULT_BATCH_SIZE = 5000
+
+
+def archive_cutoff(keep_days=None):
+    """Start of the oldest day kept hot; fills created before it are archived."""
+    hot_days = getattr(settings, 'TRADES_HOT_DAYS', 90)
+    keep_days = max(hot_days if keep_days is None else keep_days, hot_days)  # never below the hot window
+    day = timezone.localdate() - timedelta(days=keep_days)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def archive_before(cutoff, batch_size=DEFAULT_BATCH_SIZE):
+    """Move fills created before ``cutoff``, ``batch_size`` per transaction; returns the count moved."""
+    fields = TradeTransactionArchive.COPY_FIELDS
+    moved = 0
+    while True:
+        with transaction.atomic(), ledger.suppressed():
+            rows = list(TradeTransaction.objects
+                        .filter(created_at__lt=cutoff)
+                        .order_by('created_at', 'id')
+                        .values_list(*fields)[:batch_size])
+            if not rows:
+                return moved
+            TradeTransactionArchive.objects.bulk_create(
+                [TradeTransactionArchive(**dict(zip(fields, r))) for r in rows])
+            # copy and delete commit together; signals are suppressed, the ledger sees no change
+            TradeTransaction.objects.filter(pk__in=[r[0] for r in rows]).delete()
+        moved += len(rows)
@@ -0,0 +1,176 @@
+# trades/backtest.py
+"""Replay TradeMaster plans against intraday price bars.
+
+Each plan is a long entry at ``option_buy_price`` on its ``created_at`` day,
+sized at ``lot_quantity``. Rules:
+
+- entry fills on the first bar whose low reaches the entry price;
+- from that bar on, the first bar touching the stop (low <= stop) or the
+  target (high >= target) closes the trade at that price; when one bar
+  touches both, the stop is assumed to have come first;
+- a filled trade with neither is closed at the day's last close.
+
+Bars live in one file per instrument (``<dir>/<key>.csv`` or ``.parquet``)
+with timestamp/open/high/low/close columns. The key is the plan's option
+contract with non-alphanumerics replaced by ``_``, falling back to its
+stock name. All plans of an instrument are simulated together: plans are
+joined to their day's bars and the fill/exit search is done with grouped
+cumulative operations, not a Python loop per bar.
+"""
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from .models import TradeMaster
+
+BAR_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close']
+TIMESTAMP_ALIASES = ('timestamp', 'datetime', 'date', 'time', 'ts')
+PLAN_FIELDS = ['id', 'stock_name', 'option_strike_price_expiry', 'created_at', 'option_buy_price',
+               'stop_loss_price', 'intraday_exit_price_target', 'risk_per_share', 'lot_quantity']
+
+TARGET, STOP, CLOSE, NO_FILL, NO_DATA = 'target', 'stop', 'close', 'no_fill', 'no_data'
+OUTCOME_COLUMNS = ['outcome', 'entry_time', 'exit_time', 'exit_price']
+
+
+def instrument_key(text):
+    return re.sub(r'[^0-9A-Za-z]+', '_', str(text)).strip('_').upper()
+
+
+def plans_frame(start, end, stock=None):
+    """TradeMaster plans created in [start, end] as a DataFrame (prices as floats)."""
+    qs = TradeMaster.objects.filter(created_at__gte=start, created_at__lte=end)
+    if stock:
+        qs = qs.filter(stock_name__iexact=stock)
+    df = pd.DataFrame.from_records(qs.order_by('created_at', 'id').values(*PLAN_FIELDS), columns=PLAN_FIELDS)
+    for col in ('option_buy_price', 'stop_loss_price', 'intraday_exit_price_target', 'risk_per_share'):
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype(float)
+    df['lot_quantity'] = pd.to_numeric(df['lot_quantity'], errors='coerce').fillna(0).astype(np.int64)
+    df['day'] = pd.to_datetime(df['created_at'])
+    return df
+
+
+def load_bars(path):
+    path = Path(path)
+    if path.suffix.lower() == '.parquet':
+        try:
+            df = pd.read_parquet(path)
+        except ImportError as e:
+            raise ImportError("Reading Parquet bars needs pyarrow (pip install pyarrow).") from e
+    else:
+        df = pd.read_csv(path)
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    ts = next((c for c in TIMESTAMP_ALIASES if c in df.columns), None)
+    missing = [c for c in BAR_COLUMNS[1:] if c not in df.columns]
+    if ts is None or missing:
+        raise ValueError(f"{path.name}: need timestamp, open, high, low, close columns")
+    df = df.rename(columns={ts: 'timestamp'})[BAR_COLUMNS]
+    df['timestamp'] = pd.to_datetime(df['timestamp'])
+    return df.sort_values('timestamp', kind='stable').reset_index(drop=True)
+
+
+def _bar_files(bars_dir):
+    files = {}
+    for p in sorted(Path(bars_dir).iterdir()):
+        if p.suffix.lower() in ('.csv', '.parquet'):
+            files.setdefault(instrument_key(p.stem), p)
+    return files
+
+
+def simulate(plans, bars):
+    """Per-plan fills and exits for ``plans`` (rows of ``plans_frame``) on one instrument's ``bars``.
+
+    ``bars`` must be sorted by timestamp (``load_bars`` does this).
+    """
+    bars = bars.assign(day=bars['timestamp'].dt.normalize())
+    bars = bars[bars['day'].isin(plans['day'].unique())]
+    rows = (plans[['id', 'day', 'option_buy_price', 'stop_loss_price', 'intraday_exit_price_target']]
+            .merge(bars, on='day')
+            .sort_values('id', kind='stable'))  # one row per (plan, bar of its day); bars stay in time order
+
+    out = pd.DataFrame(index=pd.Index(plans['id'].to_numpy(), name='id'), columns=OUTCOME_COLUMNS)
+    out['outcome'] = NO_DATA
+    if rows.empty:
+        return out
+
+    ids = rows['id'].to_numpy()
+    low, high = rows['low'].to_numpy(), rows['high'].to_numpy()
+    pos = np.arange(len(ids))
+    starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])  # first row of each plan
+    group = np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, len(ids)]))
+
+    def first(mask):
+        # row of each plan's first True, len(ids) when there is none
+        return np.minimum.reduceat(np.where(mask, pos, len(ids)), starts)
+
+    fill_at = first(low <= rows['option_buy_price'].to_numpy())
+    after_fill = pos >= fill_at[group]
+    stop_hit = after_fill & (low <= rows['stop_loss_price'].to_numpy())
+    target_hit = after_fill & (high >= rows['intraday_exit_price_target'].to_numpy())
+    exit_at = first(stop_hit | target_hit)
+
+    filled = fill_at < len(ids)
+    hit = exit_at < len(ids)
+    last = np.r_[starts[1:], len(ids)] - 1
+    exit_row = np.where(hit, exit_at, last)  # day close when neither level is touched
+    stopped = hit & stop_hit[np.minimum(exit_at, len(ids) - 1)]  # stop wins ties within a bar
+
+    ts = rows['timestamp'].to_numpy()
+    price = np.select(
+        [stopped, hit],
+        [rows['stop_loss_price'].to_numpy()[exit_row], rows['intraday_exit_price_target'].to_numpy()[exit_row]],
+        rows['close'].to_numpy()[exit_row],
+    )
+    per_plan = pd.DataFrame({
+        'outcome': np.select([stopped, hit, filled], [STOP, TARGET, CLOSE], NO_FILL),
+        'entry_time': pd.Series(ts[np.minimum(fill_at, len(ids) - 1)]).where(filled).to_numpy(),
+        'exit_time': pd.Series(ts[exit_row]).where(filled).to_numpy(),
+        'exit_price': np.where(filled, price, np.nan),
+    }, index=ids[starts])
+    out.loc[per_plan.index] = per_plan
+    return out
+
+
+def run_backtest(plans, bars_dir):
+    """Simulate every plan against the bar files in ``bars_dir``; returns ``(outcomes, summary)``."""
+    files = _bar_files(bars_dir)
+    option_path = plans['option_strike_price_expiry'].map(lambda v: files.get(instrument_key(v)))
+    stock_path = plans['stock_name'].map(lambda v: files.get(instrument_key(v)))
+    plans = plans.assign(bars=option_path.fillna(stock_path))
+
+    parts = [simulate(group, load_bars(path)) for path, group in plans.groupby('bars', sort=False)]
+    no_bars = plans.loc[plans['bars'].isna(), 'id']
+    parts.append(pd.DataFrame({'outcome': NO_DATA}, index=pd.Index(no_bars.to_numpy(), name='id')))
+
+    result = pd.concat(parts).reindex(columns=OUTCOME_COLUMNS)
+    outcomes = plans.drop(columns=['bars', 'day']).set_index('id').join(result)
+    outcomes['exit_price'] = outcomes['exit_price'].astype(float)
+    for col in ('entry_time', 'exit_time'):
+        outcomes[col] = pd.to_datetime(outcomes[col])
+    traded = outcomes['outcome'].isin([TARGET, STOP, CLOSE])
+    move = (outcomes['exit_price'] - outcomes['option_buy_price']).where(traded)
+    outcomes['pnl'] = move * outcomes['lot_quantity']
+    outcomes['r_multiple'] = move / outcomes['risk_per_share'].where(outcomes['risk_per_share'] > 0)
+    return outcomes, summarize(outcomes)
+
+
+def summarize(outcomes):
+    """Hit rate, expectancy and max drawdown (of cumulative P/L in exit order) over filled plans."""
+    counts = outcomes['outcome'].value_counts()
+    traded = outcomes[outcomes['outcome'].isin([TARGET, STOP, CLOSE])].sort_values('exit_time', kind='stable')
+    pnl = traded['pnl'].to_numpy(dtype=float)
+    equity = np.cumsum(pnl)
+    peak = np.maximum.accumulate(np.concatenate(([0.0], equity)))[1:]
+    n = len(traded)
+    return {
+        'plans': len(outcomes),
+        'filled': n,
+        **{k: int(counts.get(k, 0)) for k in (TARGET, STOP, CLOSE, NO_FILL, NO_DATA)},
+        'hit_rate': float(counts.get(TARGET, 0) / n) if n else None,
+        'win_rate': float((pnl > 0).mean()) if n else None,
+        'expectancy': float(pnl.mean()) if n else None,
+        'expectancy_r': float(traded['r_multiple'].mean()) if n else None,
+        'total_pnl': float(pnl.sum()),
+        'max_drawdown': float((peak - equity).max()) if n else 0.0,
+    }
@@ -0,0 +1,235 @@
+# trades/bench.py
+"""Benchmarks for the upload, ledger and dashboard hot paths (``manage.py bench``).
+
+``seed`` fills the current database with synthetic data: ``users`` traders,
+``trades`` plans spread over ``days`` days and ``fills`` fills per
+(user, plan). Each case is then run ``repeat`` times through the test
+client (full middleware/view stack) with a cold cache, recording wall
+time, query count and, on one extra run under tracemalloc, peak Python
+memory. Results are plain dicts, written as JSON by the command so runs
+can be compared with ``compare``.
+
+Nothing here creates or drops databases; the command runs it inside a
+throwaway test database (SQLite, or Postgres via ``DATABASE_URL``).
+"""
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import django
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from . import ledger
+from .importer import DECIMAL_FIELDS, TEXT_FIELDS, attach_instruments
+from .models import TradeMaster, TradeTransaction
+
+DEFAULTS = {'users': 5, 'trades': 200, 'fills': 5, 'days': 20, 'seed': 0}
+
+
+def _plan(i, day_tag, rnd):
+    entry = Decimal(rnd.randrange(5000, 50000)) / 100
+    return {
+        'stock_name': f'BENCH{i % 50}',
+        'option_strike_price_expiry': f'BENCH{i % 50} {100 + i} CE {day_tag}',
+        'option_buy_price': entry,
+        'intraday_exit_price_target': entry * Decimal('1.20'),
+        'stop_loss_price': entry * Decimal('0.90'),
+        'support_level': str(entry * Decimal('0.95')),
+        'resistance_level': str(entry * Decimal('1.25')),
+        'capital_required': entry * 100,
+        'max_loss_if_stop_loss_hits': entry * 10,
+        'max_profit_if_target_hits': entry * 20,
+        'news_catalyst_summary': f'Synthetic catalyst {i} {day_tag}',
+    }
+
+
+def _fill(trade, user, rnd):
+    buy = trade.option_buy_price
+    sell = (buy * Decimal(rnd.uniform(0.85, 1.25))).quantize(Decimal('0.01'))
+    qty = rnd.randrange(1, 50)
+    net = (sell - buy) * qty
+    return TradeTransaction(
+        trade=trade, buy_price=buy, sell_price=sell, quantity=qty,
+        is_ai_correct=net >= 0,
+        profit_or_loss='Profit' if net >= 0 else 'Loss',
+        profit_amount=net if net >= 0 else None,
+        loss_amount=-net if net < 0 else None,
+        created_by=user, updated_by=user,
+    )
+
+
+def seed(users=5, trades=200, fills=5, days=20, seed=0):
+    """Create the synthetic data set; returns ``{'users', 'days'}`` for the cases."""
+    rnd = random.Random(seed)
+    User = get_user_model()
+    people = [User.objects.create_user(f'bench{u}', f'bench{u}@example.com', 'bench',
+                                       is_staff=True, is_superuser=u == 0)  # bench0 drives the admin views
+              for u in range(users)]
+    today = timezone.localdate()
+    day_list = [today - timedelta(days=d) for d in range(days)]
+    plans = [TradeMaster(**_plan(i, i % days, rnd)) for i in range(trades)]
+    for p in plans:
+        p.refresh_metrics()
+        p.refresh_fingerprint()
+    attach_instruments(plans)
+    plans = TradeMaster.objects.bulk_create(plans, batch_size=1000)
+
+    objs = [_fill(p, u, rnd) for p in plans for u in people for _ in range(fills)]
+    TradeTransaction.objects.bulk_create(objs, batch_size=2000)  # no signals; ledger rebuilt below
+    for d, day in enumerate(day_list):
+        ids = [p.pk for i, p in enumerate(plans) if i % days == d]
+        ts = timezone.make_aware(datetime.combine(day, datetime.min.time())) + timedelta(hours=10)
+        TradeMaster.objects.filter(pk__in=ids).update(created_at=day)
+        TradeTransaction.objects.filter(trade_id__in=ids).update(created_at=ts, updated_at=ts)
+    ledger.recompute()
+    ledger.rebuild_days()
+    return {'users': people, 'days': (day_list[-1], today)}
+
+
+def _upload_csv(rows, tag):
+    rnd = random.Random(tag)
+    headers = {**TEXT_FIELDS, **DECIMAL_FIELDS}
+    lines = [','.join(f'"{h}"' for h in headers.values())]
+    for i in range(rows):
+        plan = _plan(i, f'u{tag}', rnd)
+        lines.append(','.join(f'"{plan[f]}"' for f in headers))
+    return '\n'.join(lines).encode()
+
+
+def _get(client, name, **params):
+    def run():
+        resp = client.get(reverse(name), params)
+        if resp.status_code != 200:
+            raise RuntimeError(f"{name}: HTTP {resp.status_code}")
+        if resp.streaming:
+            b''.join(resp.streaming_content)
+    return run
+
+
+# name -> builder(ctx) returning (run, ops per run)
+def _case_upload(ctx):
+    runs = iter(range(1_000_000))
+
+    def run():
+        body = _upload_csv(ctx['upload_rows'], next(runs))
+        resp = ctx['client'].post(reverse('api-upload-excel') + '?sync=1',
+                                  {'file': SimpleUploadedFile('bench.csv', body, 'text/csv')})
+        if resp.status_code != 201:
+            raise RuntimeError(f"upload: HTTP {resp.status_code} {resp.content[:200]!r}")
+    return run, ctx['upload_rows']
+
+
+def _case_propagate_tpl(ctx):
+    rnd = random.Random(1)
+    user = ctx['user']
+    plans = list(TradeMaster.objects.order_by('-created_at', 'pk')[:20])
+
+    def run():
+        for i in range(ctx['signal_fills']):
+            _fill(plans[i % len(plans)], user, rnd).save()  # post_save -> ledger + rollup deltas
+    return run, ctx['signal_fills']
+
+
+def _case_account_summary(ctx):
+    start, end = ctx['days']
+    return _get(ctx['client'], 'admin:trades_accountsummary_changelist',
+                start=start.isoformat(), end=end.isoformat(), gran='week'), 1
+
+
+def _case_transactions_view(ctx):
+    day = ctx['days'][1]
+    return _get(ctx['client'], 'admin:trades_transactions', start=day.isoformat(), end=day.isoformat()), 1
+
+
+def _case_trade_news_api(ctx):
+    start, end = ctx['days']
+    return _get(ctx['client'], 'trade_news_api', start=start.isoformat(), end=end.isoformat()), 1
+
+
+def _case_transactions_api(ctx):
+    start, end = ctx['days']
+    return _get(ctx['client'], 'transactions_list_api', start=start.isoformat(), end=end.isoformat()), 1
+
+
+CASES = {
+    'upload': _case_upload,
+    'propagate_tpl': _case_propagate_tpl,
+    'account_summary': _case_account_summary,
+    'transactions_view': _case_transactions_view,
+    'trade_news_api': _case_trade_news_api,
+    'transactions_api': _case_transactions_api,
+}
+
+
+def measure(run, repeat=5, ops=1):
+    """Wall time (ms) over ``repeat`` cold-cache runs, queries of the last one, peak memory of one more."""
+    times = []
+    for _ in range(repeat):
+        cache.clear()
+        queries = []
+        # execute_wrapper, not CaptureQueriesContext: each client request resets queries_log
+        with connection.execute_wrapper(lambda execute, sql, *a: queries.append(sql) or execute(sql, *a)):
+            t0 = time.perf_counter()
+            run()
+            times.append((time.perf_counter() - t0) * 1000)
+    cache.clear()
+    tracemalloc.start()
+    try:
+        run()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    median = statistics.median(times)
+    return {
+        'runs': repeat,
+        'min_ms': round(min(times), 3),
+        'median_ms': round(median, 3),
+        'mean_ms': round(statistics.fmean(times), 3),
+        'queries': len(queries),
+        'peak_kib': round(peak / 1024, 1),
+        'ops': ops,
+        'ops_per_s': round(ops / (median / 1000), 1) if median else None,
+    }
+
+
+def run_cases(names, data, repeat=5, upload_rows=200, signal_fills=100):
+    """Run the named ``CASES`` against seeded ``data``; returns {name: measurement}."""
+    client = Client()
+    client.force_login(data['users'][0])
+    ctx = {'client': client, 'user': data['users'][0], 'days': data['days'],
+           'upload_rows': upload_rows, 'signal_fills': signal_fills}
+    results = {}
+    for name in names:
+        run, ops = CASES[name](ctx)
+        results[name] = measure(run, repeat=repeat, ops=ops)
+    return results
+
+
+def environment():
+    return {
+        'vendor': connection.vendor,
+        'django': django.get_version(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'started_at': timezone.now().isoformat(),
+    }
+
+
+def compare(old, new, key='median_ms'):
+    """One line per case of ``new`` comparing ``key`` with ``old`` (both result-file dicts)."""
+    lines = []
+    for name, res in new['results'].items():
+        before = old.get('results', {}).get(name, {}).get(key)
+        change = f"  ({(res[key] - before) / before:+.1%})" if before else ''
+        lines.append(f"{name:<18} {before if before is not None else '-':>10} -> {res[key]:>10} {key}{change}")
+    return lines
@@ -0,0 +1,150 @@
+# trades/cache.py
+"""Caches keyed by database stamps.
+
+Plans: response cache for the read-only plan endpoints (daily plan page, news API).
+
+Responses are cached under (URL, stamp of the days they cover), and the
+stamp is read from the database on every request: the newest
+``TradeMaster.updated_at`` and the row count of the covered ``created_at``
+days. Every worker process therefore sees a write (import, news edit,
+admin change, delete) as soon as it commits, even when each process keeps
+its own local-memory cache, and the ETag/Last-Modified change with it.
+Ranges that end before today are kept without a timeout.
+
+Per-user stats: ``memoize_for_user`` results are keyed by the same kind of
+stamp over the user's TradeTransaction rows.
+"""
+import hashlib
+from datetime import datetime, timezone as dt_timezone
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .models import TradeMaster, TradeTransaction
+
+PREFIX = 'trades:plans'
+_STAMP = {'last': Max('updated_at'), 'rows': Count('id')}
+
+
+def _as_stamp(agg):
+    # (epoch seconds of the newest write, rows): an edit moves the first, a delete the second
+    return (agg['last'].timestamp() if agg['last'] else 0.0, agg['rows'])
+
+
+def _plans(start, end):
+    qs = TradeMaster.objects.all()
+    if start is not None:
+        qs = qs.filter(created_at__gte=start)
+    if end is not None:
+        qs = qs.filter(created_at__lte=end)
+    return qs
+
+
+def range_stamp(start, end):
+    """Write stamp of the plans created in [start, end]; None bounds mean all days."""
+    return _as_stamp(_plans(start, end).aggregate(**_STAMP))
+
+
+async def arange_stamp(start, end):
+    return _as_stamp(await _plans(start, end).aaggregate(**_STAMP))
+
+
+def _is_past(end):
+    return end is not None and end < timezone.localdate()
+
+
+def cached_by_day(dates):
+    """Cache a GET view's response per URL, validated by the write stamp of ``dates(request)``.
+
+    ``dates`` returns the ``(start, end)`` created_at days the response covers.
+    Adds ETag/Last-Modified (conditional requests get a 304). Streaming
+    responses are revalidated but not stored. Works on sync and async views.
+    """
+    def _stamp(request):
+        if not hasattr(request, '_plan_stamp'):
+            request._plan_dates = dates(request)
+            request._plan_stamp = range_stamp(*request._plan_dates)
+        return request._plan_stamp
+
+    def _etag(request, *args, **kwargs):
+        raw = f'{request.get_full_path()}|{_stamp(request)!r}'
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def _last_modified(request, *args, **kwargs):
+        return datetime.fromtimestamp(int(_stamp(request)[0]), tz=dt_timezone.utc)
+
+    def _key(request):
+        _stamp(request)
+        return f'{PREFIX}:resp:{_etag(request)}', request._plan_dates[1]
+
+    def _rendered(response):
+        if hasattr(response, 'render') and callable(response.render):
+            response = response.render()
+        return response
+
+    def _cacheable(response):
+        return response.status_code == 200 and not response.streaming
+
+    def _timeout(end):
+        return None if _is_past(end) else getattr(settings, 'TRADES_CACHE_TODAY_SECONDS', 300)
+
+    def _headers(end, response):
+        max_age = getattr(settings, 'TRADES_CACHE_PAST_MAX_AGE', 3600) if _is_past(end) else 0
+        patch_cache_control(response, public=True, max_age=max_age)
+        return response
+
+    def decorator(view):
+        if iscoroutinefunction(view):
+            async def _cached(request, *args, **kwargs):
+                key, end = _key(request)
+                response = await cache.aget(key)
+                if response is None:
+                    response = _rendered(await view(request, *args, **kwargs))
+                    if _cacheable(response):
+                        await cache.aset(key, response, _timeout(end))
+                return _headers(end, response)
+            conditional = condition(etag_func=_etag, last_modified_func=_last_modified)(_cached)
+
+            @wraps(view)
+            async def _wrapped(request, *args, **kwargs):
+                # stamp first: condition() calls the etag/last-modified functions synchronously
+                request._plan_dates = dates(request)
+                request._plan_stamp = await arange_stamp(*request._plan_dates)
+                return await conditional(request, *args, **kwargs)
+            return _wrapped
+        else:
+            @wraps(view)
+            def _wrapped(request, *args, **kwargs):
+                key, end = _key(request)
+                response = cache.get(key)
+                if response is None:
+                    response = _rendered(view(request, *args, **kwargs))
+                    if _cacheable(response):
+                        cache.set(key, response, _timeout(end))
+                return _headers(end, response)
+        return condition(etag_func=_etag, last_modified_func=_last_modified)(_wrapped)
+    return decorator
+
+
+# ---------------------------------------------------------------------------
+# Per-user memoized stats (trades.analytics)
+
+STATS_PREFIX = 'trades:stats'
+
+
+def memoize_for_user(user_id, parts, compute):
+    """``compute()`` cached under (user, ``parts``) until the user's transactions change."""
+    stamp = _as_stamp(TradeTransaction.objects.filter(created_by_id=user_id).aggregate(**_STAMP))
+    raw = '|'.join(str(p) for p in (user_id, *parts, repr(stamp)))
+    key = f'{STATS_PREFIX}:val:{hashlib.md5(raw.encode()).hexdigest()}'
+    value = cache.get(key)
+    if value is None:
+        value = compute()
+        cache.set(key, value, getattr(settings, 'TRADES_STATS_CACHE_SECONDS', 86400))
+    return value
@@ -0,0 +1,239 @@
+# trades/export.py
+"""Parquet export of TradeTransaction and TradeMaster (needs pyarrow).
+
+Rows are read with ``QuerySet.iterator()`` (a server-side cursor on
+Postgres) and written one Arrow record batch per chunk, so memory follows
+the chunk size. Decimal columns keep their precision as Arrow decimal128.
+
+Datasets written by ``export_dataset`` are hive-partitioned directories
+(``day=YYYY-MM-DD/created_by_id=N/*.parquet`` for transactions,
+``day=YYYY-MM-DD/`` for plans). Each keeps ``_watermark.json`` with the
+end of the last run; incremental runs only add rows changed since then, as
+new files. ``updated_at`` is stamped before the writing transaction
+commits, so each run re-reads ``TRADES_EXPORT_LAG_SECONDS`` before the
+watermark and skips the (id, updated_at) pairs the watermark lists as
+already written. A re-exported row appears once per
+version: keep the latest ``updated_at`` per ``id`` when reading. Deletes
+are not exported. Transactions are read from the history view, so fills
+moved by ``archive_transactions`` keep their ids and are not re-exported.
+"""
+import json
+import shutil
+import uuid
+from datetime import datetime, time, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import models
+from django.db.models import F
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import TradeMaster, TradeTransactionHistory
+
+DEFAULT_CHUNK_SIZE = 50000
+DEFAULT_LAG_SECONDS = 600
+WATERMARK_FILE = '_watermark.json'
+
+# name -> (model, exported fields, partition columns)
+DATASETS = {
+    'transactions': (
+        TradeTransactionHistory,  # hot and archived fills
+        ['id', 'trade_id', 'buy_price', 'sell_price', 'quantity', 'is_ai_correct', 'profit_or_loss',
+         'profit_amount', 'loss_amount', 'created_by_id', 'updated_by_id', 'created_at', 'updated_at'],
+        ['day', 'created_by_id'],
+    ),
+    'plans': (
+        TradeMaster,
+        ['id', 'stock_name', 'option_strike_price_expiry', 'option_buy_price', 'intraday_exit_price_target',
+         'stop_loss_price', 'support_level', 'resistance_level', 'capital_required',
+         'max_loss_if_stop_loss_hits', 'max_profit_if_target_hits', 'news_catalyst_summary',
+         'risk_per_share', 'lot_quantity', 'reward_risk_ratio', 'support_price', 'resistance_price',
+         'created_at', 'updated_at'],
+        ['day'],
+    ),
+}
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Parquet export needs pyarrow (pip install pyarrow).") from e
+    return pyarrow
+
+
+def _arrow_type(pa, field):
+    if isinstance(field, models.ForeignKey):
+        return pa.int64()
+    if isinstance(field, models.DecimalField):
+        return pa.decimal128(field.max_digits, field.decimal_places)
+    if isinstance(field, models.BooleanField):
+        return pa.bool_()
+    if isinstance(field, (models.AutoField, models.BigAutoField, models.IntegerField)):
+        return pa.int64()
+    if isinstance(field, models.DateTimeField):
+        return pa.timestamp('us', tz='UTC')
+    if isinstance(field, models.DateField):
+        return pa.date32()
+    return pa.string()
+
+
+def arrow_schema(name):
+    """Arrow schema of a dataset's exported fields (plus its ``day`` column)."""
+    pa = _pyarrow()
+    model, fields, _ = DATASETS[name]
+    cols = [pa.field(f, _arrow_type(pa, model._meta.get_field(f))) for f in fields]
+    return pa.schema(cols + [pa.field('day', pa.date32())])
+
+
+def dataset_queryset(name, since=None, until=None, user=None, start=None, end=None):
+    """Rows of ``name`` with since < updated_at <= until, optionally one user's and created in [start, end]."""
+    model, fields, _ = DATASETS[name]
+    qs = model.objects.all()
+    if since is not None:
+        qs = qs.filter(updated_at__gt=since)
+    if until is not None:
+        qs = qs.filter(updated_at__lte=until)
+    if user is not None and name == 'transactions':
+        qs = qs.filter(created_by=user)
+    if start is not None:
+        qs = qs.filter(created_at__gte=_day_start(name, start))
+    if end is not None:
+        qs = qs.filter(created_at__lt=_day_start(name, end + timedelta(days=1)))
+    day = TruncDate('created_at') if name == 'transactions' else F('created_at')
+    return qs.annotate(day=day).order_by('updated_at', 'id').values_list(*fields, 'day')
+
+
+def _day_start(name, day):
+    # TradeTransaction.created_at is a datetime, TradeMaster.created_at a date
+    if name == 'transactions':
+        return timezone.make_aware(datetime.combine(day, time.min))
+    return day
+
+
+def iter_batches(name, qs, chunk_size=DEFAULT_CHUNK_SIZE, keep=None):
+    """Arrow record batches of ``chunk_size`` rows from a ``dataset_queryset`` (those ``keep`` accepts)."""
+    pa = _pyarrow()
+    schema = arrow_schema(name)
+    rows = []
+    for row in qs.iterator(chunk_size=chunk_size):
+        if keep is not None and not keep(row):
+            continue
+        rows.append(row)
+        if len(rows) >= chunk_size:
+            yield _batch(pa, schema, rows)
+            rows = []
+    if rows:
+        yield _batch(pa, schema, rows)
+
+
+def _batch(pa, schema, rows):
+    columns = list(zip(*rows))
+    return pa.RecordBatch.from_arrays(
+        [pa.array(col, type=f.type) for col, f in zip(columns, schema)], schema=schema,
+    )
+
+
+def read_watermark(root):
+    path = Path(root) / WATERMARK_FILE
+    if not path.exists():
+        return None
+    return json.loads(path.read_text())
+
+
+def _write_watermark(root, updated_at, rows, recent):
+    (Path(root) / WATERMARK_FILE).write_text(json.dumps({
+        'updated_at': updated_at.isoformat(),
+        'rows': rows,
+        'exported_at': timezone.now().isoformat(),
+        'recent': sorted(recent),  # [id, updated_at] written inside the next run's overlap
+    }))
+
+
+def export_dataset(name, out_dir, incremental=False, overwrite=False, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Write dataset ``name`` under ``out_dir/name``; returns ``{'rows', 'files', 'since', 'until'}``."""
+    pa = _pyarrow()
+    root = Path(out_dir) / name
+    mark = read_watermark(root)
+    if mark and not incremental:
+        if not overwrite:
+            raise ValueError(f"{root} already holds an export; use incremental mode or overwrite it")
+        shutil.rmtree(root)
+        mark = None
+    root.mkdir(parents=True, exist_ok=True)
+
+    since = datetime.fromisoformat(mark['updated_at']) if (incremental and mark) else None
+    until = timezone.now()  # fixed upper bound, becomes the next watermark
+    lag = timedelta(seconds=getattr(settings, 'TRADES_EXPORT_LAG_SECONDS', DEFAULT_LAG_SECONDS))
+    # rows stamped before `since` whose transaction committed after the last run read
+    floor = since - lag if since is not None else None
+    done = {tuple(k) for k in mark.get('recent', [])} if since is not None else set()
+    recent = set()
+    at = DATASETS[name][1].index('updated_at')
+
+    def keep(row):
+        key = (row[0], row[at].isoformat())
+        if key in done:
+            return False
+        if row[at] > until - lag:
+            recent.add(key)
+        return True
+
+    run = uuid.uuid4().hex[:12]
+    rows = files = 0
+    for i, batch in enumerate(iter_batches(name, dataset_queryset(name, floor, until), chunk_size, keep)):
+        written = []
+        pa.parquet.write_to_dataset(
+            pa.Table.from_batches([batch]), root,
+            partition_cols=DATASETS[name][2],
+            basename_template=f'{run}-{i:05d}-{{i}}.parquet',
+            file_visitor=written.append,
+        )
+        rows += batch.num_rows
+        files += len(written)
+    # pairs still inside the overlap stay listed until they age out of it
+    recent |= {k for k in done if datetime.fromisoformat(k[1]) > until - lag}
+    _write_watermark(root, until, rows, recent)
+    return {'rows': rows, 'files': files, 'since': since, 'until': until}
+
+
+class _Pipe:
+    # write-only file object handing finished bytes to a streaming response
+    closed = False
+
+    def __init__(self):
+        self.chunks, self.pos = [], 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.pos += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.pos
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        out, self.chunks = b''.join(self.chunks), []
+        return out
+
+
+def stream_parquet(name, qs, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield one Parquet file's bytes for ``qs``, a row group per chunk."""
+    pa = _pyarrow()
+    pipe = _Pipe()
+    writer = pa.parquet.ParquetWriter(pipe, arrow_schema(name))
+    try:
+        for batch in iter_batches(name, qs, chunk_size):
+            writer.write_batch(batch)
+            yield pipe.drain()
+    finally:
+        writer.close()
+    yield pipe.drain()
@@ -1,6 +1,9 @@
 # trades/filters.py
+from datetime import timedelta
+
 import django_filters
 from django import forms
+from django.utils import timezone
 from .models import TradeMaster
 
 class TradePlanFilter(django_filters.FilterSet):
@@ -12,12 +15,57 @@ class TradePlanFilter(django_filters.FilterSet):
     )
     stock_name = django_filters.CharFilter(
         field_name='stock_name', lookup_expr='icontains', label='Ticker'
+    )  # trigram index tm_stock_trgm on Postgres
+    # parsed Instrument columns (indexed): e.g. ?date=&underlying=NIFTY&expiring=week
+    underlying = django_filters.CharFilter(method='filter_underlying', label='Underlying')
+    strike = django_filters.NumberFilter(field_name='instrument__strike', label='Strike')
+    option_type = django_filters.ChoiceFilter(
+        field_name='instrument__option_type', choices=[('CE', 'Call'), ('PE', 'Put')], label='Type'
+    )
+    expiry_from = django_filters.DateFilter(
+        field_name='instrument__expiry', lookup_expr='gte', label='Expiry from',
+        widget=forms.DateInput(attrs={'type': 'date'})
+    )
+    expiry_to = django_filters.DateFilter(
+        field_name='instrument__expiry', lookup_expr='lte', label='Expiry to',
+        widget=forms.DateInput(attrs={'type': 'date'})
+    )
+    expiring = django_filters.ChoiceFilter(
+        method='filter_expiring', choices=[('week', 'This week'), ('month', 'This month')], label='Expiring'
     )
     profit_or_loss = django_filters.ChoiceFilter(
         field_name='profit_or_loss',
         choices=[('Profit', 'Profit'), ('Loss', 'Loss')],
         label='P/L'
     )
+    min_reward_risk = django_filters.NumberFilter(
+        field_name='reward_risk_ratio', lookup_expr='gte', label='Min reward/risk'
+    )
+    max_risk_per_share = django_filters.NumberFilter(
+        field_name='risk_per_share', lookup_expr='lte', label='Max risk/share'
+    )
+    o = django_filters.OrderingFilter(
+        fields=(
+            ('reward_risk_ratio', 'rr'),
+            ('risk_per_share', 'risk'),
+            ('lot_quantity', 'qty'),
+            ('stock_name', 'ticker'),
+        ),
+        label='Sort',
+    )  # stored columns, indexed with created_at
+
+    def filter_underlying(self, queryset, name, value):
+        return queryset.filter(instrument__underlying=value.strip().upper())  # stored upper-case
+
+    def filter_expiring(self, queryset, name, value):
+        today = timezone.localdate()
+        if value == 'week':
+            start = today - timedelta(days=today.weekday())
+            end = start + timedelta(days=6)
+        else:
+            start = today.replace(day=1)
+            end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        return queryset.filter(instrument__expiry__gte=start, instrument__expiry__lte=end)
 
     class Meta:
         model = TradeMaster
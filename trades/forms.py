@@ -1,6 +1,6 @@
 # trades/forms.py
 from django import forms
-from django.forms import ModelChoiceField, modelformset_factory
+from django.forms import ModelChoiceField, formset_factory, modelformset_factory
 from .models import TradeMaster, TradeProfitLoss, TradeTransaction
 
 # ----- Profit/Loss formset -----
@@ -59,15 +59,11 @@ class TradeProfitLossForm(forms.ModelForm):
             cleaned['profit_amount'] = None; cleaned['loss_amount'] = None
         return cleaned
 
-# ----- Trade News formset -----
-class TradeNewsForm(forms.ModelForm):
-    class Meta:
-        model = TradeMaster
-        fields = ['news_catalyst_summary']
+class TradeResultEntryForm(TradeProfitLossForm):
+    # one plan's result on the plan page; the user's TradeProfitLoss row is created on first save
+    trade_id = forms.IntegerField(widget=forms.HiddenInput)
 
-TradeNewsFormSet = modelformset_factory(
-    TradeMaster, form=TradeNewsForm, extra=0, can_delete=False
-)
+TradeResultEntryFormSet = formset_factory(TradeResultEntryForm, extra=0)
 
 # ----- Transactions -----
 class TradeChoiceField(ModelChoiceField):
@@ -0,0 +1,304 @@
+# trades/importer.py
+import hashlib
+import logging
+from decimal import Decimal, ROUND_HALF_UP
+
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+
+from .models import LEVEL_RE, TradeMaster, resolve_instruments
+
+logger = logging.getLogger(__name__)
+
+NUMERIC_COLS = [
+    'Option Buy Price (₹)',
+    'Intraday Exit Price Target (₹)',
+    'Stop Loss Price (₹)',
+    'Capital Required (₹)',
+    'Max Loss If Stop Loss Hits (₹)',
+    'Max Profit If Target Hits (₹)',
+]
+
+# model field -> sheet header
+DECIMAL_FIELDS = {
+    'option_buy_price': 'Option Buy Price (₹)',
+    'intraday_exit_price_target': 'Intraday Exit Price Target (₹)',
+    'stop_loss_price': 'Stop Loss Price (₹)',
+    'capital_required': 'Capital Required (₹)',
+    'max_loss_if_stop_loss_hits': 'Max Loss If Stop Loss Hits (₹)',
+    'max_profit_if_target_hits': 'Max Profit If Target Hits (₹)',
+}
+TEXT_FIELDS = {
+    'stock_name': 'Stock Name',
+    'option_strike_price_expiry': 'Option Strike Price & Expiry',
+    'support_level': 'Support Level (₹)',
+    'resistance_level': 'Resistance Level (₹)',
+    'news_catalyst_summary': 'News Catalyst Summary',
+}
+REQUIRED_COLS = ['Stock Name', 'Option Strike Price & Expiry', *NUMERIC_COLS]
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_CHUNK_SIZE = 5000
+CENT = Decimal('0.01')
+
+
+def _clean_numeric_strings(s):
+    # remove ₹ and commas, keep the textual value so Decimals stay exact
+    return s.astype(str).str.replace(r'[₹,]', '', regex=True).str.strip()
+
+
+def _to_decimal(v):
+    return Decimal(v).quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+def _to_decimal_series(s):
+    # whole-column Decimal conversion at the column's 2dp; unparseable cells become None
+    text = _clean_numeric_strings(s)
+    valid = pd.to_numeric(text, errors='coerce').notna()
+    return text.where(valid).map(_to_decimal, na_action='ignore').astype(object).where(valid, None)
+
+
+def _to_text_series(df, col):
+    if col not in df.columns:
+        return pd.Series([''] * len(df), index=df.index, dtype=object)
+    return df[col].fillna('').astype(str).str.strip()
+
+
+def normalize_columns(df):
+    # standardize column names (keeps exact headers if already matching)
+    df.columns = [str(c).strip() for c in df.columns]
+    missing = [c for c in REQUIRED_COLS if c not in df.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    return df
+
+
+def frame_to_instances(df):
+    """Build unsaved TradeMaster rows from whole DataFrame columns.
+
+    Returns ``(instances, invalid)`` where ``invalid`` counts rows missing a
+    required price/capital value.
+    """
+    columns = {f: _to_decimal_series(df[col]) for f, col in DECIMAL_FIELDS.items()}
+    columns.update({f: _to_text_series(df, col) for f, col in TEXT_FIELDS.items()})
+    frame = pd.DataFrame(columns, index=df.index)
+
+    ok = frame[list(DECIMAL_FIELDS)].notna().all(axis=1)
+    invalid = int((~ok).sum())
+    records = add_fingerprints(add_metrics(frame[ok].copy())).to_dict('records')
+    return [TradeMaster(**r) for r in records], invalid
+
+
+def _level_series(s):
+    # first number of each free-text level, as in models.parse_level
+    num = _clean_numeric_strings(s).str.extract(f'({LEVEL_RE.pattern})', expand=False)
+    return num.map(_to_decimal, na_action='ignore').astype(object).where(num.notna(), None)
+
+
+def add_metrics(frame):
+    """Fill TradeMaster.METRIC_FIELDS for whole columns (same results as models.plan_metrics)."""
+    entry = frame['option_buy_price']
+    risk = entry - frame['stop_loss_price']
+    sized = entry > 0
+    has_risk = risk > 0
+    frame['risk_per_share'] = risk
+    frame['lot_quantity'] = (
+        (frame['capital_required'] // entry.where(sized, 1)).map(int).astype(object).where(sized, None)
+    )
+    frame['reward_risk_ratio'] = (
+        ((frame['intraday_exit_price_target'] - entry) / risk.where(has_risk, 1))
+        .map(_to_decimal).astype(object).where(has_risk, None)
+    )
+    frame['support_price'] = _level_series(frame['support_level'])
+    frame['resistance_price'] = _level_series(frame['resistance_level'])
+    return frame
+
+
+def add_fingerprints(frame):
+    """Column-wise ``plan_fingerprint``: canonical text per row, then one sha256 each."""
+    parts = []
+    for f in TradeMaster.FINGERPRINT_FIELDS:
+        col = frame[f]
+        if f in DECIMAL_FIELDS:
+            parts.append(col.map(str))  # already Decimals at 2dp
+        else:
+            parts.append(col.astype(str).str.split().str.join(' '))
+    raw = parts[0].str.cat(parts[1:], sep='\x1f')
+    frame['fingerprint'] = [hashlib.sha256(r.encode()).hexdigest() for r in raw]
+    return frame
+
+
+def _existing_keys(objs):
+    # one indexed lookup per batch on the unique fingerprint
+    return set(
+        TradeMaster.objects
+        .filter(fingerprint__in=[o.fingerprint for o in objs])
+        .values_list('fingerprint', flat=True)
+    )
+
+
+def attach_instruments(objs):
+    """Set ``instrument_id`` on unsaved plans, one lookup for the batch's distinct option strings."""
+    ids = resolve_instruments([(o.option_strike_price_expiry, o.stock_name) for o in objs])
+    for obj in objs:
+        obj.instrument_id = ids[(obj.option_strike_price_expiry, obj.stock_name)]
+
+
+def bulk_insert(objs, batch_size=None):
+    """Insert ``objs`` in batches, skipping rows that already exist.
+
+    Returns ``(created, skipped)``.
+    """
+    batch_size = batch_size or getattr(settings, 'TRADES_IMPORT_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+    seen = set()
+    created = skipped = 0
+    for i in range(0, len(objs), batch_size):
+        batch = objs[i:i + batch_size]
+        seen |= _existing_keys(batch)
+        fresh = []
+        for obj in batch:
+            key = obj.fingerprint
+            if key in seen:
+                skipped += 1
+                continue
+            seen.add(key)
+            fresh.append(obj)
+        attach_instruments(fresh)
+        # ignore_conflicts covers rows inserted concurrently by another upload
+        TradeMaster.objects.bulk_create(fresh, ignore_conflicts=True)
+        inserted = _inserted(fresh)
+        created += inserted
+        skipped += len(fresh) - inserted
+    return created, skipped
+
+
+def _inserted(objs):
+    # rows dropped by ignore_conflicts get no pk back; ours carry the updated_at set on insert
+    if not objs:
+        return 0
+    stored = dict(
+        TradeMaster.objects
+        .filter(fingerprint__in=[o.fingerprint for o in objs])
+        .values_list('fingerprint', 'updated_at')
+    )
+    return sum(stored.get(o.fingerprint) == o.updated_at for o in objs)
+
+
+def import_frame(df, batch_size=None):
+    """Import a parsed plan sheet in one transaction.
+
+    Duplicates of existing rows (or of earlier rows in the same sheet) are
+    skipped instead of aborting the file.
+    """
+    df = normalize_columns(df)
+    objs, invalid = frame_to_instances(df)
+    with transaction.atomic():
+        created, skipped = bulk_insert(objs, batch_size=batch_size)
+    return {'rows': len(df), 'created': created, 'skipped': skipped, 'invalid': invalid}
+
+
+# ---------------------------------------------------------------------------
+# Streaming mode: peak memory follows chunk size, not file size
+
+UPLOAD_EXTENSIONS = ('.csv', '.xlsx', '.xls')
+
+
+def check_upload_name(name):
+    if not name.lower().endswith(UPLOAD_EXTENSIONS):
+        raise ValueError('File must be .xlsx, .xls or .csv')
+
+
+def read_upload(file):
+    name = file.name.lower()
+    if name.endswith('.csv'):
+        # parse numbers with thousands separators
+        return pd.read_csv(file, thousands=',')
+    if name.endswith(('.xlsx', '.xls')):
+        return pd.read_excel(file)
+    raise ValueError('File must be .xlsx, .xls or .csv')
+
+
+def _iter_xlsx_chunks(file, chunk_size):
+    from openpyxl import load_workbook
+
+    wb = load_workbook(file, read_only=True, data_only=True)  # row-streamed reader
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = ['' if c is None else str(c) for c in header]
+        buf = []
+        for row in rows:
+            buf.append(row)
+            if len(buf) >= chunk_size:
+                yield pd.DataFrame(buf, columns=columns)
+                buf = []
+        if buf:
+            yield pd.DataFrame(buf, columns=columns)
+    finally:
+        wb.close()
+
+
+def iter_upload_chunks(file, chunk_size=None):
+    """Yield the upload as DataFrames of at most ``chunk_size`` rows."""
+    chunk_size = chunk_size or getattr(settings, 'TRADES_IMPORT_CHUNK_SIZE', DEFAULT_CHUNK_SIZE)
+    name = file.name.lower()
+    if name.endswith('.csv'):
+        yield from pd.read_csv(file, thousands=',', chunksize=chunk_size)
+    elif name.endswith('.xlsx'):
+        yield from _iter_xlsx_chunks(file, chunk_size)
+    elif name.endswith('.xls'):
+        # legacy .xls has no streaming reader; slice the loaded sheet instead
+        df = pd.read_excel(file)
+        for i in range(0, len(df), chunk_size):
+            yield df.iloc[i:i + chunk_size]
+    else:
+        raise ValueError('File must be .xlsx, .xls or .csv')
+
+
+def import_chunks(chunks, batch_size=None, progress=None):
+    """Import DataFrame chunks, committing each one on its own.
+
+    Rows committed by earlier chunks are found by the duplicate lookup, so
+    nothing is carried between chunks. ``progress`` is called with the
+    running totals after every commit.
+    """
+    totals = {'rows': 0, 'created': 0, 'skipped': 0, 'invalid': 0, 'chunks': 0}
+    for df in chunks:
+        df = normalize_columns(df)
+        objs, invalid = frame_to_instances(df)
+        with transaction.atomic():
+            created, skipped = bulk_insert(objs, batch_size=batch_size)
+        totals['rows'] += len(df)
+        totals['created'] += created
+        totals['skipped'] += skipped
+        totals['invalid'] += invalid
+        totals['chunks'] += 1
+        logger.info("plan import chunk %(chunks)s: %(rows)s rows, %(created)s created", totals)
+        if progress:
+            progress(dict(totals))
+    return totals
+
+
+# ---------------------------------------------------------------------------
+
+IMPORT_MODES = ('bulk', 'stream')
+
+
+def import_upload(file, mode='bulk', batch_size=None, chunk_size=None, progress=None):
+    """Parse and import an uploaded plan sheet in-process.
+
+    Shared by the DRF endpoint and the admin upload view. Plans are never
+    overwritten, so ``updated`` is always 0; it is kept so callers can show
+    the usual created/updated/skipped summary.
+    """
+    if mode not in IMPORT_MODES:
+        raise ValueError(f"Unknown import mode: {mode}")
+    if mode == 'stream':
+        result = import_chunks(iter_upload_chunks(file, chunk_size), batch_size=batch_size, progress=progress)
+    else:
+        result = import_frame(read_upload(file), batch_size=batch_size)
+    return {**result, 'updated': 0}
+
@@ -0,0 +1,110 @@
+# trades/jobs.py
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .importer import import_upload
+from .models import ImportJob
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(file, user=None, mode='stream'):
+    """Store the upload and queue it for ``manage.py import_worker``."""
+    user = user if user is not None and user.is_authenticated else None
+    return ImportJob.objects.create(file=file, original_name=file.name, mode=mode, created_by=user)
+
+
+def _count_rows(fh, name):
+    # cheap estimate for ETA; quoted multi-line cells make it an upper bound
+    name = name.lower()
+    if name.endswith('.csv'):
+        lines = sum(1 for _ in fh)
+        fh.seek(0)
+        return max(lines - 1, 0)
+    if name.endswith('.xlsx'):
+        from openpyxl import load_workbook
+        wb = load_workbook(fh, read_only=True)
+        try:
+            rows = wb.active.max_row
+        finally:
+            wb.close()
+        fh.seek(0)
+        return max((rows or 1) - 1, 0)
+    return None
+
+
+def claim_next():
+    """Mark the oldest queued job as running and return it, or None."""
+    candidates = (ImportJob.objects
+                  .filter(status=ImportJob.QUEUED)
+                  .order_by('created_at', 'id')
+                  .values_list('pk', flat=True)[:10])
+    for pk in candidates:
+        now = timezone.now()
+        # conditional update so two workers never both win the same row
+        won = (ImportJob.objects
+               .filter(pk=pk, status=ImportJob.QUEUED)
+               .update(status=ImportJob.RUNNING, started_at=now, updated_at=now))
+        if won:
+            return ImportJob.objects.get(pk=pk)
+    return None
+
+
+def requeue_stale(minutes=None):
+    """Requeue jobs left running by a dead worker. Imports skip duplicates, so a rerun is safe."""
+    minutes = minutes or getattr(settings, 'TRADES_IMPORT_STALE_MINUTES', 30)
+    cutoff = timezone.now() - timedelta(minutes=minutes)
+    return (ImportJob.objects
+            .filter(status=ImportJob.RUNNING, updated_at__lt=cutoff)
+            .update(status=ImportJob.QUEUED, started_at=None, updated_at=timezone.now()))
+
+
+def run_job(job):
+    def _progress(totals):
+        ImportJob.objects.filter(pk=job.pk).update(
+            rows_processed=totals['rows'],
+            rows_failed=totals['invalid'],
+            created_count=totals['created'],
+            skipped_count=totals['skipped'],
+            updated_at=timezone.now(),
+        )
+
+    try:
+        with job.file.open('rb') as fh:
+            total = _count_rows(fh, job.file.name)
+            ImportJob.objects.filter(pk=job.pk).update(rows_total=total)
+            result = import_upload(fh, mode=job.mode, progress=_progress)
+    except Exception as e:
+        logger.exception("import job %s failed", job.pk)
+        ImportJob.objects.filter(pk=job.pk).update(
+            status=ImportJob.FAILED, error=str(e)[:2000], finished_at=timezone.now(), updated_at=timezone.now(),
+        )
+        return None
+
+    _progress(result)
+    job.file.storage.delete(job.file.name)  # keep failed uploads for a retry, drop finished ones
+    ImportJob.objects.filter(pk=job.pk).update(
+        status=ImportJob.DONE, file='', finished_at=timezone.now(), updated_at=timezone.now(),
+    )
+    return result
+
+
+def job_payload(job):
+    return {
+        'id': job.pk,
+        'file': job.original_name,
+        'status': job.status,
+        'rows_total': job.rows_total,
+        'rows_processed': job.rows_processed,
+        'rows_failed': job.rows_failed,
+        'created': job.created_count,
+        'skipped': job.skipped_count,
+        'eta_seconds': job.eta_seconds(),
+        'error': job.error,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }
@@ -0,0 +1,343 @@
+# trades/ledger.py
+"""Per-(trade, user) P/L ledger kept on TradeProfitLoss.net_amount, and the
+per-day TradeDailyRollup behind the account summary dashboard.
+
+Single saves apply the changed row's delta with one F-expression UPDATE;
+``recompute`` rebuilds chosen keys from TradeTransaction with one grouped
+aggregate and one bulk upsert. Inside ``batched()`` saves only mark their
+keys dirty and the whole set is recomputed once before the commit.
+Rebuilds read TradeTransactionHistory, so archived fills keep counting;
+moving fills to the archive runs under ``suppressed()``.
+"""
+import threading
+from contextlib import contextmanager
+from datetime import datetime, time, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import transaction
+from django.utils import timezone
+from django.db.models import Case, Count, DecimalField, ExpressionWrapper, F, Sum, Value, When
+from django.db.models.functions import TruncDate
+
+from .models import TradeDailyRollup, TradeProfitLoss, TradeTransactionHistory
+
+AMOUNT = DecimalField(max_digits=14, decimal_places=2)
+
+_local = threading.local()  # active batch / suppression, per thread
+
+NET_EXPR = ExpressionWrapper(
+    (F('sell_price') - F('buy_price')) * F('quantity'),
+    output_field=DecimalField(max_digits=18, decimal_places=2),
+)  # (sell - buy) * qty in the DB
+
+
+def _quantize2(v: Decimal) -> Decimal:
+    return (v or Decimal('0')).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def pl_fields(net):
+    # Profit for a non-negative net, otherwise Loss with the absolute amount
+    if net >= 0:
+        return {'profit_or_loss': 'Profit', 'profit_amount': net, 'loss_amount': None}
+    return {'profit_or_loss': 'Loss', 'profit_amount': None, 'loss_amount': -net}
+
+
+def apply_delta(trade_id, user_id, delta, updated_by_id=None, recompute_missing=True):
+    """Add ``delta`` to one ledger row atomically; recompute it if the row is missing.
+
+    Deletes pass ``recompute_missing=False``: in a trade/user cascade the
+    ledger row is gone before the fills' post_delete, and recomputing would
+    insert a row for the object being deleted.
+    """
+    new_net = F('net_amount') + Value(delta, output_field=AMOUNT)
+    # in an UPDATE every column reads the old net_amount, so "new >= 0" is "old >= -delta"
+    is_profit = When(net_amount__gte=-delta, then=Value('Profit'))
+    updated = (TradeProfitLoss.objects
+               .filter(trade_id=trade_id, created_by_id=user_id)
+               .update(
+                   net_amount=new_net,
+                   profit_or_loss=Case(is_profit, default=Value('Loss')),
+                   profit_amount=Case(When(net_amount__gte=-delta, then=new_net), default=None, output_field=AMOUNT),
+                   loss_amount=Case(When(net_amount__lt=-delta, then=-new_net), default=None, output_field=AMOUNT),
+                   updated_by_id=updated_by_id or user_id,
+                   updated_at=timezone.now(),  # update() skips auto_now
+               ))
+    if not updated and recompute_missing:
+        recompute([(trade_id, user_id)])
+
+
+def apply_change(old, new, updated_by_id=None):
+    """Move a transaction's contribution from ``old`` to ``new`` state.
+
+    States are ``(trade_id, user_id, net)`` tuples or None (no row / unknown).
+    """
+    if old is None:
+        if new is not None:
+            apply_delta(new[0], new[1], new[2], updated_by_id)
+        return
+    if new is None:
+        apply_delta(old[0], old[1], -old[2], updated_by_id, recompute_missing=False)  # delete
+        return
+    if old[:2] == new[:2]:
+        delta = new[2] - old[2]
+        if delta:
+            apply_delta(new[0], new[1], delta, updated_by_id)
+        return
+    apply_delta(old[0], old[1], -old[2], updated_by_id)
+    apply_delta(new[0], new[1], new[2], updated_by_id)
+
+
+def net_by_key(keys=None):
+    """{(trade_id, user_id): net} from all fills (hot and archived) in one grouped query."""
+    keys = None if keys is None else set(keys)
+    nets = _fill_nets(keys)
+    if keys is not None:
+        nets = {k: nets.get(k, Decimal('0.00')) for k in keys}
+    return nets
+
+
+def _fill_nets(keys=None):
+    # only keys that still have fills
+    qs = TradeTransactionHistory.objects.all()
+    if keys is not None:
+        qs = qs.filter(trade_id__in={k[0] for k in keys}, created_by_id__in={k[1] for k in keys})
+    rows = (qs.values('trade_id', 'created_by_id')
+              .annotate(net=Sum(NET_EXPR))
+              .order_by()
+              .values_list('trade_id', 'created_by_id', 'net'))
+    nets = {(t, u): _quantize2(n) for t, u, n in rows}
+    if keys is not None:
+        nets = {k: n for k, n in nets.items() if k in keys}
+    return nets
+
+
+def recompute(keys=None):
+    """Rebuild ledger rows from scratch; all keys with transactions when ``keys`` is None."""
+    keys = None if keys is None else set(keys)
+    if keys is not None and not keys:
+        return 0
+    nets = _fill_nets(keys)
+    if keys is not None:
+        # keys left without fills only zero their existing rows: inserting could hit a trade/user
+        # that is being deleted (cascades inside batched())
+        for t, u in keys - set(nets):
+            TradeProfitLoss.objects.filter(trade_id=t, created_by_id=u).update(
+                net_amount=0, updated_at=timezone.now(), **pl_fields(Decimal('0.00')))
+    objs = [
+        TradeProfitLoss(trade_id=t, created_by_id=u, updated_by_id=u, net_amount=net, **pl_fields(net))
+        for (t, u), net in nets.items()
+    ]
+    TradeProfitLoss.objects.bulk_create(
+        objs,
+        update_conflicts=True,
+        unique_fields=['trade', 'created_by'],
+        update_fields=['net_amount', 'profit_or_loss', 'profit_amount', 'loss_amount', 'updated_by', 'updated_at'],
+    )  # one upsert per call
+    return len(objs)
+
+
+# ---------------------------------------------------------------------------
+# Daily rollup (TradeDailyRollup), same delta/recompute scheme keyed by day
+
+CAPITAL_EXPR = ExpressionWrapper(
+    F('quantity') * F('buy_price'),
+    output_field=DecimalField(max_digits=18, decimal_places=2),
+)
+
+
+def _day_bounds(first, last):
+    start = timezone.make_aware(datetime.combine(first, time.min))
+    end = timezone.make_aware(datetime.combine(last + timedelta(days=1), time.min))
+    return start, end  # [first, last] as [first 00:00, day after last 00:00)
+
+
+def _rollup_rows(qs):
+    return (qs.annotate(day=TruncDate('updated_at'))
+              .values('trade_id', 'created_by_id', 'day', 'profit_or_loss')
+              .annotate(
+                  n=Count('id'),
+                  profit=Sum('profit_amount'),
+                  loss=Sum('loss_amount'),
+                  capital=Sum(CAPITAL_EXPR),
+              )
+              .order_by())
+
+
+def _rollup_obj(row):
+    return TradeDailyRollup(
+        trade_id=row['trade_id'],
+        created_by_id=row['created_by_id'],
+        day=row['day'],
+        profit_or_loss=row['profit_or_loss'],
+        count=row['n'],
+        profit_total=row['profit'] or 0,
+        loss_total=row['loss'] or 0,
+        capital_total=row['capital'] or 0,
+    )
+
+
+def recompute_days(keys):
+    """Rebuild the rollup rows of the given (trade_id, user_id, day) keys."""
+    keys = set(keys)
+    if not keys:
+        return 0
+    trades = {k[0] for k in keys}
+    users = {k[1] for k in keys}
+    days = {k[2] for k in keys}
+    start, end = _day_bounds(min(days), max(days))
+    qs = TradeTransactionHistory.objects.filter(
+        trade_id__in=trades, created_by_id__in=users, updated_at__gte=start, updated_at__lt=end,
+    )
+    objs = [_rollup_obj(r) for r in _rollup_rows(qs) if (r['trade_id'], r['created_by_id'], r['day']) in keys]
+
+    fresh = {(o.trade_id, o.created_by_id, o.day, o.profit_or_loss) for o in objs}
+    stale = [
+        pk for pk, t, u, d, pol in (TradeDailyRollup.objects
+                                    .filter(trade_id__in=trades, created_by_id__in=users, day__in=days)
+                                    .values_list('pk', 'trade_id', 'created_by_id', 'day', 'profit_or_loss'))
+        if (t, u, d) in keys and (t, u, d, pol) not in fresh
+    ]  # fills that moved to another day or were deleted
+    if stale:
+        TradeDailyRollup.objects.filter(pk__in=stale).delete()
+    TradeDailyRollup.objects.bulk_create(
+        objs,
+        update_conflicts=True,
+        unique_fields=['created_by', 'day', 'trade', 'profit_or_loss'],
+        update_fields=['count', 'profit_total', 'loss_total', 'capital_total'],
+    )
+    return len(objs)
+
+
+def rebuild_days(user_ids=None, batch_size=5000):
+    """Drop and rebuild the rollup from every fill, archived ones included (optionally for some users)."""
+    qs = TradeTransactionHistory.objects.all()
+    existing = TradeDailyRollup.objects.all()
+    if user_ids:
+        qs = qs.filter(created_by_id__in=user_ids)
+        existing = existing.filter(created_by_id__in=user_ids)
+    existing.delete()
+    created, buf = 0, []
+    for row in _rollup_rows(qs).iterator(chunk_size=batch_size):
+        buf.append(_rollup_obj(row))
+        if len(buf) >= batch_size:
+            created += len(TradeDailyRollup.objects.bulk_create(buf))
+            buf = []
+    created += len(TradeDailyRollup.objects.bulk_create(buf))
+    return created
+
+
+def _apply_rollup(key, amounts, sign):
+    t, u, day, pol = key
+    n, profit, loss, capital = amounts
+    rows = TradeDailyRollup.objects.filter(created_by_id=u, day=day, trade_id=t, profit_or_loss=pol)
+    updated = rows.update(
+        count=F('count') + sign * n,
+        profit_total=F('profit_total') + Value(sign * profit, output_field=AMOUNT),
+        loss_total=F('loss_total') + Value(sign * loss, output_field=AMOUNT),
+        capital_total=F('capital_total') + Value(sign * capital, output_field=AMOUNT),
+    )
+    if not updated:
+        if sign > 0:
+            recompute_days([(t, u, day)])
+        # else: nothing to take the fill out of (deleted with its trade/user in a cascade)
+    elif sign < 0:
+        rows.filter(count__lte=0).delete()
+
+
+def apply_rollup_change(old, new):
+    """Move a transaction's rollup contribution from ``old`` to ``new`` (``rollup_state()`` values)."""
+    if old and new and old[0] == new[0]:
+        delta = tuple(b - a for a, b in zip(old[1], new[1]))
+        if any(delta):
+            _apply_rollup(new[0], delta, 1)
+        return
+    if old:
+        _apply_rollup(old[0], old[1], -1)
+    if new:
+        _apply_rollup(new[0], new[1], 1)
+
+
+# ---------------------------------------------------------------------------
+# Coalesced writes
+
+class _Batch:
+    def __init__(self):
+        self.tpl = set()   # (trade_id, user_id)
+        self.days = set()  # (trade_id, user_id, day)
+
+
+def _batch():
+    return getattr(_local, 'batch', None)
+
+
+@contextmanager
+def batched():
+    """Run a block of transaction writes in one DB transaction with one ledger rollup.
+
+    Signals inside the block only collect dirty P/L and day keys; on a
+    clean exit those keys are recomputed together just before the commit.
+    Nested blocks join the outermost one.
+    """
+    if _batch() is not None:
+        yield _batch()
+        return
+    batch = _Batch()
+    _local.batch = batch
+    try:
+        with transaction.atomic():
+            yield batch
+            recompute(batch.tpl)
+            recompute_days(batch.days)
+    finally:
+        _local.batch = None
+
+
+@contextmanager
+def suppressed():
+    """Ignore TradeTransaction signals in this block.
+
+    For writes that do not change the ledger, i.e. moving fills between
+    TradeTransaction and TradeTransactionArchive.
+    """
+    prev = is_suppressed()
+    _local.suppressed = True
+    try:
+        yield
+    finally:
+        _local.suppressed = prev
+
+
+def is_suppressed():
+    return getattr(_local, 'suppressed', False)
+
+
+def mark_dirty(keys, days=()):
+    """Queue keys for the active batch, or recompute now when there is none.
+
+    For writes that bypass model signals (``bulk_create``/``bulk_update``):
+    ``keys`` are (trade_id, user_id) pairs, ``days`` (trade_id, user_id, day).
+    """
+    batch = _batch()
+    if batch is None:
+        recompute(keys)
+        recompute_days(days)
+    else:
+        batch.tpl.update(keys)
+        batch.days.update(days)
+
+
+def track_change(old, new, updated_by_id=None):
+    # signal entry point: coalesce inside batched(), otherwise apply the delta
+    batch = _batch()
+    if batch is None:
+        apply_change(old, new, updated_by_id)
+        return
+    batch.tpl.update(state[:2] for state in (old, new) if state is not None)
+
+
+def track_rollup(old, new):
+    batch = _batch()
+    if batch is None:
+        apply_rollup_change(old, new)
+        return
+    batch.days.update(state[0][:3] for state in (old, new) if state is not None)
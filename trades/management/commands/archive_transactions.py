@@ -0,0 +1,27 @@
+# trades/management/commands/archive_transactions.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from trades.archive import DEFAULT_BATCH_SIZE, archive_before, archive_cutoff
+from trades.models import TradeTransaction
+
+
+class Command(BaseCommand):
+    help = "Move TradeTransaction rows older than the hot window to TradeTransactionArchive."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-days', type=int,
+                            help='Days of fills to keep hot (default and minimum: TRADES_HOT_DAYS).')
+        parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would move.')
+
+    def handle(self, *args, keep_days, batch_size, dry_run, **options):
+        if keep_days is not None and keep_days < settings.TRADES_HOT_DAYS:
+            self.stderr.write(f"--keep-days raised to TRADES_HOT_DAYS ({settings.TRADES_HOT_DAYS}).")
+        cutoff = archive_cutoff(keep_days)
+        if dry_run:
+            n = TradeTransaction.objects.filter(created_at__lt=cutoff).count()
+            self.stdout.write(f"{n} fill(s) created before {cutoff:%Y-%m-%d} would be archived.")
+            return
+        moved = archive_before(cutoff, batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f"Archived {moved} fill(s) created before {cutoff:%Y-%m-%d}."))
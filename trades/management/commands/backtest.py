@@ -0,0 +1,41 @@
+# trades/management/commands/backtest.py
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from trades.backtest import plans_frame, run_backtest
+
+
+def _date(s):
+    return datetime.strptime(s, '%Y-%m-%d').date()
+
+
+class Command(BaseCommand):
+    help = "Replay TradeMaster plans against intraday bar files and report hit rate, expectancy and drawdown."
+
+    def add_arguments(self, parser):
+        parser.add_argument('bars_dir', help='Directory of <instrument>.csv / .parquet bar files.')
+        parser.add_argument('--start', type=_date, help='First plan day (YYYY-MM-DD), default today.')
+        parser.add_argument('--end', type=_date, help='Last plan day (YYYY-MM-DD), default --start.')
+        parser.add_argument('--stock', help='Only plans for this stock name.')
+        parser.add_argument('--out', help='Write per-plan outcomes to this CSV file.')
+
+    def handle(self, *args, bars_dir, start, end, stock, out, **options):
+        start = start or timezone.localdate()
+        end = end or start
+        t0 = time.perf_counter()
+        plans = plans_frame(start, end, stock=stock)
+        try:
+            outcomes, summary = run_backtest(plans, bars_dir)
+        except (OSError, ValueError, ImportError) as e:
+            raise CommandError(str(e))
+
+        if out:
+            outcomes.to_csv(out)
+            self.stdout.write(f"Wrote {len(outcomes)} outcome row(s) to {out}.")
+        width = max(len(k) for k in summary)
+        for k, v in summary.items():
+            self.stdout.write(f"{k:<{width}}  {'-' if v is None else round(v, 4)}")
+        self.stdout.write(self.style.SUCCESS(f"Backtested {len(plans)} plan(s) in {time.perf_counter() - t0:.2f}s."))
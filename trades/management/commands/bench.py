@@ -0,0 +1,68 @@
+# trades/management/commands/bench.py
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import get_runner, setup_test_environment, teardown_test_environment
+
+from trades import bench
+
+
+class Command(BaseCommand):
+    help = ("Time the upload, ledger signal and dashboard hot paths on synthetic data in a throwaway "
+            "test database and write wall time, query count and peak memory to a JSON file.")
+
+    def add_arguments(self, parser):
+        d = bench.DEFAULTS
+        parser.add_argument('--users', type=int, default=d['users'])
+        parser.add_argument('--trades', type=int, default=d['trades'], help='Plans, spread over --days.')
+        parser.add_argument('--fills', type=int, default=d['fills'], help='Fills per (user, plan).')
+        parser.add_argument('--days', type=int, default=d['days'])
+        parser.add_argument('--seed', type=int, default=d['seed'])
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per case.')
+        parser.add_argument('--upload-rows', type=int, default=200, help='Plans per upload run.')
+        parser.add_argument('--signal-fills', type=int, default=100, help='Single saves per propagate_tpl run.')
+        parser.add_argument('--case', action='append', dest='cases',
+                            help=f"Only this case (repeatable): {', '.join(bench.CASES)}.")
+        parser.add_argument('--out', default='bench.json', help='Results file (default bench.json).')
+        parser.add_argument('--compare', help='Earlier results file to diff median times against.')
+        parser.add_argument('--keepdb', action='store_true', help='Reuse the test database between runs.')
+
+    def handle(self, *args, **o):
+        cases = o['cases'] or list(bench.CASES)
+        unknown = [c for c in cases if c not in bench.CASES]
+        if unknown:
+            raise CommandError(f"Unknown case(s): {', '.join(unknown)}")
+        previous = None
+        if o['compare']:
+            try:
+                previous = json.loads(Path(o['compare']).read_text())
+            except (OSError, ValueError) as e:
+                raise CommandError(f"Cannot read {o['compare']}: {e}")
+
+        # same isolation as manage.py test: never touches the configured database's data
+        setup_test_environment()
+        runner = get_runner(settings)(verbosity=0, keepdb=o['keepdb'], interactive=False)
+        old_config = runner.setup_databases()
+        try:
+            params = {k: o[k] for k in ('users', 'trades', 'fills', 'days', 'seed')}
+            data = bench.seed(**params)
+            results = bench.run_cases(cases, data, repeat=o['repeat'],
+                                      upload_rows=o['upload_rows'], signal_fills=o['signal_fills'])
+            env = bench.environment()
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+
+        report = {'env': env, 'params': {**params, 'repeat': o['repeat'], 'upload_rows': o['upload_rows'],
+                                         'signal_fills': o['signal_fills']}, 'results': results}
+        Path(o['out']).write_text(json.dumps(report, indent=2))
+        for name, r in results.items():
+            self.stdout.write(f"{name:<18} median {r['median_ms']:>9.2f} ms  {r['queries']:>5} queries  "
+                              f"{r['peak_kib']:>9.1f} KiB peak  {r['ops_per_s'] or 0:>9.1f} ops/s")
+        if previous:
+            self.stdout.write('')
+            for line in bench.compare(previous, report):
+                self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {o['out']} ({env['vendor']})."))
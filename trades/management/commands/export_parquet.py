@@ -0,0 +1,37 @@
+# trades/management/commands/export_parquet.py
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from trades.export import DATASETS, DEFAULT_CHUNK_SIZE, export_dataset
+
+
+class Command(BaseCommand):
+    help = "Export transactions and/or plans to partitioned Parquet datasets (incremental with --incremental)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('datasets', nargs='*', metavar='dataset',
+                            help=f"Datasets to export: {', '.join(DATASETS)} (default: all).")
+        parser.add_argument('--out', default=getattr(settings, 'TRADES_EXPORT_DIR', 'exports'),
+                            help='Output directory; each dataset goes to <out>/<name>/.')
+        parser.add_argument('--incremental', action='store_true',
+                            help='Only rows updated since the last export watermark.')
+        parser.add_argument('--overwrite', action='store_true',
+                            help='Replace an existing dataset on a full export.')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                            help='Rows per cursor fetch and per Parquet write.')
+
+    def handle(self, *args, datasets, out, incremental, overwrite, chunk_size, **options):
+        unknown = set(datasets) - set(DATASETS)
+        if unknown:
+            raise CommandError(f"Unknown dataset(s): {', '.join(sorted(unknown))}")
+        for name in datasets or DATASETS:
+            try:
+                result = export_dataset(name, out, incremental=incremental, overwrite=overwrite,
+                                        chunk_size=chunk_size)
+            except (ImportError, ValueError) as e:
+                raise CommandError(str(e))
+            since = result['since'].isoformat() if result['since'] else 'start'
+            self.stdout.write(self.style.SUCCESS(
+                f"{name}: {result['rows']} row(s) in {result['files']} file(s), "
+                f"updated {since} .. {result['until'].isoformat()}"
+            ))
@@ -0,0 +1,53 @@
+# trades/management/commands/import_worker.py
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from trades.jobs import claim_next, requeue_stale, run_job
+
+
+def _run(job):
+    try:
+        return run_job(job)
+    finally:
+        connection.close()  # each pool thread owns its own connection
+
+
+class Command(BaseCommand):
+    help = "Process queued plan uploads (ImportJob rows) with a pool of worker threads."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pool', type=int, default=getattr(settings, 'TRADES_IMPORT_WORKERS', 2),
+                            help='Jobs processed concurrently.')
+        parser.add_argument('--poll', type=float, default=getattr(settings, 'TRADES_IMPORT_POLL_SECONDS', 2.0),
+                            help='Seconds to sleep when the queue is empty.')
+        parser.add_argument('--once', action='store_true',
+                            help='Exit once the queue is drained instead of polling forever.')
+
+    def handle(self, *args, pool, poll, once, **options):
+        requeued = requeue_stale()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} stale job(s).")
+        self.stdout.write(f"Import worker started (pool={pool}).")
+
+        running = set()
+        with ThreadPoolExecutor(max_workers=pool) as executor:
+            while True:
+                running = {f for f in running if not f.done()}
+                claimed = False
+                while len(running) < pool:
+                    close_old_connections()
+                    job = claim_next()
+                    if job is None:
+                        break
+                    claimed = True
+                    self.stdout.write(f"Job #{job.pk}: {job.original_name}")
+                    running.add(executor.submit(_run, job))
+
+                if once and not running:
+                    break
+                if not claimed or len(running) >= pool:
+                    time.sleep(poll)
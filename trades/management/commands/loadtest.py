@@ -0,0 +1,114 @@
+# trades/management/commands/loadtest.py
+import json
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from importlib import import_module
+
+import requests
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+
+def _session_cookie(username):
+    # a logged-in session for USERNAME, stored where the servers under test read it
+    user = get_user_model().objects.filter(username=username).first()
+    if user is None:
+        raise CommandError(f"No user named {username!r}")
+    store = import_module(settings.SESSION_ENGINE).SessionStore()
+    store[SESSION_KEY] = str(user.pk)
+    store[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    store[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    store.create()
+    return {settings.SESSION_COOKIE_NAME: store.session_key}
+
+
+def _percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct))]
+
+
+def run_load(url, total, concurrency, cookies=None, timeout=30.0):
+    """GET ``url`` ``total`` times from ``concurrency`` threads; returns req/s, latency percentiles, errors."""
+    local = threading.local()
+    latencies, errors = [], []
+    lock = threading.Lock()
+
+    def one(_):
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+            session.cookies.update(cookies or {})
+        t0 = time.perf_counter()
+        try:
+            resp = session.get(url, timeout=timeout)
+            resp.content  # include the body (and NDJSON streams) in the latency
+            ok = resp.status_code < 400
+            err = None if ok else f'HTTP {resp.status_code}'
+        except requests.RequestException as e:
+            err = type(e).__name__
+        ms = (time.perf_counter() - t0) * 1000
+        with lock:
+            if err:
+                errors.append(err)
+            else:
+                latencies.append(ms)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - t0
+    lat = sorted(latencies)
+    return {
+        'url': url,
+        'requests': total,
+        'concurrency': concurrency,
+        'ok': len(lat),
+        'errors': len(errors),
+        'error_kinds': sorted(set(errors)),
+        'req_per_s': round(len(lat) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(statistics.median(lat), 2) if lat else None,
+        'p95_ms': round(_percentile(lat, 0.95), 2) if lat else None,
+        'p99_ms': round(_percentile(lat, 0.99), 2) if lat else None,
+    }
+
+
+class Command(BaseCommand):
+    help = ("Load-test running servers, e.g. the WSGI and ASGI deployments side by side, "
+            "and report req/s and p50/p95/p99 latency per target.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('targets', nargs='+',
+                            help='LABEL=URL, e.g. wsgi=http://127.0.0.1:8000/api/trade-news/ '
+                                 'asgi=http://127.0.0.1:8001/api/async/trade-news/')
+        parser.add_argument('--requests', type=int, default=1000, dest='total', help='Requests per target.')
+        parser.add_argument('--concurrency', type=int, default=32, help='Client threads.')
+        parser.add_argument('--warmup', type=int, default=20, help='Untimed requests first.')
+        parser.add_argument('--user', help='Send a session cookie for this user (login-only APIs).')
+        parser.add_argument('--timeout', type=float, default=30.0)
+        parser.add_argument('--out', help='Also write the results as JSON here.')
+
+    def handle(self, *args, targets, total, concurrency, warmup, user, timeout, out, **options):
+        pairs = []
+        for t in targets:
+            label, sep, url = t.partition('=')
+            if not sep or not url.startswith(('http://', 'https://')):
+                raise CommandError(f"Expected LABEL=URL, got {t!r}")
+            pairs.append((label, url))
+        cookies = _session_cookie(user) if user else None
+
+        results = {}
+        for label, url in pairs:
+            if warmup:
+                run_load(url, warmup, min(concurrency, warmup), cookies, timeout)
+            results[label] = r = run_load(url, total, concurrency, cookies, timeout)
+            self.stdout.write(
+                f"{label:<10} {r['req_per_s'] or 0:>9.1f} req/s  p50 {r['p50_ms'] or 0:>8.2f} ms  "
+                f"p95 {r['p95_ms'] or 0:>8.2f} ms  p99 {r['p99_ms'] or 0:>8.2f} ms  "
+                f"{r['errors']} error(s) {', '.join(r['error_kinds'])}"
+            )
+        if out:
+            with open(out, 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Wrote {out}."))
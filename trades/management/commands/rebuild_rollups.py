@@ -0,0 +1,19 @@
+# trades/management/commands/rebuild_rollups.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from trades import ledger
+
+
+class Command(BaseCommand):
+    help = "Rebuild TradeDailyRollup from TradeTransaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users',
+                            help='Only rebuild this user id (repeatable).')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, users, batch_size, **options):
+        with transaction.atomic():
+            created = ledger.rebuild_days(user_ids=users, batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {created} daily rollup row(s)."))
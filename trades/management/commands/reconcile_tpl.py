@@ -0,0 +1,42 @@
+# trades/management/commands/reconcile_tpl.py
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from trades import ledger
+from trades.models import TradeProfitLoss
+
+
+class Command(BaseCommand):
+    help = "Compare TradeProfitLoss.net_amount with a full rebuild from TradeTransaction."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fix', action='store_true', help='Rewrite rows that drifted.')
+        parser.add_argument('--limit', type=int, default=20, help='Mismatches to print.')
+
+    def handle(self, *args, fix, limit, **options):
+        expected = ledger.net_by_key()
+        stored = {
+            (t, u): net
+            for t, u, net in TradeProfitLoss.objects.values_list('trade_id', 'created_by_id', 'net_amount')
+        }
+        zero = Decimal('0.00')
+        keys = expected.keys() | stored.keys()
+        drifted = sorted(
+            k for k in keys
+            if expected.get(k, zero) != stored.get(k, zero)
+        )
+
+        for t, u in drifted[:limit]:
+            self.stdout.write(
+                f"trade={t} user={u}: stored={stored.get((t, u))} expected={expected.get((t, u), zero)}"
+            )
+        self.stdout.write(f"{len(keys)} ledger keys checked, {len(drifted)} drifted.")
+
+        if fix and drifted:
+            with transaction.atomic():
+                ledger.recompute(drifted)
+            self.stdout.write(self.style.SUCCESS(f"Rebuilt {len(drifted)} row(s)."))
+        elif drifted:
+            self.stdout.write("Run with --fix to rewrite them.")
@@ -0,0 +1,186 @@
+# trades/middleware.py
+"""Per-request timing and SQL instrumentation.
+
+``RequestTimingMiddleware`` wraps every query of the request's default
+connection with ``connection.execute_wrapper`` and records wall time,
+query count, DB time and repeated SQL (the same statement run many times
+in one request, usually an N+1 loop; ``dup`` counts the extra runs of the
+most repeated statement, 0 when nothing repeats). Each request gets:
+
+- a ``Server-Timing`` header (``app``, ``db`` and ``dup`` metrics);
+- one JSON line on the ``trades.requests`` logger, at INFO, or WARNING
+  for requests slower than ``TRADES_SLOW_REQUEST_MS``;
+- ``trades.sql`` warnings for statements slower than
+  ``TRADES_SLOW_QUERY_MS`` and for repeats of ``TRADES_DUPLICATE_QUERY_MIN``
+  or more, tagged with the view name;
+- an entry in a bounded in-memory ring buffer (``TRADES_REQUEST_LOG_SIZE``)
+  that the admin "Request timings" page summarizes per endpoint.
+
+The buffer is per process. Queries run while a streaming response is
+iterated happen after the middleware returns and are not counted.
+"""
+import json
+import logging
+import threading
+import time
+from collections import Counter, deque
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger('trades.requests')
+sql_logger = logging.getLogger('trades.sql')
+
+_lock = threading.Lock()
+_buffer = None
+
+
+def _ring():
+    global _buffer
+    if _buffer is None:
+        _buffer = deque(maxlen=getattr(settings, 'TRADES_REQUEST_LOG_SIZE', 5000))
+    return _buffer
+
+
+def record(entry):
+    with _lock:
+        _ring().append(entry)
+
+
+def recent(window_seconds=None):
+    """Buffered request entries, newest last; only the last ``window_seconds`` when given."""
+    with _lock:
+        entries = list(_ring())
+    if window_seconds:
+        cutoff = time.time() - window_seconds
+        entries = [e for e in entries if e['ts'] >= cutoff]
+    return entries
+
+
+def clear():
+    with _lock:
+        _ring().clear()
+
+
+def _percentile(sorted_values, pct):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct))]
+
+
+def slowest_endpoints(window_seconds=3600, limit=20):
+    """Per (method, view) stats over the window, slowest p95 first."""
+    groups = {}
+    for e in recent(window_seconds):
+        groups.setdefault((e['method'], e['view']), []).append(e)
+    rows = []
+    for (method, view), entries in groups.items():
+        walls = sorted(e['wall_ms'] for e in entries)
+        n = len(entries)
+        rows.append({
+            'method': method,
+            'view': view,
+            'count': n,
+            'avg_ms': round(sum(walls) / n, 1),
+            'p95_ms': round(_percentile(walls, 0.95), 1),
+            'max_ms': round(walls[-1], 1),
+            'avg_queries': round(sum(e['queries'] for e in entries) / n, 1),
+            'avg_db_ms': round(sum(e['db_ms'] for e in entries) / n, 1),
+            'max_dup': max(e['dup'] for e in entries),
+            'errors': sum(1 for e in entries if e['status'] >= 500),
+        })
+    rows.sort(key=lambda r: r['p95_ms'], reverse=True)
+    return rows[:limit]
+
+
+class _QueryStats:
+    # execute_wrapper callable: times each statement and keeps the slow ones
+    def __init__(self, slow_ms):
+        self.slow_ms = slow_ms
+        self.count = 0
+        self.db_ms = 0.0
+        self.sql = Counter()
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        t0 = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - t0) * 1000
+            self.count += 1
+            self.db_ms += ms
+            self.sql[sql] += 1
+            if ms >= self.slow_ms:
+                self.slow.append((ms, sql))
+
+
+def _add_wrapper(stats):
+    # resolves ``connection`` in the calling (executor) thread
+    connection.execute_wrappers.append(stats)
+
+
+def _remove_wrapper(stats):
+    connection.execute_wrappers.remove(stats)
+
+
+class RequestTimingMiddleware:
+    sync_capable = True
+    async_capable = True  # async views (api/async/...) stay on the event loop
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'TRADES_SLOW_QUERY_MS', 200)
+        self.dup_min = getattr(settings, 'TRADES_DUPLICATE_QUERY_MIN', 5)
+        self.slow_request_ms = getattr(settings, 'TRADES_SLOW_REQUEST_MS', 1000)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self._acall(request)
+        stats = _QueryStats(self.slow_ms)
+        t0 = time.perf_counter()
+        with connection.execute_wrapper(stats):
+            response = self.get_response(request)
+        return self._finish(request, response, stats, t0)
+
+    async def _acall(self, request):
+        # async ORM calls run in the request's thread-sensitive executor, whose connection is not this
+        # thread's: install the wrapper there
+        stats = _QueryStats(self.slow_ms)
+        t0 = time.perf_counter()
+        await sync_to_async(_add_wrapper)(stats)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(_remove_wrapper)(stats)
+        return self._finish(request, response, stats, t0)
+
+    def _finish(self, request, response, stats, t0):
+        wall_ms = (time.perf_counter() - t0) * 1000
+        match = getattr(request, 'resolver_match', None)
+        view = (match.view_name or match._func_path) if match else request.path
+        dup_sql, runs = stats.sql.most_common(1)[0] if stats.sql else ('', 0)
+        dup = max(runs - 1, 0)
+        entry = {
+            'ts': time.time(),
+            'method': request.method,
+            'path': request.path,
+            'view': view,
+            'status': response.status_code,
+            'wall_ms': round(wall_ms, 2),
+            'queries': stats.count,
+            'db_ms': round(stats.db_ms, 2),
+            'dup': dup,
+        }
+        record(entry)
+
+        response['Server-Timing'] = (
+            f'app;dur={wall_ms:.1f}, db;dur={stats.db_ms:.1f};desc="{stats.count} queries", dup;desc="{dup}"'
+        )
+        logger.log(logging.WARNING if wall_ms >= self.slow_request_ms else logging.INFO, json.dumps(entry))
+        for ms, sql in stats.slow:
+            sql_logger.warning('slow query %.1fms in %s: %s', ms, view, sql)
+        if runs >= self.dup_min:
+            sql_logger.warning('query ran %d times in %s (N+1?): %s', runs, view, dup_sql)
+        return response
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:56
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+from django.db.models import DecimalField, ExpressionWrapper, F, Sum
+
+
+def backfill_net_amount(apps, schema_editor):
+    TradeTransaction = apps.get_model('trades', 'TradeTransaction')
+    TradeProfitLoss = apps.get_model('trades', 'TradeProfitLoss')
+    expr = ExpressionWrapper(
+        (F('sell_price') - F('buy_price')) * F('quantity'),
+        output_field=DecimalField(max_digits=18, decimal_places=2),
+    )
+    rows = (TradeTransaction.objects
+            .values('trade_id', 'created_by_id')
+            .annotate(net=Sum(expr))
+            .order_by())
+    for row in rows.iterator():
+        net = (row['net'] or Decimal('0')).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+        (TradeProfitLoss.objects
+         .filter(trade_id=row['trade_id'], created_by_id=row['created_by_id'])
+         .update(net_amount=net))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0002_importjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tradeprofitloss',
+            name='net_amount',
+            field=models.DecimalField(decimal_places=2, default=0, max_digits=14),
+        ),
+        migrations.RunPython(backfill_net_amount, migrations.RunPython.noop),
+    ]
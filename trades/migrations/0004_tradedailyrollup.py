@@ -0,0 +1,58 @@
+# Generated by Django 5.2.6 on 2026-10-18 14:58
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum
+from django.db.models.functions import TruncDate
+
+
+def build_rollup(apps, schema_editor):
+    TradeTransaction = apps.get_model('trades', 'TradeTransaction')
+    TradeDailyRollup = apps.get_model('trades', 'TradeDailyRollup')
+    capital = ExpressionWrapper(F('quantity') * F('buy_price'), output_field=DecimalField(max_digits=18, decimal_places=2))
+    rows = (TradeTransaction.objects
+            .annotate(day=TruncDate('updated_at'))
+            .values('trade_id', 'created_by_id', 'day', 'profit_or_loss')
+            .annotate(n=Count('id'), profit=Sum('profit_amount'), loss=Sum('loss_amount'), capital=Sum(capital))
+            .order_by())
+    buf = []
+    for r in rows.iterator():
+        buf.append(TradeDailyRollup(
+            trade_id=r['trade_id'], created_by_id=r['created_by_id'], day=r['day'],
+            profit_or_loss=r['profit_or_loss'], count=r['n'],
+            profit_total=r['profit'] or 0, loss_total=r['loss'] or 0, capital_total=r['capital'] or 0,
+        ))
+        if len(buf) >= 5000:
+            TradeDailyRollup.objects.bulk_create(buf)
+            buf = []
+    TradeDailyRollup.objects.bulk_create(buf)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0003_tradeprofitloss_net_amount'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TradeDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('profit_or_loss', models.CharField(choices=[('Profit', 'Profit'), ('Loss', 'Loss')], max_length=10)),
+                ('count', models.IntegerField(default=0)),
+                ('profit_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('loss_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('capital_total', models.DecimalField(decimal_places=2, default=0, max_digits=18)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to=settings.AUTH_USER_MODEL)),
+                ('trade', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_rollups', to='trades.trademaster')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('created_by', 'day', 'trade', 'profit_or_loss'), name='uniq_rollup_user_day_trade_pl')],
+            },
+        ),
+        migrations.RunPython(build_rollup, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0004_tradedailyrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trademaster',
+            index=models.Index(fields=['created_at', 'stock_name'], name='tm_created_stock'),
+        ),
+        migrations.AddIndex(
+            model_name='tradeprofitloss',
+            index=models.Index(fields=['created_by', 'updated_at'], name='tpl_user_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='tradetransaction',
+            index=models.Index(fields=['created_by', 'created_at'], name='tx_user_created'),
+        ),
+        migrations.AddIndex(
+            model_name='tradetransaction',
+            index=models.Index(fields=['created_by', 'updated_at'], name='tx_user_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='tradetransaction',
+            index=models.Index(fields=['trade', 'created_by'], include=('buy_price', 'sell_price', 'quantity'), name='tx_trade_user'),
+        ),
+    ]
@@ -0,0 +1,94 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:05
+
+import re
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+from django.db import migrations, models
+
+# frozen copy of trades.models.plan_metrics as of this migration
+FIELDS = ['risk_per_share', 'lot_quantity', 'reward_risk_ratio', 'support_price', 'resistance_price']
+LEVEL_RE = re.compile(r'-?\d+(?:\.\d+)?')
+
+
+def parse_level(text):
+    m = LEVEL_RE.search(str(text or '').replace(',', ''))
+    if not m:
+        return None
+    return Decimal(m.group()).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def plan_metrics(entry, stop, target, capital, support='', resistance=''):
+    try:
+        entry, stop, target, capital = (Decimal(v) for v in (entry, stop, target, capital))
+    except (TypeError, InvalidOperation):
+        return dict.fromkeys(FIELDS)
+    risk = entry - stop
+    return {
+        'risk_per_share': risk,
+        'lot_quantity': int(capital // entry) if entry > 0 else None,
+        'reward_risk_ratio': ((target - entry) / risk).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) if risk > 0 else None,
+        'support_price': parse_level(support),
+        'resistance_price': parse_level(resistance),
+    }
+
+
+def backfill_metrics(apps, schema_editor):
+    TradeMaster = apps.get_model('trades', 'TradeMaster')
+    batch = []
+    for tm in TradeMaster.objects.order_by('pk').iterator(chunk_size=2000):
+        for k, v in plan_metrics(tm.option_buy_price, tm.stop_loss_price, tm.intraday_exit_price_target,
+                                 tm.capital_required, tm.support_level, tm.resistance_level).items():
+            setattr(tm, k, v)
+        batch.append(tm)
+        if len(batch) >= 2000:
+            TradeMaster.objects.bulk_update(batch, FIELDS)
+            batch = []
+    TradeMaster.objects.bulk_update(batch, FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0005_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trademaster',
+            name='lot_quantity',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='trademaster',
+            name='resistance_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='trademaster',
+            name='reward_risk_ratio',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='trademaster',
+            name='risk_per_share',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='trademaster',
+            name='support_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='trademaster',
+            index=models.Index(fields=['created_at', 'reward_risk_ratio'], name='tm_created_rr'),
+        ),
+        migrations.AddIndex(
+            model_name='trademaster',
+            index=models.Index(fields=['created_at', 'risk_per_share'], name='tm_created_risk'),
+        ),
+        migrations.AddIndex(
+            model_name='trademaster',
+            index=models.Index(fields=['created_at', 'lot_quantity'], name='tm_created_lot'),
+        ),
+        migrations.RunPython(backfill_metrics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0006_trademaster_metrics'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trademaster',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='trademaster',
+            index=models.Index(fields=['updated_at'], name='tm_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='tradetransaction',
+            index=models.Index(fields=['updated_at'], name='tx_updated'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:12
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+COLUMNS = ('id, trade_id, buy_price, sell_price, quantity, is_ai_correct, profit_or_loss, '
+           'profit_amount, loss_amount, created_by_id, updated_by_id, created_at, updated_at')
+
+# hot + cold fills for range queries that reach past TRADES_HOT_DAYS (TradeTransactionHistory)
+CREATE_HISTORY_VIEW = f'''
+CREATE VIEW trades_tradetransaction_history AS
+SELECT {COLUMNS}, FALSE AS archived FROM trades_tradetransaction
+UNION ALL
+SELECT {COLUMNS}, TRUE AS archived FROM trades_tradetransactionarchive
+'''
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0007_export_updated_at'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TradeTransactionHistory',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('buy_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('sell_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('quantity', models.IntegerField()),
+                ('is_ai_correct', models.BooleanField()),
+                ('profit_or_loss', models.CharField(max_length=10)),
+                ('profit_amount', models.DecimalField(decimal_places=2, max_digits=12, null=True)),
+                ('loss_amount', models.DecimalField(decimal_places=2, max_digits=12, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived', models.BooleanField()),
+            ],
+            options={
+                'db_table': 'trades_tradetransaction_history',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='TradeTransactionArchive',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('buy_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('sell_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('quantity', models.IntegerField()),
+                ('is_ai_correct', models.BooleanField(default=False)),
+                ('profit_or_loss', models.CharField(choices=[('Profit', 'Profit'), ('Loss', 'Loss')], max_length=10)),
+                ('profit_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('loss_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_fills', to=settings.AUTH_USER_MODEL)),
+                ('trade', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_fills', to='trades.trademaster')),
+                ('updated_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_by', 'created_at'], name='txarc_user_created'), models.Index(fields=['created_by', 'updated_at'], name='txarc_user_updated'), models.Index(fields=['trade', 'created_by'], name='txarc_trade_user'), models.Index(fields=['updated_at'], name='txarc_updated')],
+            },
+        ),
+        migrations.RunSQL(CREATE_HISTORY_VIEW, 'DROP VIEW IF EXISTS trades_tradetransaction_history'),
+    ]
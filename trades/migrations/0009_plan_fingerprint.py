@@ -0,0 +1,64 @@
+# Generated by Django 5.2.6 on 2026-10-18 18:40
+
+import hashlib
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.db import migrations, models
+
+# frozen copy of trades.models.plan_fingerprint as of this migration
+FIELDS = ['stock_name', 'option_strike_price_expiry', 'option_buy_price', 'intraday_exit_price_target',
+          'stop_loss_price', 'support_level', 'resistance_level', 'capital_required', 'news_catalyst_summary']
+DECIMALS = {'option_buy_price', 'intraday_exit_price_target', 'stop_loss_price', 'capital_required'}
+
+
+def _canonical(field, value):
+    if field in DECIMALS and value not in (None, ''):
+        return str(Decimal(str(value)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
+    return ' '.join(str(value or '').split())
+
+
+def plan_fingerprint(values):
+    raw = '\x1f'.join(_canonical(f, values[f]) for f in FIELDS)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def backfill_fingerprints(apps, schema_editor):
+    TradeMaster = apps.get_model('trades', 'TradeMaster')
+    seen, batch = set(), []
+    for tm in TradeMaster.objects.order_by('pk').iterator(chunk_size=2000):
+        fp = plan_fingerprint({f: getattr(tm, f) for f in FIELDS})
+        if fp in seen:
+            # rows that only differed in whitespace under the old constraint: keep them, keyed apart
+            fp = hashlib.sha256(f'{fp}#{tm.pk}'.encode()).hexdigest()
+        seen.add(fp)
+        tm.fingerprint = fp
+        batch.append(tm)
+        if len(batch) >= 2000:
+            TradeMaster.objects.bulk_update(batch, ['fingerprint'])
+            batch = []
+    TradeMaster.objects.bulk_update(batch, ['fingerprint'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0008_transaction_archive'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trademaster',
+            name='fingerprint',
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(backfill_fingerprints, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='trademaster',
+            name='uniq_trademaster_all_fields_except_user_status',
+        ),
+        migrations.AlterField(
+            model_name='trademaster',
+            name='fingerprint',
+            field=models.CharField(editable=False, max_length=64, unique=True),
+        ),
+    ]
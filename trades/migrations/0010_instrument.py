@@ -0,0 +1,128 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:30
+
+import re
+from datetime import date
+from decimal import Decimal, ROUND_HALF_UP
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# frozen copy of trades.models.parse_instrument/instrument_symbol as of this migration
+_MONTHS = {m: i for i, m in enumerate(
+    ('JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC'), start=1)}
+_ISO_DATE_RE = re.compile(r'\b(\d{4})-(\d{1,2})-(\d{1,2})\b')
+_DMY_DATE_RE = re.compile(r'\b(\d{1,2})[/.](\d{1,2})[/.](\d{2,4})\b')
+_NAMED_DATE_RE = re.compile(r'\b(\d{1,2})[-\s]?(' + '|'.join(_MONTHS) + r')[A-Z]*(?:[-\s,]*(\d{4}|\d{2})(?!\d))?\b')
+_OPTION_TYPE_RE = re.compile(r'\b(CE|PE|CALL|PUT)\b')
+_GLUED_TYPE_RE = re.compile(r'(\d)(CE|PE)\b')
+_STRIKE_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+
+
+def _year(y):
+    y = int(y)
+    return y + 2000 if y < 100 else y
+
+
+def _expiry(text, today):
+    for regex in (_ISO_DATE_RE, _DMY_DATE_RE, _NAMED_DATE_RE):
+        m = regex.search(text)
+        if not m:
+            continue
+        try:
+            if regex is _ISO_DATE_RE:
+                day = date(int(m[1]), int(m[2]), int(m[3]))
+            elif regex is _DMY_DATE_RE:
+                day = date(_year(m[3]), int(m[2]), int(m[1]))
+            elif m[3]:
+                day = date(_year(m[3]), _MONTHS[m[2]], int(m[1]))
+            else:
+                day = date(today.year, _MONTHS[m[2]], int(m[1]))
+                if day < today:
+                    day = day.replace(year=today.year + 1)
+        except ValueError:
+            return None, text
+        return day, text[:m.start()] + ' ' + text[m.end():]
+    return None, text
+
+
+def parse_instrument(text, stock_name, today):
+    rest = _GLUED_TYPE_RE.sub(r'\1 \2', ' '.join(str(text or '').upper().replace(',', '').split()))
+    words = rest.split() or str(stock_name or '').upper().split() or ['']
+    underlying, rest = words[0][:50], ' '.join(rest.split()[1:])
+    expiry, rest = _expiry(rest, today)
+    kind = _OPTION_TYPE_RE.search(rest)
+    strike = _STRIKE_RE.search(rest)
+    return {
+        'underlying': underlying,
+        'strike': Decimal(strike.group()).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) if strike else None,
+        'option_type': {'CALL': 'CE', 'PUT': 'PE'}.get(kind.group(), kind.group()) if kind else '',
+        'expiry': expiry,
+    }
+
+
+def instrument_symbol(parts):
+    return '|'.join((parts['underlying'], str(parts['strike'] or ''), parts['option_type'],
+                     parts['expiry'].isoformat() if parts['expiry'] else ''))
+
+
+def backfill_instruments(apps, schema_editor):
+    Instrument = apps.get_model('trades', 'Instrument')
+    TradeMaster = apps.get_model('trades', 'TradeMaster')
+    ids = dict(Instrument.objects.values_list('symbol', 'id'))
+    batch = []
+    for tm in TradeMaster.objects.order_by('pk').iterator(chunk_size=2000):
+        parts = parse_instrument(tm.option_strike_price_expiry, tm.stock_name, today=tm.created_at)
+        symbol = instrument_symbol(parts)
+        if symbol not in ids:
+            ids[symbol] = Instrument.objects.create(symbol=symbol, **parts).pk
+        tm.instrument_id = ids[symbol]
+        batch.append(tm)
+        if len(batch) >= 2000:
+            TradeMaster.objects.bulk_update(batch, ['instrument'])
+            batch = []
+    TradeMaster.objects.bulk_update(batch, ['instrument'])
+
+
+# ticker search box (stock_name icontains -> UPPER(stock_name::text) LIKE ...); Postgres only, SQLite scans
+def add_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute('CREATE INDEX IF NOT EXISTS tm_stock_trgm ON trades_trademaster '
+                          'USING gin (UPPER(stock_name::text) gin_trgm_ops)')
+
+
+def drop_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS tm_stock_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0009_plan_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Instrument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('symbol', models.CharField(max_length=120, unique=True)),
+                ('underlying', models.CharField(max_length=50)),
+                ('strike', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('option_type', models.CharField(blank=True, choices=[('CE', 'Call'), ('PE', 'Put')], max_length=2)),
+                ('expiry', models.DateField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['underlying', 'expiry'], name='inst_underlying_expiry'), models.Index(fields=['expiry'], name='inst_expiry'), models.Index(fields=['strike', 'option_type'], name='inst_strike_type')],
+            },
+        ),
+        migrations.AddField(
+            model_name='trademaster',
+            name='instrument',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='plans', to='trades.instrument'),
+        ),
+        migrations.RunPython(backfill_instruments, migrations.RunPython.noop),
+        migrations.RunPython(add_trigram_index, drop_trigram_index),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.6 on 2026-10-18 19:20
+
+from django.db import migrations
+
+# frozen copy of the trades/search.py index DDL as of this migration.
+# Postgres: generated tsvector column + GIN index; SQLite: FTS5 table + sync triggers
+POSTGRES_INDEX = [
+    "ALTER TABLE trades_trademaster ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(stock_name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(news_catalyst_summary, '')), 'B')) STORED",
+    'CREATE INDEX IF NOT EXISTS tm_search ON trades_trademaster USING gin (search_vector)',
+]
+POSTGRES_DROP = [
+    'DROP INDEX IF EXISTS tm_search',
+    'ALTER TABLE trades_trademaster DROP COLUMN IF EXISTS search_vector',
+]
+SQLITE_INDEX = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS trades_trademaster_fts USING fts5(stock_name, news_catalyst_summary, "
+    "content='trades_trademaster', content_rowid='id', tokenize='porter unicode61')",
+    'CREATE TRIGGER IF NOT EXISTS trades_trademaster_fts_ai AFTER INSERT ON trades_trademaster BEGIN '
+    'INSERT INTO trades_trademaster_fts(rowid, stock_name, news_catalyst_summary) '
+    'VALUES (new.id, new.stock_name, new.news_catalyst_summary); END',
+    'CREATE TRIGGER IF NOT EXISTS trades_trademaster_fts_ad AFTER DELETE ON trades_trademaster BEGIN '
+    "INSERT INTO trades_trademaster_fts(trades_trademaster_fts, rowid, stock_name, news_catalyst_summary) "
+    "VALUES ('delete', old.id, old.stock_name, old.news_catalyst_summary); END",
+    'CREATE TRIGGER IF NOT EXISTS trades_trademaster_fts_au AFTER UPDATE OF stock_name, news_catalyst_summary '
+    'ON trades_trademaster BEGIN '
+    "INSERT INTO trades_trademaster_fts(trades_trademaster_fts, rowid, stock_name, news_catalyst_summary) "
+    "VALUES ('delete', old.id, old.stock_name, old.news_catalyst_summary); "
+    'INSERT INTO trades_trademaster_fts(rowid, stock_name, news_catalyst_summary) '
+    'VALUES (new.id, new.stock_name, new.news_catalyst_summary); END',
+    # index the rows that already exist
+    "INSERT INTO trades_trademaster_fts(trades_trademaster_fts) VALUES ('rebuild')",
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS trades_trademaster_fts_ai',
+    'DROP TRIGGER IF EXISTS trades_trademaster_fts_ad',
+    'DROP TRIGGER IF EXISTS trades_trademaster_fts_au',
+    'DROP TABLE IF EXISTS trades_trademaster_fts',
+]
+
+
+def _run(schema_editor, statements):
+    for sql in statements.get(schema_editor.connection.vendor, []):
+        schema_editor.execute(sql)
+
+
+def add_search_index(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES_INDEX, 'sqlite': SQLITE_INDEX})
+
+
+def remove_search_index(apps, schema_editor):
+    _run(schema_editor, {'postgresql': POSTGRES_DROP, 'sqlite': SQLITE_DROP})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0010_instrument'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_index, remove_search_index),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 15:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trades', '0011_plan_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trademaster',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
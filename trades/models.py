@@ -1,3 +1,7 @@
+import hashlib
+import re
+from datetime import date, timedelta
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
 from django.db import models
 from django.utils import timezone
 from django.conf import settings
@@ -17,29 +21,212 @@ class TradeMaster(models.Model):
     max_profit_if_target_hits = models.DecimalField(max_digits=10, decimal_places=2)
     news_catalyst_summary = models.TextField()
     created_at = models.DateField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)  # incremental exports (trades/export.py)
+
+    # derived at import/save time (refresh_metrics), so plan views sort/filter without per-row math
+    risk_per_share = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)  # entry - stop
+    lot_quantity = models.IntegerField(null=True, blank=True)  # floor(capital / entry)
+    reward_risk_ratio = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    support_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)  # from support_level
+    resistance_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    METRIC_FIELDS = ('risk_per_share', 'lot_quantity', 'reward_risk_ratio', 'support_price', 'resistance_price')
+
+    # dedup key: sha256 of the canonicalized plan content (plan_fingerprint); replaces a unique
+    # index over the nine columns themselves, whose entries included the whole news summary
+    fingerprint = models.CharField(max_length=64, unique=True, editable=False)
+    FINGERPRINT_FIELDS = (
+        'stock_name', 'option_strike_price_expiry', 'option_buy_price', 'intraday_exit_price_target',
+        'stop_loss_price', 'support_level', 'resistance_level', 'capital_required', 'news_catalyst_summary',
+    )
+
+    version = models.PositiveIntegerField(default=0, editable=False)  # bumped per edit; news editor concurrency check
+
+    # parsed from option_strike_price_expiry at import/save time (resolve_instruments)
+    instrument = models.ForeignKey('Instrument', on_delete=models.PROTECT, null=True, blank=True,
+                                   editable=False, related_name='plans')
 
 
     class Meta:
-        constraints = [
-            models.UniqueConstraint(
-                fields=[
-                    'stock_name',
-                    'option_strike_price_expiry',
-                    'option_buy_price',
-                    'intraday_exit_price_target',
-                    'stop_loss_price',
-                    'support_level',
-                    'resistance_level',
-                    'capital_required',
-                    'news_catalyst_summary',
-                ],
-                name='uniq_trademaster_all_fields_except_user_status'
-            ),
+        indexes = [
+            models.Index(fields=['created_at', 'stock_name'], name='tm_created_stock'),  # daily plan lists
+            # per-day sort/filter on the stored metrics
+            models.Index(fields=['created_at', 'reward_risk_ratio'], name='tm_created_rr'),
+            models.Index(fields=['created_at', 'risk_per_share'], name='tm_created_risk'),
+            models.Index(fields=['created_at', 'lot_quantity'], name='tm_created_lot'),
+            models.Index(fields=['updated_at'], name='tm_updated'),  # export watermark scans
         ]
     
     def __str__(self):
         return self.stock_name
 
+    def refresh_metrics(self):
+        self.__dict__.update(plan_metrics(
+            self.option_buy_price, self.stop_loss_price, self.intraday_exit_price_target,
+            self.capital_required, self.support_level, self.resistance_level,
+        ))
+
+    def refresh_fingerprint(self):
+        self.fingerprint = plan_fingerprint({f: getattr(self, f) for f in self.FINGERPRINT_FIELDS})
+
+    def refresh_instrument(self):
+        key = (self.option_strike_price_expiry, self.stock_name)
+        self.instrument_id = resolve_instruments([key], today=self.created_at)[key]
+
+    def save(self, *args, **kwargs):
+        self.refresh_metrics()
+        self.refresh_fingerprint()
+        self.refresh_instrument()
+        if self.pk is not None and not self._state.adding:
+            self.version += 1  # edits made elsewhere invalidate what news editors read
+        if kwargs.get('update_fields') is not None:
+            kwargs['update_fields'] = {*kwargs['update_fields'], *self.METRIC_FIELDS, 'fingerprint', 'instrument',
+                                       'version', 'updated_at'}
+        super().save(*args, **kwargs)
+
+
+LEVEL_RE = re.compile(r'-?\d+(?:\.\d+)?')  # first number in a free-text level like "₹1,245 (prev high)"
+
+
+def parse_level(text):
+    m = LEVEL_RE.search(str(text or '').replace(',', ''))
+    if not m:
+        return None
+    return Decimal(m.group()).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+
+
+def plan_metrics(entry, stop, target, capital, support='', resistance=''):
+    """Derived sizing fields for one plan row; the importer computes the same per column."""
+    try:
+        entry, stop, target, capital = (Decimal(v) for v in (entry, stop, target, capital))
+    except (TypeError, InvalidOperation):
+        return dict.fromkeys(TradeMaster.METRIC_FIELDS)
+    risk = entry - stop
+    return {
+        'risk_per_share': risk,
+        'lot_quantity': int(capital // entry) if entry > 0 else None,
+        'reward_risk_ratio': ((target - entry) / risk).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) if risk > 0 else None,
+        'support_price': parse_level(support),
+        'resistance_price': parse_level(resistance),
+    }
+
+
+_FINGERPRINT_DECIMALS = {'option_buy_price', 'intraday_exit_price_target', 'stop_loss_price', 'capital_required'}
+
+
+def _canonical(field, value):
+    # prices at 2dp, text with whitespace runs collapsed; the importer does the same per column
+    if field in _FINGERPRINT_DECIMALS and value not in (None, ''):
+        return str(Decimal(str(value)).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
+    return ' '.join(str(value or '').split())
+
+
+def plan_fingerprint(values):
+    """Hex sha256 over ``TradeMaster.FINGERPRINT_FIELDS`` of ``values`` (a field -> value mapping)."""
+    raw = '\x1f'.join(_canonical(f, values[f]) for f in TradeMaster.FINGERPRINT_FIELDS)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+class Instrument(models.Model):
+    """An underlying/strike/option type/expiry parsed from a plan's free-text option column."""
+    symbol = models.CharField(max_length=120, unique=True)  # canonical key, see instrument_symbol
+    underlying = models.CharField(max_length=50)
+    strike = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    option_type = models.CharField(max_length=2, choices=[('CE', 'Call'), ('PE', 'Put')], blank=True)
+    expiry = models.DateField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['underlying', 'expiry'], name='inst_underlying_expiry'),
+            models.Index(fields=['expiry'], name='inst_expiry'),
+            models.Index(fields=['strike', 'option_type'], name='inst_strike_type'),
+        ]
+
+    def __str__(self):
+        return self.symbol
+
+
+_MONTHS = {m: i for i, m in enumerate(
+    ('JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC'), start=1)}
+_ISO_DATE_RE = re.compile(r'\b(\d{4})-(\d{1,2})-(\d{1,2})\b')
+_DMY_DATE_RE = re.compile(r'\b(\d{1,2})[/.](\d{1,2})[/.](\d{2,4})\b')
+# "26-SEP-2024", "26 Sep 24", "26SEP24", "26 Sep" (year taken from the plan date)
+_NAMED_DATE_RE = re.compile(r'\b(\d{1,2})[-\s]?(' + '|'.join(_MONTHS) + r')[A-Z]*(?:[-\s,]*(\d{4}|\d{2})(?!\d))?\b')
+_OPTION_TYPE_RE = re.compile(r'\b(CE|PE|CALL|PUT)\b')
+_GLUED_TYPE_RE = re.compile(r'(\d)(CE|PE)\b')  # "1700CE"
+_STRIKE_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+
+
+def _year(y):
+    y = int(y)
+    return y + 2000 if y < 100 else y
+
+
+def _expiry(text, today):
+    # (date or None, text with the date removed)
+    for regex in (_ISO_DATE_RE, _DMY_DATE_RE, _NAMED_DATE_RE):
+        m = regex.search(text)
+        if not m:
+            continue
+        try:
+            if regex is _ISO_DATE_RE:
+                day = date(int(m[1]), int(m[2]), int(m[3]))
+            elif regex is _DMY_DATE_RE:
+                day = date(_year(m[3]), int(m[2]), int(m[1]))
+            elif m[3]:
+                day = date(_year(m[3]), _MONTHS[m[2]], int(m[1]))
+            else:
+                day = date(today.year, _MONTHS[m[2]], int(m[1]))
+                if day < today:
+                    day = day.replace(year=today.year + 1)  # next occurrence on/after the plan date
+        except ValueError:
+            return None, text
+        return day, text[:m.start()] + ' ' + text[m.end():]
+    return None, text
+
+
+def parse_instrument(text, stock_name='', today=None):
+    """``{'underlying', 'strike', 'option_type', 'expiry'}`` from e.g. "NIFTY 24500 CE 26-Sep-2024".
+
+    The underlying is the first word of the option text (``stock_name``'s when
+    the text is empty); parts that cannot be found are None/''.
+    """
+    today = today or timezone.localdate()
+    rest = _GLUED_TYPE_RE.sub(r'\1 \2', ' '.join(str(text or '').upper().replace(',', '').split()))
+    words = rest.split() or str(stock_name or '').upper().split() or ['']
+    underlying, rest = words[0][:50], ' '.join(rest.split()[1:])
+    expiry, rest = _expiry(rest, today)
+    kind = _OPTION_TYPE_RE.search(rest)
+    strike = _STRIKE_RE.search(rest)
+    return {
+        'underlying': underlying,
+        'strike': Decimal(strike.group()).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) if strike else None,
+        'option_type': {'CALL': 'CE', 'PUT': 'PE'}.get(kind.group(), kind.group()) if kind else '',
+        'expiry': expiry,
+    }
+
+
+def instrument_symbol(parts):
+    return '|'.join((parts['underlying'], str(parts['strike'] or ''), parts['option_type'],
+                     parts['expiry'].isoformat() if parts['expiry'] else ''))
+
+
+def resolve_instruments(pairs, today=None):
+    """Map each ``(option text, stock name)`` to an Instrument id, creating missing ones.
+
+    Two queries (three with inserts) for any number of distinct pairs.
+    """
+    parsed = {pair: parse_instrument(*pair, today=today) for pair in set(pairs)}
+    symbols = {pair: instrument_symbol(parts) for pair, parts in parsed.items()}
+    ids = dict(Instrument.objects.filter(symbol__in=set(symbols.values())).values_list('symbol', 'id'))
+    missing = {s: pair for pair, s in symbols.items() if s not in ids}
+    if missing:
+        # ignore_conflicts: another upload may create the same instrument concurrently
+        Instrument.objects.bulk_create([Instrument(symbol=s, **parsed[pair]) for s, pair in missing.items()],
+                                       ignore_conflicts=True)
+        ids.update(Instrument.objects.filter(symbol__in=list(missing)).values_list('symbol', 'id'))
+    return {pair: ids[s] for pair, s in symbols.items()}
+
 
 def tm_choices_today():
     # return a Q or dict; evaluated at form/field construction time
@@ -66,6 +253,109 @@ class TradeTransaction(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)  
     updated_at = models.DateTimeField(auto_now=True)      
 
+    LEDGER_FIELDS = ('trade_id', 'created_by_id', 'buy_price', 'sell_price', 'quantity')
+    ROLLUP_FIELDS = ('trade_id', 'created_by_id', 'updated_at', 'profit_or_loss',
+                     'profit_amount', 'loss_amount', 'buy_price', 'quantity')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # remember what this row contributed to TradeProfitLoss/TradeDailyRollup, so saves can apply a delta
+        instance._ledger_state = instance.ledger_state()
+        instance._rollup_state = instance.rollup_state()
+        return instance
+
+    def ledger_state(self):
+        if any(f not in self.__dict__ for f in self.LEDGER_FIELDS):
+            return None  # deferred fields: contribution unknown
+        net = (Decimal(self.sell_price) - Decimal(self.buy_price)) * Decimal(self.quantity)
+        return (self.trade_id, self.created_by_id, net.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP))
+
+    def rollup_state(self):
+        # ((trade_id, user_id, day, profit_or_loss), (count, profit, loss, capital)) or None
+        if any(f not in self.__dict__ for f in self.ROLLUP_FIELDS) or self.updated_at is None:
+            return None
+        key = (self.trade_id, self.created_by_id, timezone.localdate(self.updated_at), self.profit_or_loss)
+        amounts = (
+            1,
+            Decimal(self.profit_amount or 0),
+            Decimal(self.loss_amount or 0),
+            Decimal(self.buy_price) * Decimal(self.quantity),
+        )
+        return key, amounts
+
+    class Meta:
+        indexes = [
+            # per-user date windows: transactions page/API (created_at), rollup rebuilds (updated_at)
+            models.Index(fields=['created_by', 'created_at'], name='tx_user_created'),
+            models.Index(fields=['created_by', 'updated_at'], name='tx_user_updated'),
+            # ledger recompute groups by (trade, user); INCLUDE lets Postgres answer it from the index
+            models.Index(fields=['trade', 'created_by'], name='tx_trade_user',
+                         include=['buy_price', 'sell_price', 'quantity']),
+            models.Index(fields=['updated_at'], name='tx_updated'),  # export watermark scans
+        ]
+
+
+class TradeTransactionArchive(models.Model):
+    # cold fills moved out of TradeTransaction by `manage.py archive_transactions`; read-only
+    id = models.BigIntegerField(primary_key=True)  # original TradeTransaction id
+    trade = models.ForeignKey(TradeMaster, on_delete=models.CASCADE, related_name='archived_fills')
+    buy_price = models.DecimalField(max_digits=10, decimal_places=2)
+    sell_price = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.IntegerField()
+    is_ai_correct = models.BooleanField(default=False)
+    profit_or_loss = models.CharField(max_length=10, choices=[('Profit', 'Profit'), ('Loss', 'Loss')])
+    profit_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    loss_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='archived_fills')
+    updated_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='+')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    COPY_FIELDS = ('id', 'trade_id', 'buy_price', 'sell_price', 'quantity', 'is_ai_correct', 'profit_or_loss',
+                   'profit_amount', 'loss_amount', 'created_by_id', 'updated_by_id', 'created_at', 'updated_at')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_by', 'created_at'], name='txarc_user_created'),
+            models.Index(fields=['created_by', 'updated_at'], name='txarc_user_updated'),
+            models.Index(fields=['trade', 'created_by'], name='txarc_trade_user'),
+            models.Index(fields=['updated_at'], name='txarc_updated'),
+        ]
+
+
+class TradeTransactionHistory(models.Model):
+    # read-only UNION ALL view over TradeTransaction + TradeTransactionArchive (migration 0008);
+    # range filters are pushed into both branches, so each table's indexes still apply
+    id = models.BigIntegerField(primary_key=True)
+    trade = models.ForeignKey(TradeMaster, on_delete=models.DO_NOTHING, db_constraint=False, related_name='+')
+    buy_price = models.DecimalField(max_digits=10, decimal_places=2)
+    sell_price = models.DecimalField(max_digits=10, decimal_places=2)
+    quantity = models.IntegerField()
+    is_ai_correct = models.BooleanField()
+    profit_or_loss = models.CharField(max_length=10)
+    profit_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True)
+    loss_amount = models.DecimalField(max_digits=12, decimal_places=2, null=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING,
+                                   db_constraint=False, related_name='+')
+    updated_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.DO_NOTHING,
+                                   db_constraint=False, null=True, related_name='+')
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    archived = models.BooleanField()
+
+    class Meta:
+        managed = False
+        db_table = 'trades_tradetransaction_history'
+
+
+def fills_model(start_day):
+    """TradeTransaction when every fill from ``start_day`` on is still hot, else the history view."""
+    hot_from = timezone.localdate() - timedelta(days=getattr(settings, 'TRADES_HOT_DAYS', 90))
+    if start_day is not None and start_day >= hot_from:
+        return TradeTransaction
+    return TradeTransactionHistory
 
 
 class TradeProfitLoss(models.Model):
@@ -73,6 +363,7 @@ class TradeProfitLoss(models.Model):
     profit_or_loss = models.CharField(max_length=10, choices=[('Profit','Profit'),('Loss','Loss')], blank=True, null=True)  # [2]
     profit_amount = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)  # [2]
     loss_amount   = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)  # [2]
+    net_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)  # running sum of transaction nets
     created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='ttpl_created')  # [2]
     updated_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='ttpl_updated')  # [2]
     created_at = models.DateTimeField(auto_now_add=True)  
@@ -92,6 +383,27 @@ class TradeProfitLoss(models.Model):
                 )
             ),
         ]
+        indexes = [
+            models.Index(fields=['created_by', 'updated_at'], name='tpl_user_updated'),  # account summary table
+        ]
+
+
+class TradeDailyRollup(models.Model):
+    # per-user, per-trade, per-day (of updated_at) sums of TradeTransaction; maintained by trades.ledger
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='daily_rollups')
+    trade = models.ForeignKey(TradeMaster, on_delete=models.CASCADE, related_name='daily_rollups')
+    day = models.DateField()
+    profit_or_loss = models.CharField(max_length=10, choices=[('Profit', 'Profit'), ('Loss', 'Loss')])
+    count = models.IntegerField(default=0)
+    profit_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    loss_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    capital_total = models.DecimalField(max_digits=18, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            # leading (created_by, day) also serves the dashboard's date-window scans
+            models.UniqueConstraint(fields=['created_by', 'day', 'trade', 'profit_or_loss'], name='uniq_rollup_user_day_trade_pl'),
+        ]
 
 
 class AccountSummary(TradeProfitLoss):
@@ -99,3 +411,40 @@ class AccountSummary(TradeProfitLoss):
         proxy = True
         verbose_name = "Account summary"
         verbose_name_plural = "Account summary"
+
+
+class ImportJob(models.Model):
+    QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (DONE, 'Done'), (FAILED, 'Failed')]
+
+    file = models.FileField(upload_to='imports/%Y/%m/%d/')
+    original_name = models.CharField(max_length=255)
+    mode = models.CharField(max_length=10, default='stream')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    rows_total = models.PositiveIntegerField(null=True, blank=True)  # estimate, for ETA
+    rows_processed = models.PositiveIntegerField(default=0)
+    rows_failed = models.PositiveIntegerField(default=0)
+    created_count = models.PositiveIntegerField(default=0)
+    skipped_count = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='import_jobs')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='importjob_status_created'),  # queue scan
+        ]
+
+    def __str__(self):
+        return f"{self.original_name} ({self.status})"
+
+    def eta_seconds(self):
+        # linear extrapolation from throughput so far
+        if self.status != self.RUNNING or not self.started_at or not self.rows_total or not self.rows_processed:
+            return None
+        elapsed = (timezone.now() - self.started_at).total_seconds()
+        remaining = max(self.rows_total - self.rows_processed, 0)
+        return round(elapsed / self.rows_processed * remaining, 1)
@@ -0,0 +1,100 @@
+# trades/news.py
+"""Bulk edits of TradeMaster.news_catalyst_summary with optimistic concurrency.
+
+Editors send only the rows they changed, each with the ``version`` they
+read. The rows are locked, every version is checked, and the new texts go
+out in one ``bulk_update`` that also bumps ``version`` and refreshes the
+fingerprint. If any row moved on since it was read, nothing is written and
+the current versions are returned instead. Cached news/plan responses and
+the search index follow the UPDATE by themselves (trades/cache.py,
+trades/search.py).
+"""
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import TradeMaster
+
+MAX_EDITS = 1000
+
+
+class NewsConflict(Exception):
+    """Raised with ``conflicts``: [{id, version, news_catalyst_summary}] as currently stored (version None: gone).
+
+    ``duplicate`` is set when the rows did not move on but their new texts
+    would make them copies of other plans (same fingerprint).
+    """
+
+    def __init__(self, conflicts, duplicate=False):
+        super().__init__(f"{len(conflicts)} edit(s) would duplicate another plan" if duplicate
+                         else f"{len(conflicts)} row(s) changed since they were read")
+        self.conflicts = conflicts
+        self.duplicate = duplicate
+
+
+def parse_edits(items):
+    """``[(id, summary, version), ...]`` from decoded JSON; ValueError on malformed input."""
+    if not isinstance(items, list) or not items:
+        raise ValueError('changes must be a non-empty list')
+    if len(items) > MAX_EDITS:
+        raise ValueError(f'At most {MAX_EDITS} changes per request')
+    edits = {}
+    for item in items:
+        if not isinstance(item, dict):
+            raise ValueError('Each change needs id, news_catalyst_summary and version')
+        pk, text, version = item.get('id'), item.get('news_catalyst_summary'), item.get('version')
+        if type(pk) is not int or type(version) is not int or not isinstance(text, str):
+            raise ValueError('Each change needs id, news_catalyst_summary and version')
+        edits[pk] = (pk, text, version)  # last one wins for a repeated id
+    return list(edits.values())
+
+
+def apply_news_edits(edits):
+    """Apply ``(id, summary, version)`` edits atomically; returns {id: new version} of rows written.
+
+    Raises NewsConflict when a row is missing or its version differs, and
+    for an edit that would duplicate another plan (same fingerprint).
+    """
+    ids = [pk for pk, _, _ in edits]
+    fields = ('id', 'version', 'created_at', *TradeMaster.FINGERPRINT_FIELDS)
+    with transaction.atomic():
+        rows = TradeMaster.objects.select_for_update().only(*fields).in_bulk(ids)
+        conflicts = [pk for pk, _, version in edits if pk not in rows or rows[pk].version != version]
+        if conflicts:
+            raise NewsConflict(_current(rows, conflicts))
+
+        now = timezone.now()
+        changed = []
+        for pk, text, _ in edits:
+            obj = rows[pk]
+            if obj.news_catalyst_summary == text:
+                continue
+            obj.news_catalyst_summary = text
+            obj.refresh_fingerprint()
+            obj.version += 1
+            obj.updated_at = now  # bulk_update skips auto_now
+            changed.append(obj)
+        try:
+            with transaction.atomic():
+                TradeMaster.objects.bulk_update(
+                    changed, ['news_catalyst_summary', 'fingerprint', 'version', 'updated_at'])
+        except IntegrityError:
+            raise NewsConflict(_current(rows, _duplicates(changed)), duplicate=True) from None
+    return {o.pk: o.version for o in changed}
+
+
+def _duplicates(changed):
+    # edits whose new fingerprint is already taken or repeated within the batch
+    counts = Counter(o.fingerprint for o in changed)
+    taken = set(TradeMaster.objects.filter(fingerprint__in=list(counts)).values_list('fingerprint', flat=True))
+    return [o.pk for o in changed if counts[o.fingerprint] > 1 or o.fingerprint in taken] or [o.pk for o in changed]
+
+
+def _current(rows, ids):
+    out = []
+    for pk in ids:
+        obj = rows.get(pk)
+        out.append({'id': pk, 'version': obj.version if obj else None,
+                    'news_catalyst_summary': obj.news_catalyst_summary if obj else None})
+    return out
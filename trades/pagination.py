@@ -0,0 +1,137 @@
+# trades/pagination.py
+"""Keyset (cursor) pagination and NDJSON streaming for the JSON list APIs.
+
+A page is ``WHERE (k1, k2, ...) > last_seen ORDER BY k1, k2, ... LIMIT n``,
+so its cost does not grow with the page number the way OFFSET does. The
+``next`` token is the last row's ordering values, base64-encoded JSON.
+"""
+import base64
+import binascii
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import JsonResponse, StreamingHttpResponse
+
+DEFAULT_PAGE_SIZE = 500
+MAX_PAGE_SIZE = 5000
+STREAM_CHUNK_SIZE = 2000  # rows per server-side cursor fetch
+
+
+def _cursor_default(o):
+    # full isoformat: DjangoJSONEncoder trims datetimes to milliseconds, which would skip/repeat rows
+    if hasattr(o, 'isoformat'):
+        return o.isoformat()
+    return str(o)
+
+
+def encode_cursor(values):
+    raw = json.dumps(values, default=_cursor_default, separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def _load_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        return json.loads(raw)
+    except (binascii.Error, ValueError) as e:
+        raise ValueError('Invalid cursor') from e
+
+
+def decode_cursor(token, qs, order):
+    """Ordering values from a ``next`` token, converted with each model field's ``to_python``."""
+    values = _load_cursor(token)
+    if not isinstance(values, list) or len(values) != len(order):
+        raise ValueError('Invalid cursor')
+    fields = [qs.model._meta.get_field(f.lstrip('-')) for f in order]
+    try:
+        return [f.to_python(v) for f, v in zip(fields, values)]
+    except Exception as e:  # ValidationError from to_python
+        raise ValueError('Invalid cursor') from e
+
+
+def decode_offset(token):
+    """Row offset from a ``next`` token of a ranked (OFFSET-paged) result such as plan search."""
+    values = _load_cursor(token)
+    if not (isinstance(values, list) and len(values) == 1 and type(values[0]) is int and values[0] >= 0):
+        raise ValueError('Invalid cursor')
+    return values[0]
+
+
+def _after(order, values):
+    # "(k1, k2, ...) past (v1, v2, ...)" expanded into ORs; '-' fields compare downwards
+    q = Q()
+    for i, field in enumerate(order):
+        name = field.lstrip('-')
+        cond = Q(**{f"{name}__{'lt' if field.startswith('-') else 'gt'}": values[i]})
+        for prev, v in zip(order[:i], values):
+            cond &= Q(**{prev.lstrip('-'): v})
+        q |= cond
+    return q
+
+
+def page_size(params):
+    try:
+        n = int(params.get('limit') or DEFAULT_PAGE_SIZE)
+    except ValueError:
+        n = DEFAULT_PAGE_SIZE
+    return max(1, min(n, MAX_PAGE_SIZE))
+
+
+def _seek(request, qs, order):
+    # ``qs`` in ``order``, past ``?cursor=`` when given; ValueError on a bad cursor
+    qs = qs.order_by(*order)
+    token = request.GET.get('cursor')
+    if token:
+        qs = qs.filter(_after(order, decode_cursor(token, qs, order)))
+    return qs
+
+
+def _page(rows, limit, order):
+    nxt = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        nxt = encode_cursor([rows[-1][f.lstrip('-')] for f in order])
+    return JsonResponse({'results': rows, 'next': nxt})
+
+
+def _ndjson(row):
+    return json.dumps(row, cls=DjangoJSONEncoder) + '\n'
+
+
+def keyset_response(request, qs, order):
+    """Page (or, with ``?format=ndjson``, stream) a ``.values()`` queryset in ``order``.
+
+    ``order`` must end in a unique field and every field must be in the values.
+    Responds ``{"results": [...], "next": token|null}``; pass ``?cursor=<next>``
+    for the following page. NDJSON streams every row after the cursor, one
+    JSON object per line.
+    """
+    try:
+        qs = _seek(request, qs, order)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    if request.GET.get('format') == 'ndjson':
+        rows = qs.iterator(chunk_size=STREAM_CHUNK_SIZE)  # server-side cursor on Postgres
+        return StreamingHttpResponse((_ndjson(row) for row in rows), content_type='application/x-ndjson')
+
+    limit = page_size(request.GET)
+    return _page(list(qs[:limit + 1]), limit, order)
+
+
+async def akeyset_response(request, qs, order):
+    """``keyset_response`` for async views: rows are fetched with the async ORM."""
+    try:
+        qs = _seek(request, qs, order)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    if request.GET.get('format') == 'ndjson':
+        async def lines():
+            async for row in qs.aiterator(chunk_size=STREAM_CHUNK_SIZE):
+                yield _ndjson(row)
+        return StreamingHttpResponse(lines(), content_type='application/x-ndjson')
+
+    limit = page_size(request.GET)
+    return _page([row async for row in qs[:limit + 1]], limit, order)
@@ -0,0 +1,141 @@
+# trades/search.py
+"""Ranked full-text search over plan catalysts.
+
+The index covers ``stock_name`` and ``news_catalyst_summary`` and is kept
+by the database itself (migration 0011), so imports (``bulk_create``),
+news edits (``bulk_update``, trades/news.py) and model saves all refresh it:
+
+- Postgres: ``trades_trademaster.search_vector``, a stored generated
+  ``tsvector`` column (english config) with the GIN index ``tm_search``;
+  hits are ranked by ``ts_rank``.
+- SQLite: the FTS5 table ``trades_trademaster_fts`` (porter stemming),
+  an external-content index synced by triggers; ranked by ``bm25``.
+
+Either way every word of the query must match (stemmed), and results come
+back best first, ties newest first.
+"""
+import re
+
+from django.db import connection, connections
+
+from .models import TradeMaster
+
+POSTGRES_INDEX = [
+    "ALTER TABLE trades_trademaster ADD COLUMN IF NOT EXISTS search_vector tsvector GENERATED ALWAYS AS ("
+    "setweight(to_tsvector('english', coalesce(stock_name, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(news_catalyst_summary, '')), 'B')) STORED",
+    'CREATE INDEX IF NOT EXISTS tm_search ON trades_trademaster USING gin (search_vector)',
+]
+POSTGRES_DROP = [
+    'DROP INDEX IF EXISTS tm_search',
+    'ALTER TABLE trades_trademaster DROP COLUMN IF EXISTS search_vector',
+]
+
+SQLITE_INDEX = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS trades_trademaster_fts USING fts5(stock_name, news_catalyst_summary, "
+    "content='trades_trademaster', content_rowid='id', tokenize='porter unicode61')",
+    'CREATE TRIGGER IF NOT EXISTS trades_trademaster_fts_ai AFTER INSERT ON trades_trademaster BEGIN '
+    'INSERT INTO trades_trademaster_fts(rowid, stock_name, news_catalyst_summary) '
+    'VALUES (new.id, new.stock_name, new.news_catalyst_summary); END',
+    'CREATE TRIGGER IF NOT EXISTS trades_trademaster_fts_ad AFTER DELETE ON trades_trademaster BEGIN '
+    "INSERT INTO trades_trademaster_fts(trades_trademaster_fts, rowid, stock_name, news_catalyst_summary) "
+    "VALUES ('delete', old.id, old.stock_name, old.news_catalyst_summary); END",
+    'CREATE TRIGGER IF NOT EXISTS trades_trademaster_fts_au AFTER UPDATE OF stock_name, news_catalyst_summary '
+    'ON trades_trademaster BEGIN '
+    "INSERT INTO trades_trademaster_fts(trades_trademaster_fts, rowid, stock_name, news_catalyst_summary) "
+    "VALUES ('delete', old.id, old.stock_name, old.news_catalyst_summary); "
+    'INSERT INTO trades_trademaster_fts(rowid, stock_name, news_catalyst_summary) '
+    'VALUES (new.id, new.stock_name, new.news_catalyst_summary); END',
+]
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS trades_trademaster_fts_ai',
+    'DROP TRIGGER IF EXISTS trades_trademaster_fts_ad',
+    'DROP TRIGGER IF EXISTS trades_trademaster_fts_au',
+    'DROP TABLE IF EXISTS trades_trademaster_fts',
+]
+_SQLITE_TRIGGERS = 3
+INDEX_MIGRATION = '0011_plan_search'  # installs the index; later table rebuilds reinstall it
+
+
+def install_index(using='default'):
+    """Create the search index if missing (idempotent).
+
+    On SQLite, Django rebuilds a table to alter it and its triggers go with
+    it, so this also runs after every ``migrate`` and rebuilds the FTS
+    table whenever a trigger had to be recreated.
+    """
+    conn = connections[using]
+    if conn.vendor == 'postgresql':
+        statements = POSTGRES_INDEX
+    elif conn.vendor == 'sqlite':
+        statements = SQLITE_INDEX
+    else:
+        return
+    with conn.cursor() as cur:
+        if conn.vendor == 'sqlite':
+            cur.execute("SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name LIKE %s",
+                        ['trades_trademaster_fts_a%'])
+            stale = cur.fetchone()[0] < _SQLITE_TRIGGERS
+        for sql in statements:
+            cur.execute(sql)
+        if conn.vendor == 'sqlite' and stale:
+            cur.execute("INSERT INTO trades_trademaster_fts(trades_trademaster_fts) VALUES ('rebuild')")
+
+
+def drop_index(using='default'):
+    conn = connections[using]
+    statements = {'postgresql': POSTGRES_DROP, 'sqlite': SQLITE_DROP}.get(conn.vendor, [])
+    with conn.cursor() as cur:
+        for sql in statements:
+            cur.execute(sql)
+
+
+HIT_FIELDS = ('id', 'stock_name', 'option_strike_price_expiry', 'news_catalyst_summary', 'created_at', 'version')
+_WORD_RE = re.compile(r'\w+')
+
+
+def _postgres_ids(query, start, end, limit, offset):
+    sql = ["SELECT id FROM trades_trademaster, plainto_tsquery('english', %s) q WHERE search_vector @@ q"]
+    params = [query]
+    if start:
+        sql.append('AND created_at >= %s')
+        params.append(start)
+    if end:
+        sql.append('AND created_at <= %s')
+        params.append(end)
+    sql.append('ORDER BY ts_rank(search_vector, q) DESC, id DESC LIMIT %s OFFSET %s')
+    return ' '.join(sql), params + [limit, offset]
+
+
+def _sqlite_ids(query, start, end, limit, offset):
+    # quoted words: user input is never parsed as FTS5 syntax (AND/NEAR/column filters)
+    match = ' '.join(f'"{w}"' for w in _WORD_RE.findall(query))
+    sql = ['SELECT t.id FROM trades_trademaster_fts f JOIN trades_trademaster t ON t.id = f.rowid '
+           'WHERE trades_trademaster_fts MATCH %s']
+    params = [match]
+    if start:
+        sql.append('AND t.created_at >= %s')
+        params.append(start)
+    if end:
+        sql.append('AND t.created_at <= %s')
+        params.append(end)
+    sql.append('ORDER BY bm25(trades_trademaster_fts), t.id DESC LIMIT %s OFFSET %s')
+    return ' '.join(sql), params + [limit, offset]
+
+
+def search_plans(query, start=None, end=None, limit=50, offset=0):
+    """Plans matching ``query`` (optionally created in [start, end]) as ``HIT_FIELDS`` dicts, best first.
+
+    Returns ``(hits, more)``; ``more`` tells whether hits exist past ``offset + limit``.
+    """
+    if not _WORD_RE.search(query or ''):
+        return [], False
+    build = _postgres_ids if connection.vendor == 'postgresql' else _sqlite_ids
+    sql, params = build(query, start, end, limit + 1, offset)
+    with connection.cursor() as cur:
+        cur.execute(sql, params)
+        ids = [row[0] for row in cur.fetchall()]
+    more = len(ids) > limit
+    ids = ids[:limit]
+    rows = {r['id']: r for r in TradeMaster.objects.filter(id__in=ids).values(*HIT_FIELDS)}
+    return [rows[i] for i in ids if i in rows], more
@@ -1,46 +1,70 @@
 # trades/signals.py
-from decimal import Decimal, ROUND_HALF_UP
-from django.db import transaction
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_save
+from django.db import connections
+from django.db.migrations.recorder import MigrationRecorder
 from django.dispatch import receiver
-from django.db.models import F, Sum, ExpressionWrapper, DecimalField
+from django.utils import timezone
 
-from .models import TradeTransaction, TradeProfitLoss
+from . import ledger, search
+from .models import TradeTransaction
 
-SCALE = Decimal('100')  # multiply difference by 100 per requirement
+def _place(pk):
+    # (trade_id, user_id, updated_at) of the stored row, None if there is none
+    return TradeTransaction.objects.filter(pk=pk).values_list('trade_id', 'created_by_id', 'updated_at').first()
+
+
+def _places(instance):
+    # where the row sat before the save and where it sits now
+    return [p for p in (getattr(instance, '_stored_place', None), _place(instance.pk)) if p]
+
+
+@receiver(pre_save, sender=TradeTransaction)
+def locate_stored_row(sender, instance: TradeTransaction, raw=False, **kwargs):
+    instance._stored_place = None
+    if raw or ledger.is_suppressed() or instance.pk is None:
+        return
+    if getattr(instance, '_ledger_state', None) is None or getattr(instance, '_rollup_state', None) is None:
+        # no snapshot to diff against: the old key/day is only known from the stored row
+        instance._stored_place = _place(instance.pk)
 
-def _quantize2(v: Decimal) -> Decimal:
-    return (v or Decimal('0')).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
 
 @receiver(post_save, sender=TradeTransaction)
-def propagate_tpl(sender, instance: TradeTransaction, created, **kwargs):
-    # Recompute NET across all TX rows for this trade+user after commit
-    def _upsert():
-        expr = ExpressionWrapper(
-            (F('sell_price') - F('buy_price')) * F('quantity'),
-            output_field=DecimalField(max_digits=18, decimal_places=2),
-        )  # (sell - buy) * 100 in the DB [1][4]
-
-        agg = (TradeTransaction.objects
-               .filter(trade=instance.trade, created_by=instance.created_by)
-               .aggregate(net=Sum(expr)))  # net sum across rows [4]
-
-        net = _quantize2(agg['net'] or Decimal('0'))  # 2dp rounding [5]
-        if net >= 0:
-            pol, profit_amt, loss_amt = 'Profit', net, None
-        else:
-            pol, profit_amt, loss_amt = 'Loss', None, (-net)  # absolute loss [21]
-
-        TradeProfitLoss.objects.update_or_create(
-            trade=instance.trade,
-            created_by=instance.created_by,
-            defaults={
-                'profit_or_loss': pol,
-                'profit_amount': profit_amt,
-                'loss_amount': loss_amt,
-                'updated_by': instance.updated_by or instance.created_by,
-            },
-        )  # single per-(trade,user) row reflects the net [23]
-
-    transaction.on_commit(_upsert)  # run only after TX is durable [22]
+def propagate_tpl(sender, instance: TradeTransaction, created, raw=False, **kwargs):
+    if raw or ledger.is_suppressed():
+        return  # fixtures: run `manage.py reconcile_tpl --fix` and `rebuild_rollups` afterwards
+    old = getattr(instance, '_ledger_state', None)
+    new = instance.ledger_state()
+    old_rollup = getattr(instance, '_rollup_state', None)
+    new_rollup = instance.rollup_state()
+    places = _places(instance) if not created and (old is None or old_rollup is None) else []
+
+    if old is None and not created:
+        # saved without a loaded snapshot (hand-built or deferred fields): rebuild the keys instead of guessing a delta
+        ledger.mark_dirty({(t, u) for t, u, _ in places})
+    else:
+        ledger.track_change(old, new, instance.updated_by_id)  # delta now, or once per ledger.batched() block
+    instance._ledger_state = new
+
+    if old_rollup is None and not created:
+        # same rule for the rollup: rebuild the days the row left and landed on
+        ledger.mark_dirty((), {(t, u, timezone.localdate(at)) for t, u, at in places})
+    else:
+        ledger.track_rollup(old_rollup, new_rollup)
+    instance._rollup_state = new_rollup
+
+@receiver(post_delete, sender=TradeTransaction)
+def retract_tpl(sender, instance: TradeTransaction, **kwargs):
+    if ledger.is_suppressed():
+        return  # archive_transactions: the fill moved, the ledger is unchanged
+    old = getattr(instance, '_ledger_state', None) or instance.ledger_state()
+    ledger.track_change(old, None, instance.updated_by_id)
+    ledger.track_rollup(getattr(instance, '_rollup_state', None) or instance.rollup_state(), None)
+
 
+@receiver(post_migrate)
+def reinstall_search_index(sender, app_config=None, using='default', plan=None, **kwargs):
+    # SQLite drops the FTS triggers whenever a migration rebuilds trades_trademaster
+    if app_config is None or app_config.name != 'trades' or not plan or connections[using].vendor != 'sqlite':
+        return
+    if ('trades', search.INDEX_MIGRATION) in MigrationRecorder(connections[using]).applied_migrations():
+        search.install_index(using)
@@ -1,3 +1,1130 @@
-from django.test import TestCase
+import asyncio
+import os
+import tempfile
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from io import BytesIO, StringIO
+import time as time_mod
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import pandas as pd
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.http import JsonResponse, StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+from django.urls import reverse
+
+from .analytics import accuracy_stats
+from .backtest import run_backtest
+from .filter import TradePlanFilter
+from .jobs import claim_next, enqueue, requeue_stale, run_job
+from .search import search_plans
+from .importer import bulk_insert, frame_to_instances, import_frame, import_upload, normalize_columns
+from . import bench, ledger, middleware
+from .throttle import limit_per_user
+from .models import (
+    ImportJob, Instrument, TradeDailyRollup, TradeMaster, TradeProfitLoss, TradeTransaction,
+    TradeTransactionArchive, parse_instrument,
+)
+
+
+def make_trade(i):
+    return TradeMaster.objects.create(
+        stock_name=f"STOCK{i}",
+        option_strike_price_expiry=f"STOCK{i} {100 + i} CE",
+        option_buy_price=Decimal('100.00'),
+        intraday_exit_price_target=Decimal('120.00'),
+        stop_loss_price=Decimal('90.00'),
+        support_level='95',
+        resistance_level='125',
+        capital_required=Decimal('10000.00'),
+        max_loss_if_stop_loss_hits=Decimal('1000.00'),
+        max_profit_if_target_hits=Decimal('2000.00'),
+        news_catalyst_summary=f"Catalyst {i}",
+    )
+
+
+def make_fill(trade, user, buy, sell, qty=10):
+    net = (Decimal(sell) - Decimal(buy)) * qty
+    return TradeTransaction.objects.create(
+        trade=trade, buy_price=buy, sell_price=sell, quantity=qty,
+        is_ai_correct=net >= 0,
+        profit_or_loss='Profit' if net >= 0 else 'Loss',
+        profit_amount=net if net >= 0 else None,
+        loss_amount=-net if net < 0 else None,
+        created_by=user, updated_by=user,
+    )
+
+
+def plan_sheet(names, **columns):
+    n = len(names)
+    data = {
+        'Stock Name': names,
+        'Option Strike Price & Expiry': [f'{name} 100 CE' for name in names],
+        'Option Buy Price (₹)': ['100'] * n, 'Intraday Exit Price Target (₹)': ['120'] * n,
+        'Stop Loss Price (₹)': ['90'] * n, 'Capital Required (₹)': ['10,000'] * n,
+        'Max Loss If Stop Loss Hits (₹)': ['1000'] * n, 'Max Profit If Target Hits (₹)': ['2000'] * n,
+        'Support Level (₹)': ['95'] * n, 'Resistance Level (₹)': ['125'] * n,
+    }
+    data.update(columns)
+    return pd.DataFrame(data)
+
+
+class AccountSummaryQueryBudgetTests(TestCase):
+    # session + user + changelist count/page + one rollup pass
+    QUERY_BUDGET = 5
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser('trader', 'trader@example.com', 'pw')
+        cls.trades = [make_trade(i) for i in range(3)]
+        for t in cls.trades:
+            make_fill(t, cls.user, '100.00', '110.00')
+            make_fill(t, cls.user, '100.00', '95.00')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = reverse('admin:trades_accountsummary_changelist')
+
+    def test_dashboard_totals(self):
+        resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.context_data['totals'], {
+            'trades': 6.0, 'profit_total': 300.0, 'loss_total': 150.0, 'capital_total': 6000.0,
+        })
+        self.assertEqual([t['id'] for t in resp.context_data['trade_choices']], [t.id for t in self.trades])
+
+    def test_dashboard_query_budget(self):
+        for gran in ('day', 'week', 'month', 'year'):
+            with self.subTest(gran=gran), self.assertNumQueries(self.QUERY_BUDGET):
+                self.client.get(self.url, {'gran': gran, 'kind': 'profit'})
+
+    def test_query_budget_independent_of_volume(self):
+        for i in range(3, 13):
+            t = make_trade(i)
+            for _ in range(5):
+                make_fill(t, self.user, '100.00', '101.00')
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            self.client.get(self.url, {'gran': 'month'})
+
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('trader', 'trader@example.com', 'pw')
+        trade = make_trade(0)
+        cls.fills = [make_fill(trade, cls.user, '100.00', str(100 + i)) for i in range(7)]
+        # same created_at for several rows exercises the id tiebreak
+        TradeTransaction.objects.filter(pk__in=[f.pk for f in cls.fills[:4]]).update(created_at=cls.fills[0].created_at)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.url = reverse('transactions_list_api')
+
+    def test_pages_cover_every_row_once(self):
+        seen, params = [], {'limit': 3}
+        while True:
+            body = self.client.get(self.url, params).json()
+            seen += [r['id'] for r in body['results']]
+            if not body['next']:
+                break
+            params['cursor'] = body['next']
+        expected = list(TradeTransaction.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(seen, expected)
+
+    def test_ndjson_streams_all_rows(self):
+        resp = self.client.get(self.url, {'format': 'ndjson'})
+        self.assertEqual(resp['Content-Type'], 'application/x-ndjson')
+        lines = b''.join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), len(self.fills))
+
+    def test_bad_cursor(self):
+        self.assertEqual(self.client.get(self.url, {'cursor': 'not-a-cursor'}).status_code, 400)
+
+
+
+class PlanCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        make_trade(0)
+        self.url = reverse('trade_news_api')
+
+    def test_repeat_request_only_reads_stamp(self):
+        first = self.client.get(self.url)
+        with self.assertNumQueries(1):
+            second = self.client.get(self.url)
+        self.assertEqual(first.content, second.content)
+
+    def test_conditional_request_gets_304(self):
+        etag = self.client.get(self.url)['ETag']
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_write_for_the_day_invalidates(self):
+        etag = self.client.get(self.url)['ETag']
+        make_trade(1)
+        resp = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.json()['results']), 2)
+
+    def test_writes_seen_without_shared_cache(self):
+        # another worker process wrote: no stamp was touched in this process's cache
+        self.client.get(self.url)
+        plan = TradeMaster.objects.get()
+        TradeMaster.objects.filter(pk=plan.pk).update(news_catalyst_summary='Elsewhere', updated_at=timezone.now())
+        self.assertEqual(self.client.get(self.url).json()['results'][0]['news_catalyst_summary'], 'Elsewhere')
+        TradeMaster.objects.filter(pk=plan.pk).delete()
+        self.assertEqual(self.client.get(self.url).json()['results'], [])
+
+    def test_daily_plan_page_is_cached(self):
+        url = reverse('daily-plan')
+        self.assertContains(self.client.get(url), 'STOCK0')
+        with self.assertNumQueries(1):
+            self.assertContains(self.client.get(url), 'STOCK0')
+
+
+
+class PlanMetricsTests(TestCase):
+    def test_import_matches_model_metrics(self):
+        df = pd.DataFrame({
+            'Stock Name': ['AAA', 'BBB', 'CCC'],
+            'Option Strike Price & Expiry': ['AAA 100 CE', 'BBB 50 PE', 'CCC 10 CE'],
+            'Option Buy Price (₹)': ['₹1,00.50', '40', '0'],
+            'Intraday Exit Price Target (₹)': ['130', '52', '5'],
+            'Stop Loss Price (₹)': ['90.25', '45', '1'],
+            'Capital Required (₹)': ['10,000', '1000', '500'],
+            'Max Loss If Stop Loss Hits (₹)': ['1000', '100', '10'],
+            'Max Profit If Target Hits (₹)': ['3000', '300', '50'],
+            'Support Level (₹)': ['₹1,245 (prev high)', 'n/a', '9.5-9.8'],
+            'Resistance Level (₹)': ['135', '', '12'],
+        })
+        objs, invalid = frame_to_instances(normalize_columns(df))
+        self.assertEqual(invalid, 0)
+        for obj in objs:
+            imported = {f: getattr(obj, f) for f in TradeMaster.METRIC_FIELDS}
+            obj.refresh_metrics()
+            self.assertEqual(imported, {f: getattr(obj, f) for f in TradeMaster.METRIC_FIELDS})
+
+        aaa, bbb, ccc = objs
+        self.assertEqual((aaa.risk_per_share, aaa.lot_quantity, aaa.reward_risk_ratio),
+                         (Decimal('10.25'), 99, Decimal('2.88')))
+        self.assertEqual((aaa.support_price, aaa.resistance_price), (Decimal('1245.00'), Decimal('135.00')))
+        self.assertIsNone(bbb.reward_risk_ratio)  # stop above entry: no risk to divide by
+        self.assertIsNone(bbb.support_price)
+        self.assertIsNone(ccc.lot_quantity)
+
+
+class PlanFingerprintTests(TestCase):
+    def _sheet(self, **overrides):
+        row = {
+            'Stock Name': 'AAA', 'Option Strike Price & Expiry': 'AAA 100 CE',
+            'Option Buy Price (₹)': '100', 'Intraday Exit Price Target (₹)': '120',
+            'Stop Loss Price (₹)': '90', 'Capital Required (₹)': '10000',
+            'Max Loss If Stop Loss Hits (₹)': '1000', 'Max Profit If Target Hits (₹)': '2000',
+            'Support Level (₹)': '95', 'Resistance Level (₹)': '125',
+            'News Catalyst Summary': 'Results beat estimates',
+        }
+        row.update(overrides)
+        return pd.DataFrame([row])
+
+    def test_import_matches_model_fingerprint(self):
+        objs, _ = frame_to_instances(normalize_columns(self._sheet()))
+        imported = objs[0].fingerprint
+        objs[0].refresh_fingerprint()
+        self.assertEqual(imported, objs[0].fingerprint)
+
+    def test_reupload_skips_known_plans(self):
+        self.assertEqual(import_frame(self._sheet())['created'], 1)
+        again = import_frame(self._sheet(**{'News Catalyst Summary': '  Results  beat\nestimates ',
+                                            'Option Buy Price (₹)': '100.00'}))
+        self.assertEqual((again['created'], again['skipped']), (0, 1))
+        changed = import_frame(self._sheet(**{'Stop Loss Price (₹)': '91'}))
+        self.assertEqual(changed['created'], 1)
+        self.assertEqual(TradeMaster.objects.count(), 2)
+
+
+class InstrumentTests(TestCase):
+    def test_parse_option_text(self):
+        today = datetime(2026, 10, 18).date()
+        cases = {
+            'NIFTY 24500 CE 26-Sep-2024': ('NIFTY', Decimal('24500.00'), 'CE', datetime(2024, 9, 26).date()),
+            'banknifty 52000 put 30 Oct': ('BANKNIFTY', Decimal('52000.00'), 'PE', datetime(2026, 10, 30).date()),
+            'NIFTY 02JAN 24000CE': ('NIFTY', Decimal('24000.00'), 'CE', datetime(2027, 1, 2).date()),
+            'TCS 4,000 PE 27/11/2026': ('TCS', Decimal('4000.00'), 'PE', datetime(2026, 11, 27).date()),
+            'RELIANCE': ('RELIANCE', None, '', None),
+        }
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                parts = parse_instrument(text, today=today)
+                self.assertEqual((parts['underlying'], parts['strike'], parts['option_type'], parts['expiry']),
+                                 expected)
+
+    def test_import_shares_instruments_and_filters_by_them(self):
+        today = timezone.localdate()
+        expiry = today - timedelta(days=today.weekday()) + timedelta(days=3)  # Thursday of this week
+        df = pd.DataFrame({
+            'Stock Name': ['NIFTY', 'NIFTY', 'TCS'],
+            'Option Strike Price & Expiry': [f'NIFTY 24500 CE {expiry:%d-%b-%Y}'] * 2 + ['TCS 4000 PE 01-Jan-2020'],
+            'Option Buy Price (₹)': ['100', '101', '50'],
+            'Intraday Exit Price Target (₹)': ['120', '121', '60'],
+            'Stop Loss Price (₹)': ['90', '91', '45'],
+            'Capital Required (₹)': ['10000', '10000', '5000'],
+            'Max Loss If Stop Loss Hits (₹)': ['1000', '1000', '500'],
+            'Max Profit If Target Hits (₹)': ['2000', '2000', '1000'],
+            'Support Level (₹)': ['95', '95', '48'],
+            'Resistance Level (₹)': ['125', '125', '62'],
+        })
+        self.assertEqual(import_frame(df)['created'], 3)
+        self.assertEqual(Instrument.objects.count(), 2)
+        nifty = Instrument.objects.get(underlying='NIFTY')
+        self.assertEqual((nifty.strike, nifty.option_type, nifty.expiry), (Decimal('24500.00'), 'CE', expiry))
+
+        f = TradePlanFilter({'underlying': 'nifty', 'expiring': 'week'}, queryset=TradeMaster.objects.all())
+        self.assertEqual({t.instrument_id for t in f.qs}, {nifty.pk})
+        self.assertEqual(f.qs.count(), 2)
+        f = TradePlanFilter({'strike': '4000', 'option_type': 'PE'}, queryset=TradeMaster.objects.all())
+        self.assertEqual([t.stock_name for t in f.qs], ['TCS'])
+
+        plan = TradeMaster.objects.get(stock_name='TCS')
+        plan.option_strike_price_expiry = 'TCS 4100 PE 01-Jan-2020'
+        plan.save()  # re-parsed on save
+        self.assertEqual(plan.instrument.strike, Decimal('4100.00'))
+
+
+class PlanImportTests(TestCase):
+    def _names(self):
+        return sorted(TradeMaster.objects.values_list('stock_name', flat=True))
+
+    def test_bulk_insert_skips_duplicates_in_batch_and_database(self):
+        import_frame(plan_sheet(['AAA']))
+        objs, invalid = frame_to_instances(normalize_columns(plan_sheet(
+            ['AAA', 'BBB', 'BBB', 'CCC', 'AAA', 'DDD', 'EEE'],
+            **{'Stop Loss Price (₹)': ['90'] * 6 + ['']})))
+        self.assertEqual((len(objs), invalid), (6, 1))
+        # per batch: fingerprints, instruments (read, insert, re-read), plans, inserted rows
+        with self.assertNumQueries(3 * 6):
+            created, skipped = bulk_insert(objs, batch_size=2)
+        self.assertEqual((created, skipped), (3, 3))
+        self.assertEqual(self._names(), ['AAA', 'BBB', 'CCC', 'DDD'])
+
+    def test_bulk_insert_counts_rows_lost_to_a_concurrent_upload_as_skipped(self):
+        import_frame(plan_sheet(['AAA']))
+        objs, _ = frame_to_instances(normalize_columns(plan_sheet(['AAA', 'BBB'])))
+        # AAA committed by another upload after the fingerprint lookup
+        with mock.patch('trades.importer._existing_keys', return_value=set()):
+            created, skipped = bulk_insert(objs)
+        self.assertEqual((created, skipped), (1, 1))
+        self.assertEqual(self._names(), ['AAA', 'BBB'])
+
+    def _upload(self, df, name):
+        buf = BytesIO()
+        if name.endswith('.csv'):
+            df.to_csv(buf, index=False)
+        else:
+            df.to_excel(buf, index=False)
+        return SimpleUploadedFile(name, buf.getvalue())
+
+    def test_stream_mode_commits_chunks(self):
+        sheet = plan_sheet(['AAA', 'BBB', 'CCC', 'AAA', 'DDD'])
+        for name in ('plans.csv', 'plans.xlsx'):
+            with self.subTest(name=name):
+                TradeMaster.objects.all().delete()
+                seen = []
+                result = import_upload(self._upload(sheet, name), mode='stream', chunk_size=2, batch_size=1,
+                                       progress=seen.append)
+                self.assertEqual(result, {'rows': 5, 'created': 4, 'skipped': 1, 'invalid': 0, 'chunks': 3,
+                                          'updated': 0})
+                self.assertEqual([t['rows'] for t in seen], [2, 4, 5])  # after every committed chunk
+                self.assertEqual(self._names(), ['AAA', 'BBB', 'CCC', 'DDD'])
+                self.assertEqual(TradeMaster.objects.get(stock_name='AAA').capital_required, Decimal('10000.00'))
+
+    def test_api_sync_upload_runs_the_import_service(self):
+        url = reverse('api-upload-excel') + '?sync=1'
+        sheet = plan_sheet(['AAA', 'BBB'])
+        resp = self.client.post(url, {'file': self._upload(sheet, 'plans.csv')})
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.json(), {'success': 'Data uploaded successfully', 'rows': 2, 'created': 2,
+                                       'skipped': 0, 'invalid': 0, 'updated': 0})
+        again = self.client.post(url + '&mode=stream', {'file': self._upload(sheet, 'plans.xlsx')}).json()
+        self.assertEqual((again['created'], again['skipped'], again['chunks']), (0, 2, 1))
+        bad = self.client.post(url + '&mode=fast', {'file': self._upload(sheet, 'plans.csv')})
+        self.assertEqual((bad.status_code, bad.json()), (400, {'error': 'Unknown import mode: fast'}))
+        self.assertEqual(self.client.post(url, {'file': SimpleUploadedFile('plans.txt', b'x')}).status_code, 400)
+        self.assertEqual(TradeMaster.objects.count(), 2)
+
+
+class ImportJobTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user('trader', 'trader@example.com', 'pw')
+        cls.other = User.objects.create_user('other', 'other@example.com', 'pw')
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        override = self.settings(MEDIA_ROOT=media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.client.force_login(self.user)
+
+    def _csv(self, text):
+        return SimpleUploadedFile('plans.csv', text.encode())
+
+    def _plans_csv(self):
+        buf = BytesIO()
+        plan_sheet(['AAA', 'BBB', 'AAA']).to_csv(buf, index=False)
+        return SimpleUploadedFile('plans.csv', buf.getvalue())
+
+    def test_queued_upload_is_claimed_once_and_run(self):
+        resp = self.client.post(reverse('api-upload-excel'), {'file': self._plans_csv()})
+        self.assertEqual(resp.status_code, 202)
+        job_id = resp.json()['job_id']
+        job = claim_next()
+        self.assertEqual((job.pk, job.status), (job_id, ImportJob.RUNNING))
+        self.assertIsNone(claim_next())  # nothing else queued; a second worker gets nothing
+        path = job.file.path
+        self.assertEqual(run_job(job)['created'], 2)
+        self.assertFalse(os.path.exists(path))
+
+        body = self.client.get(reverse('import_job_status', args=[job_id])).json()
+        self.assertEqual((body['status'], body['rows_total'], body['rows_processed'], body['created'],
+                          body['skipped']), ('done', 3, 3, 2, 1))
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(reverse('import_job_status', args=[job_id])).status_code, 404)
+
+    def test_upload_params_are_checked_before_queueing(self):
+        url = reverse('api-upload-excel')
+        bad = self.client.post(url + '?mode=foo', {'file': self._plans_csv()})
+        self.assertEqual((bad.status_code, bad.json()), (400, {'error': 'Unknown import mode: foo'}))
+        self.assertFalse(ImportJob.objects.exists())
+        for flag in ('0', 'false'):
+            with self.subTest(sync=flag):
+                self.assertEqual(self.client.post(f'{url}?sync={flag}', {'file': self._plans_csv()}).status_code, 202)
+        self.assertEqual(ImportJob.objects.count(), 2)
+
+    def test_status_only_for_the_uploader(self):
+        mine = enqueue(self._plans_csv(), self.user)
+        anonymous = enqueue(self._plans_csv())
+        get_user_model().objects.filter(pk=self.other.pk).update(is_staff=True)
+        self.client.force_login(self.other)
+        for job in (mine, anonymous):
+            self.assertEqual(self.client.get(reverse('import_job_status', args=[job.pk])).status_code, 404)
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('import_job_status', args=[anonymous.pk])).status_code, 404)
+        self.client.force_login(get_user_model().objects.create_superuser('root', 'root@example.com', 'pw'))
+        self.assertEqual(self.client.get(reverse('import_job_status', args=[anonymous.pk])).status_code, 200)
+
+    def test_stale_running_job_is_requeued(self):
+        job = enqueue(self._plans_csv(), self.user)
+        claim_next()
+        self.assertEqual(requeue_stale(minutes=30), 0)
+        ImportJob.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(minutes=31))
+        self.assertEqual(requeue_stale(minutes=30), 1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.started_at), (ImportJob.QUEUED, None))
+        self.assertEqual(claim_next().pk, job.pk)
+
+    def test_failed_import_keeps_the_file(self):
+        enqueue(self._csv('Stock Name\nAAA\n'), self.user)
+        job = claim_next()
+        with self.assertLogs('trades.jobs', 'ERROR'):
+            self.assertIsNone(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, ImportJob.FAILED)
+        self.assertIn('Missing columns', job.error)
+        self.assertTrue(os.path.exists(job.file.path))  # kept for a retry
+        self.assertFalse(TradeMaster.objects.exists())
+
+
+class PlanSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pw')
+        summaries = ['Strong quarterly earnings beat', 'RBI policy meeting, rate cut hopes',
+                     'Earnings preview; earnings call on Friday', 'Block deal in promoter stake']
+        cls.plans = [make_trade(i) for i in range(len(summaries))]
+        for plan, text in zip(cls.plans, summaries):
+            plan.news_catalyst_summary = text
+            plan.save()
+
+    def test_ranked_and_paged(self):
+        resp = self.client.get(reverse('plan_search_api'), {'q': 'earning', 'limit': 1})
+        body = resp.json()
+        self.assertEqual([r['id'] for r in body['results']], [self.plans[2].pk])  # two mentions rank first
+        body = self.client.get(reverse('plan_search_api'), {'q': 'earning', 'cursor': body['next'], 'limit': 1}).json()
+        self.assertEqual([r['id'] for r in body['results']], [self.plans[0].pk])
+        self.assertIsNone(body['next'])
+
+        hits = self.client.get(reverse('plan_search_api'), {'q': 'rbi policies'}).json()['results']
+        self.assertEqual([r['id'] for r in hits], [self.plans[1].pk])  # every word, stemmed
+        self.assertEqual(self.client.get(reverse('plan_search_api'), {'q': 'rbi earnings'}).json()['results'], [])
+        self.assertEqual(self.client.get(reverse('plan_search_api')).status_code, 400)
+
+    def test_index_follows_news_edits(self):
+        TradeMaster.objects.filter(pk=self.plans[3].pk).update(news_catalyst_summary='Dividend record date')
+        self.client.force_login(self.user)
+        resp = self.client.get(reverse('admin:trades_news'), {'q': 'dividend'})
+        self.assertEqual([r['id'] for r in resp.context['rows']], [self.plans[3].pk])
+        self.assertEqual(search_plans('promoter')[0], [])
+
+class PlanResultsPageTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pw')
+        cls.trades = [make_trade(i) for i in range(3)]
+        TradeProfitLoss.objects.create(trade=cls.trades[0], created_by=cls.user, profit_or_loss='Profit',
+                                       profit_amount=Decimal('5.00'))
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def _post_data(self, results):
+        data = {'r-TOTAL_FORMS': len(results), 'r-INITIAL_FORMS': len(results)}
+        for i, (trade, pol, profit, loss) in enumerate(results):
+            data.update({f'r-{i}-trade_id': trade.pk, f'r-{i}-profit_or_loss': pol,
+                         f'r-{i}-profit_amount': profit, f'r-{i}-loss_amount': loss})
+        return data
+
+    def test_browsing_creates_no_rows(self):
+        resp = self.client.get(reverse('admin:trades_plan'))
+        rows = {t.pk: t for t in resp.context['rows']}
+        self.assertEqual(rows[self.trades[0].pk].pl_profit_amount, Decimal('5.00'))
+        self.assertIsNone(rows[self.trades[1].pk].pl_profit_or_loss)
+        self.assertEqual(TradeProfitLoss.objects.count(), 1)
+
+    def test_submit_creates_and_updates_only_changed(self):
+        results = [(self.trades[0], 'Loss', '', '7.50'), (self.trades[1], 'Profit', '3', ''),
+                   (self.trades[2], '', '', '')]  # untouched plan
+        resp = self.client.post(reverse('admin:trades_plan'), self._post_data(results))
+        self.assertEqual(resp.status_code, 302)
+        saved = {p.trade_id: p for p in TradeProfitLoss.objects.filter(created_by=self.user)}
+        self.assertEqual(set(saved), {self.trades[0].pk, self.trades[1].pk})
+        self.assertEqual((saved[self.trades[0].pk].profit_or_loss, saved[self.trades[0].pk].loss_amount),
+                         ('Loss', Decimal('7.50')))
+        self.assertIsNone(saved[self.trades[0].pk].profit_amount)
+        self.assertEqual(saved[self.trades[1].pk].profit_amount, Decimal('3.00'))
+
+class NewsEditorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'pw')
+        cls.trades = [make_trade(i) for i in range(3)]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def _edit(self, changes):
+        return self.client.post(reverse('news_edit_api'), {'changes': changes}, content_type='application/json')
+
+    def test_changed_rows_saved_and_cache_invalidated(self):
+        news = self.client.get(reverse('trade_news_api')).json()['results']
+        a, b = news[0], news[1]
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self._edit([
+                {'id': a['id'], 'news_catalyst_summary': 'Rating upgrade', 'version': a['version']},
+                {'id': b['id'], 'news_catalyst_summary': b['news_catalyst_summary'], 'version': b['version']},
+            ])  # b unchanged
+        self.assertEqual(resp.json(), {'updated': [{'id': a['id'], 'version': a['version'] + 1}]})
+        fresh = {r['id']: r for r in self.client.get(reverse('trade_news_api')).json()['results']}
+        self.assertEqual(fresh[a['id']]['news_catalyst_summary'], 'Rating upgrade')
+        self.assertEqual(fresh[b['id']]['version'], b['version'])
+        self.assertEqual([h['id'] for h in search_plans('upgrade')[0]], [a['id']])
+
+    def test_stale_version_writes_nothing(self):
+        t0, t1 = self.trades[:2]
+        t1.news_catalyst_summary = 'Edited elsewhere'
+        t1.save()  # bumps the version
+        resp = self._edit([
+            {'id': t0.pk, 'news_catalyst_summary': 'Mine', 'version': 0},
+            {'id': t1.pk, 'news_catalyst_summary': 'Mine too', 'version': 0},
+        ])
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(resp.json()['conflicts'],
+                         [{'id': t1.pk, 'version': 1, 'news_catalyst_summary': 'Edited elsewhere'}])
+        self.assertEqual(TradeMaster.objects.get(pk=t0.pk).news_catalyst_summary, 'Catalyst 0')
+        self.assertEqual(self._edit([{'id': t0.pk, 'news_catalyst_summary': 'x'}]).status_code, 400)
+
+    def _row(self, t, text=None):
+        shown = t.news_catalyst_summary.replace('\n', '\r\n')  # as browsers post a textarea
+        return {f'summary-{t.pk}': shown if text is None else text, f'original-{t.pk}': t.news_catalyst_summary,
+                f'version-{t.pk}': t.version}
+
+    def test_admin_form_writes_only_changed_rows(self):
+        t0, t1, t2 = self.trades
+        TradeMaster.objects.filter(pk=t0.pk).update(news_catalyst_summary='Imported\r\nwith CRLF')
+        t0.refresh_from_db()
+        read_t1 = self._row(t1)
+        t1.news_catalyst_summary = 'Edited elsewhere'
+        t1.save()  # after this page read it; untouched here, so not a conflict
+        resp = self.client.post(reverse('admin:trades_news'), {
+            **self._row(t0), **read_t1,
+            **self._row(t2, text='Order win\r\nsecond line'),
+        })
+        self.assertEqual(resp.status_code, 302)
+        rows = TradeMaster.objects.in_bulk([t0.pk, t1.pk, t2.pk])
+        self.assertEqual([(rows[t.pk].news_catalyst_summary, rows[t.pk].version) for t in self.trades],
+                         [('Imported\r\nwith CRLF', 0), ('Edited elsewhere', 1), ('Order win\nsecond line', 1)])
+
+    def test_duplicate_edit_is_not_reported_as_stale(self):
+        t0, t1 = self.trades[:2]
+        TradeMaster.objects.filter(pk=t1.pk).update(
+            stock_name=t0.stock_name, option_strike_price_expiry=t0.option_strike_price_expiry)
+        resp = self._edit([{'id': t1.pk, 'news_catalyst_summary': t0.news_catalyst_summary, 'version': 0}])
+        self.assertEqual(resp.status_code, 409)
+        body = resp.json()
+        self.assertEqual((body['error'], body['duplicate']), ('1 edit(s) would duplicate another plan', True))
+        self.assertEqual([c['id'] for c in body['conflicts']], [t1.pk])
+
+
+class BacktestTests(TestCase):
+    def _bars(self, day, lows_highs):
+        ts = pd.date_range(f'{day} 09:15', periods=len(lows_highs), freq='min')
+        lows, highs = zip(*lows_highs)
+        return pd.DataFrame({'timestamp': ts, 'open': lows, 'high': highs, 'low': lows,
+                             'close': [(lo + hi) / 2 for lo, hi in lows_highs]})
+
+    def _plans(self, n):
+        # entry 100, stop 90, target 120 (make_trade), one plan per day
+        days = pd.date_range('2026-01-05', periods=n, freq='D')
+        return pd.DataFrame({
+            'id': range(1, n + 1), 'stock_name': 'STOCK', 'option_strike_price_expiry': 'STOCK 100 CE',
+            'created_at': days.date, 'option_buy_price': 100.0, 'stop_loss_price': 90.0,
+            'intraday_exit_price_target': 120.0, 'risk_per_share': 10.0, 'lot_quantity': 10, 'day': days,
+        })
+
+    def test_outcomes_and_summary(self):
+        import tempfile
+        plans = self._plans(5)
+        bars = pd.concat([
+            self._bars('2026-01-05', [(101, 105), (99, 104), (110, 121)]),   # fill, then target
+            self._bars('2026-01-06', [(99, 102), (89, 95)]),                 # fill, then stop
+            self._bars('2026-01-07', [(85, 125)]),                           # fill bar touches both: stop first
+            self._bars('2026-01-08', [(99, 101), (103, 106)]),               # no level hit: day close
+            self._bars('2026-01-09', [(101, 110)]),                          # never reaches entry
+        ])
+        with tempfile.TemporaryDirectory() as d:
+            bars.to_csv(f'{d}/STOCK_100_CE.csv', index=False)
+            outcomes, summary = run_backtest(plans, d)
+        self.assertEqual(list(outcomes['outcome']), ['target', 'stop', 'stop', 'close', 'no_fill'])
+        self.assertEqual(list(outcomes['pnl'].fillna(0)), [200.0, -100.0, -100.0, 45.0, 0.0])
+        self.assertEqual(summary['filled'], 4)
+        self.assertEqual(summary['hit_rate'], 0.25)
+        self.assertEqual(summary['expectancy'], 11.25)
+        self.assertEqual(summary['max_drawdown'], 200.0)
+
+    def test_missing_bar_file(self):
+        import tempfile
+        with tempfile.TemporaryDirectory() as d:
+            outcomes, summary = run_backtest(self._plans(2), d)
+        self.assertEqual(summary['no_data'], 2)
+        self.assertEqual(summary['filled'], 0)
+
+
+
+class AccuracyStatsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('trader', 'trader@example.com', 'pw')
+        cls.a, cls.b = make_trade(0), make_trade(1)
+        make_fill(cls.a, cls.user, '100.00', '110.00')  # +100
+        make_fill(cls.a, cls.user, '100.00', '130.00')  # +300
+        make_fill(cls.a, cls.user, '100.00', '95.00')   # -50
+        make_fill(cls.b, cls.user, '100.00', '90.00')   # -100
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+        self.url = reverse('accuracy_api')
+
+    def test_grouped_by_stock(self):
+        body = self.client.get(self.url, {'by': 'stock'}).json()
+        a, b = body['rows']
+        self.assertEqual((a['stock'], a['trades'], a['accuracy'], a['avg_win'], a['avg_loss'], a['profit_factor']),
+                         ('STOCK0', 3, 0.6667, '200.00', '50.00', 8.0))
+        self.assertEqual((b['wins'], b['losses'], b['profit_factor']), (0, 1, 0.0))
+        self.assertEqual(body['totals']['trades'], 4)
+        self.assertEqual(body['totals']['profit_factor'], 2.6667)
+
+    def test_memoized_until_user_writes(self):
+        today = timezone.localdate()
+        first = accuracy_stats(self.user, today, today, ('stock', 'week'))
+        with self.assertNumQueries(1):  # the user's write stamp
+            self.assertEqual(accuracy_stats(self.user, today, today, ('stock', 'week')), first)
+        make_fill(self.b, self.user, '100.00', '150.00')
+        self.assertEqual(accuracy_stats(self.user, today, today, ('stock', 'week'))['totals']['trades'], 5)
+
+    def test_rejects_two_periods(self):
+        self.assertEqual(self.client.get(self.url, {'by': 'week,month'}).status_code, 400)
+
+
+
+class LedgerTests(TestCase):
+    # every check compares the incrementally kept ledger/rollup with a rebuild from the fills
+
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user('trader', 'trader@example.com', 'pw')
+        cls.other = User.objects.create_user('other', 'other@example.com', 'pw')
+        cls.trade = make_trade(0)
+        cls.trade2 = make_trade(1)
+
+    def assertLedgerConsistent(self):
+        kept = {(p.trade_id, p.created_by_id): p.net_amount for p in TradeProfitLoss.objects.all()}
+        rebuilt = ledger.net_by_key()
+        self.assertEqual({k: v for k, v in kept.items() if v or k in rebuilt}, rebuilt)
+        rollup = set(TradeDailyRollup.objects.values_list(
+            'trade_id', 'created_by_id', 'day', 'profit_or_loss', 'count', 'profit_total', 'loss_total',
+            'capital_total'))
+        ledger.rebuild_days()
+        self.assertEqual(rollup, set(TradeDailyRollup.objects.values_list(
+            'trade_id', 'created_by_id', 'day', 'profit_or_loss', 'count', 'profit_total', 'loss_total',
+            'capital_total')))
+
+    def _net(self, trade, user):
+        return TradeProfitLoss.objects.get(trade=trade, created_by=user).net_amount
+
+    def _edit(self, fill, **values):
+        # the admin/API write path: load, change, re-derive the P/L flags, save
+        fill = TradeTransaction.objects.get(pk=fill.pk)
+        for field, value in values.items():
+            setattr(fill, field, value)
+        for field, value in ledger.pl_fields((fill.sell_price - fill.buy_price) * fill.quantity).items():
+            setattr(fill, field, value)
+        fill.save()
+        return fill
+
+    def test_edit_and_moves_apply_deltas(self):
+        fill = make_fill(self.trade, self.user, '100.00', '110.00')  # +100
+        make_fill(self.trade, self.user, '100.00', '105.00')         # +50
+        self._edit(fill, sell_price=Decimal('95.00'))               # +100 -> -50
+        self.assertEqual(self._net(self.trade, self.user), Decimal('0.00'))
+        self.assertLedgerConsistent()
+
+        self._edit(fill, trade=self.trade2)  # the -50 moves to the other plan
+        self.assertEqual((self._net(self.trade, self.user), self._net(self.trade2, self.user)),
+                         (Decimal('50.00'), Decimal('-50.00')))
+        self.assertLedgerConsistent()
+
+        self._edit(fill, created_by=self.other)  # ... and to the other user
+        self.assertEqual((self._net(self.trade2, self.user), self._net(self.trade2, self.other)),
+                         (Decimal('0.00'), Decimal('-50.00')))
+        self.assertLedgerConsistent()
+
+        TradeTransaction.objects.get(pk=fill.pk).delete()
+        self.assertEqual(self._net(self.trade2, self.other), Decimal('0.00'))
+        self.assertLedgerConsistent()
+
+    def test_reconcile_tpl_reports_and_fixes_drift(self):
+        make_fill(self.trade, self.user, '100.00', '110.00')
+        make_fill(self.trade2, self.other, '100.00', '90.00')
+        TradeProfitLoss.objects.filter(created_by=self.user).update(net_amount=Decimal('1.00'))
+        out = StringIO()
+        call_command('reconcile_tpl', stdout=out)
+        self.assertIn('2 ledger keys checked, 1 drifted.', out.getvalue())
+        self.assertEqual(self._net(self.trade, self.user), Decimal('1.00'))  # reported, not rewritten
+        call_command('reconcile_tpl', '--fix', stdout=StringIO())
+        self.assertEqual(self._net(self.trade, self.user), Decimal('100.00'))
+        self.assertLedgerConsistent()
+
+    def test_batched_writes_recompute_once_on_exit(self):
+        fill = make_fill(self.trade, self.user, '100.00', '110.00')
+        with ledger.batched():
+            for sell in ('120.00', '130.00', '90.00'):
+                make_fill(self.trade, self.user, '100.00', sell)
+            self._edit(fill, quantity=20)     # +100 -> +200
+            with ledger.batched():            # nested blocks join the outer one
+                make_fill(self.trade2, self.user, '100.00', '101.00')
+            # signals only collected keys so far
+            self.assertEqual(self._net(self.trade, self.user), Decimal('100.00'))
+            self.assertFalse(TradeProfitLoss.objects.filter(trade=self.trade2).exists())
+            self.assertFalse(TradeDailyRollup.objects.filter(trade=self.trade2).exists())
+        self.assertEqual(self._net(self.trade, self.user), Decimal('600.00'))  # 200 + 200 + 300 - 100
+        self.assertEqual(self._net(self.trade2, self.user), Decimal('10.00'))
+        self.assertLedgerConsistent()
+
+    def test_batched_block_rolls_back_as_one(self):
+        make_fill(self.trade, self.user, '100.00', '110.00')
+        with self.assertRaises(ZeroDivisionError):
+            with ledger.batched():
+                make_fill(self.trade, self.user, '100.00', '150.00')
+                1 / 0
+        self.assertEqual(self._net(self.trade, self.user), Decimal('100.00'))
+        self.assertEqual(TradeTransaction.objects.count(), 1)
+        self.assertLedgerConsistent()
+
+    def test_transactions_formset_saves_changed_rows_in_bulk(self):
+        staff = get_user_model().objects.create_user('desk', 'desk@example.com', 'pw', is_staff=True,
+                                                     is_superuser=True)
+        a = make_fill(self.trade, staff, '100.00', '110.00')
+        b = make_fill(self.trade2, staff, '100.00', '105.00')
+        yesterday = timezone.now() - timedelta(days=1)
+        TradeTransaction.objects.filter(pk=b.pk).update(updated_at=yesterday)
+        ledger.rebuild_days()
+        self.client.force_login(staff)
+        rows = [(b, b.trade_id, '100.00', '105.00', 10), (a, a.trade_id, '100.00', '80.00', 10)]  # a: +100 -> -200
+        data = {'t-TOTAL_FORMS': '2', 't-INITIAL_FORMS': '2', 't-MIN_NUM_FORMS': '0', 't-MAX_NUM_FORMS': '1000'}
+        for i, (fill, trade_id, buy, sell, qty) in enumerate(rows):
+            data.update({f't-{i}-id': fill.pk, f't-{i}-trade': trade_id, f't-{i}-buy_price': buy,
+                         f't-{i}-sell_price': sell, f't-{i}-quantity': qty})
+        resp = self.client.post(reverse('admin:trades_transactions'), data)
+        self.assertEqual(resp.status_code, 302)
+        a.refresh_from_db()
+        self.assertEqual((a.profit_or_loss, a.loss_amount, a.is_ai_correct), ('Loss', Decimal('200.00'), False))
+        self.assertEqual(TradeTransaction.objects.get(pk=b.pk).updated_at, yesterday)  # unchanged form: untouched
+        self.assertEqual(self._net(self.trade, staff), Decimal('-200.00'))
+        self.assertLedgerConsistent()
+
+    def test_rollup_follows_a_fill_to_its_new_day(self):
+        fill = make_fill(self.trade, self.user, '100.00', '110.00')
+        make_fill(self.trade, self.user, '100.00', '120.00')
+        yesterday = timezone.localdate() - timedelta(days=1)
+        TradeTransaction.objects.filter(pk=fill.pk).update(
+            updated_at=timezone.make_aware(datetime.combine(yesterday, time(12))))
+        ledger.rebuild_days()
+        self._edit(fill, sell_price=Decimal('90.00'))  # saved today, now a loss
+        days = TradeDailyRollup.objects.filter(created_by=self.user)
+        self.assertFalse(days.filter(day=yesterday).exists())
+        self.assertEqual(sorted(days.values_list('profit_or_loss', 'count')), [('Loss', 1), ('Profit', 1)])
+        self.assertLedgerConsistent()
+
+    def test_save_without_snapshot_rebuilds_the_rollup(self):
+        fill = make_fill(self.trade, self.user, '100.00', '110.00')
+        yesterday = timezone.localdate() - timedelta(days=1)
+        TradeTransaction.objects.filter(pk=fill.pk).update(
+            updated_at=timezone.make_aware(datetime.combine(yesterday, time(12))))
+        ledger.rebuild_days()
+        values = {f.attname: getattr(fill, f.attname) for f in TradeTransaction._meta.concrete_fields}
+        TradeTransaction(**values).save()  # same pk, built by hand: nothing to diff against
+        self.assertEqual(list(TradeDailyRollup.objects.values_list('day', 'count', 'profit_total')),
+                         [(timezone.localdate(), 1, Decimal('100.00'))])
+        self.assertLedgerConsistent()
+
+    def test_deferred_save_rebuilds_ledger_and_rollup(self):
+        fill = make_fill(self.trade, self.user, '100.00', '110.00')
+        fill = TradeTransaction.objects.only('id', 'quantity').get(pk=fill.pk)
+        fill.quantity = 20
+        fill.save(update_fields=['quantity'])
+        self.assertEqual(self._net(self.trade, self.user), Decimal('200.00'))
+        self.assertEqual(TradeDailyRollup.objects.get().capital_total, Decimal('2000.00'))
+        self.assertLedgerConsistent()
+
+    def test_rebuild_rollups_command(self):
+        make_fill(self.trade, self.user, '100.00', '110.00')
+        make_fill(self.trade, self.other, '100.00', '90.00')
+        TradeDailyRollup.objects.update(count=99)
+        call_command('rebuild_rollups', '--user', str(self.user.pk), stdout=StringIO())
+        self.assertEqual(dict(TradeDailyRollup.objects.values_list('created_by_id', 'count')),
+                         {self.user.pk: 1, self.other.pk: 99})  # only the named user
+        call_command('rebuild_rollups', stdout=StringIO())
+        self.assertLedgerConsistent()
+
+    def test_trade_delete_cascades(self):
+        make_fill(self.trade, self.user, '100.00', '110.00')
+        make_fill(self.trade, self.other, '100.00', '90.00')
+        make_fill(self.trade2, self.user, '100.00', '105.00')
+        self.trade.delete()
+        self.assertEqual(TradeProfitLoss.objects.get().net_amount, Decimal('50.00'))
+        self.assertLedgerConsistent()
+
+    def test_user_delete_cascades(self):
+        make_fill(self.trade, self.user, '100.00', '110.00')
+        make_fill(self.trade, self.other, '100.00', '90.00')
+        self.user.delete()
+        self.assertEqual(list(TradeProfitLoss.objects.values_list('created_by_id', 'net_amount')),
+                         [(self.other.pk, Decimal('-100.00'))])
+        self.assertLedgerConsistent()
+
+    def test_cascade_inside_batch(self):
+        make_fill(self.trade, self.user, '100.00', '110.00')
+        with ledger.batched():
+            self.trade.delete()
+        self.assertFalse(TradeProfitLoss.objects.exists())
+        self.assertLedgerConsistent()
+
+
+class ArchiveTransactionsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model().objects.create_user('trader', 'trader@example.com', 'pw')
+        self.client.force_login(self.user)
+        trade = make_trade(0)
+        self.old = make_fill(trade, self.user, '100.00', '110.00')  # +100
+        make_fill(trade, self.user, '100.00', '95.00')              # -50, stays hot
+        self.old_day = timezone.localdate() - timedelta(days=200)
+        TradeTransaction.objects.filter(pk=self.old.pk).update(
+            created_at=timezone.make_aware(datetime.combine(self.old_day, time(10))))
+
+    def test_moves_old_fills_without_touching_totals(self):
+        net = TradeProfitLoss.objects.get().net_amount
+        call_command('archive_transactions', stdout=StringIO())
+        self.assertEqual(TradeTransaction.objects.count(), 1)
+        self.assertEqual(TradeTransactionArchive.objects.get().pk, self.old.pk)
+        self.assertEqual(TradeProfitLoss.objects.get().net_amount, net)
+        self.assertEqual(list(ledger.net_by_key().values()), [Decimal('50.00')])  # rebuilds still see it
+
+    def test_admin_page_lists_archived_fills_read_only(self):
+        call_command('archive_transactions', stdout=StringIO())
+        get_user_model().objects.filter(pk=self.user.pk).update(is_staff=True)
+        resp = self.client.get(reverse('admin:trades_transactions'), {'start': self.old_day.isoformat()})
+        self.assertEqual([(r.pk, r.archived) for r in resp.context['rows']][-1], (self.old.pk, True))
+        self.assertContains(resp, '(archived, read-only)', count=1)
+        self.assertNotIn(self.old.pk, [f.instance.pk for f in resp.context['formset'].forms])
+
+    def test_old_ranges_read_the_archive(self):
+        call_command('archive_transactions', stdout=StringIO())
+        today = timezone.localdate()
+        body = self.client.get(reverse('transactions_list_api'),
+                               {'start': self.old_day.isoformat(), 'end': today.isoformat()}).json()
+        self.assertEqual([r['id'] for r in body['results']][-1], self.old.pk)
+        self.assertEqual(len(self.client.get(reverse('transactions_list_api')).json()['results']), 1)
+        self.assertEqual(accuracy_stats(self.user, self.old_day, today)['totals']['trades'], 2)
+
+
+class BenchSmokeTests(TestCase):
+    def test_every_case_runs(self):
+        data = bench.seed(users=2, trades=6, fills=2, days=3)
+        self.assertEqual(TradeTransaction.objects.count(), 24)
+        results = bench.run_cases(list(bench.CASES), data, repeat=1, upload_rows=5, signal_fills=3)
+        self.assertEqual(set(results), set(bench.CASES))
+        for name, r in results.items():
+            self.assertGreater(r['queries'], 0, name)
+            self.assertGreater(r['peak_kib'], 0, name)
+        self.assertEqual(results['propagate_tpl']['ops'], 3)
+
+
+class RequestTimingMiddlewareTests(TestCase):
+    def setUp(self):
+        middleware.clear()
+        self.user = get_user_model().objects.create_superuser('adm', 'adm@example.com', 'pw')
+        self.client.force_login(self.user)
+
+    def test_server_timing_and_ring_buffer(self):
+        resp = self.client.get(reverse('admin:trades_accuracy'))
+        self.assertRegex(resp['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries"')
+        entry = middleware.recent()[-1]
+        self.assertEqual((entry['view'], entry['status']), ('admin:trades_accuracy', 200))
+        self.assertGreater(entry['queries'], 0)
+
+    @override_settings(TRADES_SLOW_QUERY_MS=0)
+    def test_slow_queries_logged_with_view(self):
+        with self.assertLogs('trades.sql', 'WARNING') as logs:
+            self.client.get(reverse('admin:trades_accuracy'))
+        self.assertIn('in admin:trades_accuracy: SELECT', logs.output[0])
+
+    def test_dup_counts_extra_runs_and_logs_slow_requests(self):
+        request = RequestFactory().get('/x')
+
+        def view(request):
+            with connection.cursor() as cur:
+                for sql in ('SELECT 1', 'SELECT 2', 'SELECT 2', 'SELECT 2'):
+                    cur.execute(sql)
+            return JsonResponse({})
+
+        with self.settings(TRADES_SLOW_REQUEST_MS=0), self.assertLogs('trades.requests', 'WARNING'):
+            resp = middleware.RequestTimingMiddleware(view)(request)
+        self.assertEqual(middleware.recent()[-1]['dup'], 2)
+        self.assertTrue(resp['Server-Timing'].endswith('dup;desc="2"'))
+        middleware.RequestTimingMiddleware(lambda r: JsonResponse({}))(request)
+        self.assertEqual(middleware.recent()[-1]['dup'], 0)
+
+    def test_admin_page_ranks_by_p95(self):
+        for ms in (10, 20, 30):
+            middleware.record({'ts': time_mod.time(), 'method': 'GET', 'path': '/a', 'view': 'fast',
+                               'status': 200, 'wall_ms': ms, 'queries': 2, 'db_ms': 1, 'dup': 1})
+        middleware.record({'ts': time_mod.time(), 'method': 'GET', 'path': '/b', 'view': 'slow',
+                           'status': 500, 'wall_ms': 900, 'queries': 40, 'db_ms': 700, 'dup': 38})
+        middleware.record({'ts': time_mod.time() - 7200, 'method': 'GET', 'path': '/c', 'view': 'old',
+                           'status': 200, 'wall_ms': 5000, 'queries': 1, 'db_ms': 1, 'dup': 1})
+        rows = self.client.get(reverse('admin:trades_requests'), {'minutes': 60}).context['rows']
+        self.assertEqual([r['view'] for r in rows][:2], ['slow', 'fast'])
+        self.assertNotIn('old', [r['view'] for r in rows])
+        self.assertEqual((rows[1]['count'], rows[1]['p95_ms'], rows[0]['errors']), (3, 30, 1))
+
+
+class AsyncApiTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('trader', 'trader@example.com', 'pw')
+        cls.trade = make_trade(0)
+        cls.fills = [make_fill(cls.trade, cls.user, '100.00', str(100 + i)) for i in range(5)]
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_list_pages_and_streams(self):
+        await self.async_client.aforce_login(self.user)
+        url = reverse('transactions_list_api_async')
+        expected = [pk async for pk in TradeTransaction.objects.order_by('-created_at', '-id').values_list('id', flat=True)]
+        body = (await self.async_client.get(url, {'limit': 2})).json()
+        self.assertEqual([r['id'] for r in body['results']], expected[:2])
+        self.assertGreater(middleware.recent()[-1]['queries'], 0)  # instrumented on the async path too
+        body = (await self.async_client.get(url, {'limit': 2, 'cursor': body['next']})).json()
+        self.assertEqual([r['id'] for r in body['results']], expected[2:4])
+        resp = await self.async_client.get(url, {'format': 'ndjson'})
+        lines = b''.join([chunk async for chunk in resp.streaming_content]).decode().splitlines()
+        self.assertEqual(len(lines), len(self.fills))
+
+    async def test_news_is_cached(self):
+        url = reverse('trade_news_api_async')
+        first = await self.async_client.get(url)
+        self.assertEqual([r['id'] for r in first.json()['results']], [self.trade.id])
+        again = await self.async_client.get(url, headers={'if-none-match': first['ETag']})
+        self.assertEqual(again.status_code, 304)
+
+    async def test_create_updates_ledger(self):
+        await self.async_client.aforce_login(self.user)
+        resp = await self.async_client.post(reverse('transactions_create_api_async'), {
+            'trade': self.trade.id, 'buy_price': '100.00', 'sell_price': '90.00', 'quantity': 3,
+        })
+        self.assertEqual(resp.status_code, 201)
+        fill = await TradeTransaction.objects.aget(pk=resp.json()['id'])
+        self.assertEqual((fill.profit_or_loss, fill.loss_amount, fill.is_ai_correct), ('Loss', Decimal('30.00'), False))
+        tpl = await TradeProfitLoss.objects.aget(trade=self.trade, created_by=self.user)
+        self.assertEqual(tpl.net_amount, Decimal('70.00'))  # 0+10+20+30+40 - 30
+
+    @override_settings(TRADES_ASYNC_USER_CONCURRENCY=1, TRADES_ASYNC_QUEUE_SECONDS=0.05)
+    async def test_limit_per_user(self):
+        @limit_per_user
+        async def slow(request):
+            await asyncio.sleep(0.2)
+            return JsonResponse({})
+
+        async def auser():
+            return self.user
+
+        request = RequestFactory().get('/')
+        request.auser = auser
+        statuses = [r.status_code for r in await asyncio.gather(slow(request), slow(request))]
+        self.assertEqual(sorted(statuses), [200, 429])
+        self.assertEqual((await slow(request)).status_code, 200)  # the slot is free again
+
+    @override_settings(TRADES_ASYNC_USER_CONCURRENCY=1, TRADES_ASYNC_QUEUE_SECONDS=0.05)
+    async def test_unsent_stream_releases_slot_on_close(self):
+        async def body():
+            yield b'{}'
+
+        @limit_per_user
+        async def stream(request):
+            return StreamingHttpResponse(body())
+
+        async def auser():
+            return self.user
+
+        request = RequestFactory().get('/')
+        request.auser = auser
+        resp = await stream(request)
+        self.assertEqual((await stream(request)).status_code, 429)
+        resp.close()  # client went away before the body started
+        resp = await stream(request)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(b''.join([c async for c in resp.streaming_content]), b'{}')
+        resp.close()  # released once by the body, closing again is a no-op
+        self.assertEqual((await stream(request)).status_code, 200)
+
+
+try:
+    import pyarrow  # noqa: F401
+except ImportError:
+    pyarrow = None
+
+
+@skipUnless(pyarrow, 'pyarrow is not installed')
+class ParquetExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        User = get_user_model()
+        cls.user = User.objects.create_user('trader', 'trader@example.com', 'pw')
+        cls.other = User.objects.create_user('other', 'other@example.com', 'pw')
+        trade = make_trade(0)
+        for i in range(5):
+            make_fill(trade, cls.user, '100.00', f'10{i}.25')
+        make_fill(trade, cls.other, '100.00', '90.00')
+
+    def test_download_is_typed_and_scoped_to_user(self):
+        import io
+        import pyarrow.parquet as pq
+        self.client.force_login(self.user)
+        resp = self.client.get(reverse('export_parquet_api', args=['transactions']))
+        table = pq.read_table(io.BytesIO(b''.join(resp.streaming_content)))
+        self.assertEqual(table.num_rows, 5)
+        self.assertEqual(str(table.schema.field('sell_price').type), 'decimal128(10, 2)')
+        self.assertEqual(set(table.column('created_by_id').to_pylist()), {self.user.pk})
+
+    def test_staff_only_export_their_own_fills(self):
+        import io
+        import pyarrow.parquet as pq
+        get_user_model().objects.filter(pk__in=[self.user.pk, self.other.pk]).update(is_staff=True)
+        self.client.force_login(self.other)
+        resp = self.client.get(reverse('export_parquet_api', args=['transactions']))
+        table = pq.read_table(io.BytesIO(b''.join(resp.streaming_content)))
+        self.assertEqual(set(table.column('created_by_id').to_pylist()), {self.other.pk})
+
+    def test_incremental_export_only_adds_changed_rows(self):
+        import tempfile
+        from .export import export_dataset
+        with tempfile.TemporaryDirectory() as d:
+            self.assertEqual(export_dataset('transactions', d, chunk_size=2)['rows'], 6)
+            self.assertEqual(export_dataset('transactions', d, incremental=True)['rows'], 0)
+            tx = TradeTransaction.objects.first()
+            tx.quantity = 20
+            tx.save()
+            self.assertEqual(export_dataset('transactions', d, incremental=True)['rows'], 1)
+            with self.assertRaises(ValueError):
+                export_dataset('transactions', d)
+
+    def test_incremental_export_picks_up_late_commits(self):
+        import tempfile
+        from .export import export_dataset
+        with tempfile.TemporaryDirectory() as d:
+            until = export_dataset('transactions', d)['until']
+            # stamped before the watermark, committed after the run read
+            TradeTransaction.objects.filter(pk=TradeTransaction.objects.first().pk).update(
+                quantity=30, updated_at=until - timedelta(seconds=5))
+            self.assertEqual(export_dataset('transactions', d, incremental=True)['rows'], 1)
+            self.assertEqual(export_dataset('transactions', d, incremental=True)['rows'], 0)
+
+
+@skipUnless(connection.vendor == 'postgresql', 'EXPLAIN plans are checked on Postgres only')
+class HotPathIndexTests(TestCase):
+    # tiny tables always favour a seq scan, so disable it and check an index is eligible
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user('trader', 'trader@example.com', 'pw')
+        trade = make_trade(0)
+        make_fill(trade, cls.user, '100.00', '110.00')
+
+    def setUp(self):
+        with connection.cursor() as cur:
+            cur.execute('SET LOCAL enable_seqscan = off')
+        today = timezone.localdate()
+        self.start = timezone.make_aware(datetime.combine(today, time.min))
+        self.end = self.start + timedelta(days=1)
+
+    def assertUsesIndex(self, qs, name):
+        self.assertIn(name, qs.explain())
+
+    def test_transactions_by_user_created_at(self):
+        qs = TradeTransaction.objects.filter(created_by=self.user, created_at__gte=self.start, created_at__lt=self.end)
+        self.assertUsesIndex(qs.order_by('-created_at'), 'tx_user_created')
+
+    def test_transactions_by_user_updated_at(self):
+        qs = TradeTransaction.objects.filter(created_by=self.user, updated_at__gte=self.start, updated_at__lt=self.end)
+        self.assertUsesIndex(qs, 'tx_user_updated')
+
+    def test_profit_loss_by_user_updated_at(self):
+        qs = TradeProfitLoss.objects.filter(created_by=self.user, updated_at__gte=self.start, updated_at__lt=self.end)
+        self.assertUsesIndex(qs, 'tpl_user_updated')
+
+    def test_ledger_group_by_trade_user(self):
+        trade = TradeMaster.objects.get()
+        qs = TradeTransaction.objects.filter(trade=trade, created_by=self.user).only('buy_price', 'sell_price', 'quantity')
+        self.assertUsesIndex(qs, 'tx_trade_user')
@@ -0,0 +1,84 @@
+# trades/throttle.py
+"""Per-user concurrency limit for the async JSON APIs.
+
+At most ``TRADES_ASYNC_USER_CONCURRENCY`` requests of one user (anonymous
+callers: one client address) run a limited view at a time per worker
+process; the rest wait up to ``TRADES_ASYNC_QUEUE_SECONDS`` for a slot and
+then get a 429. Streaming responses keep their slot until the body is
+sent or the response is closed (a client that disconnects before the
+body starts never runs the generator). Slots live on the running event loop, so the limit only spans
+requests under ASGI; under WSGI each request gets its own loop.
+"""
+import asyncio
+import weakref
+from functools import wraps
+
+from django.conf import settings
+from django.http import JsonResponse
+
+_slots = weakref.WeakKeyDictionary()  # event loop -> {caller key: [semaphore, requests holding/waiting]}
+
+
+def _caller(request, user):
+    return ('user', user.pk) if user.is_authenticated else ('addr', request.META.get('REMOTE_ADDR'))
+
+
+def _enter(key):
+    slots = _slots.setdefault(asyncio.get_running_loop(), {})
+    slot = slots.get(key)
+    if slot is None:
+        slot = slots[key] = [asyncio.Semaphore(getattr(settings, 'TRADES_ASYNC_USER_CONCURRENCY', 4)), 0]
+    slot[1] += 1
+    return slots, slot
+
+
+def _leave(slots, key, slot, acquired=True):
+    if acquired:
+        slot[0].release()
+    slot[1] -= 1
+    if not slot[1]:
+        slots.pop(key, None)  # idle callers do not keep a semaphore around
+
+
+def _once(release):
+    done = []
+
+    def _release():
+        if not done:
+            done.append(True)
+            release()
+    return _release
+
+
+async def _release_after(content, release):
+    try:
+        async for chunk in content:
+            yield chunk
+    finally:
+        release()
+
+
+def limit_per_user(view):
+    """Decorator for async views; see the module docstring."""
+    @wraps(view)
+    async def _wrapped(request, *args, **kwargs):
+        key = _caller(request, await request.auser())
+        slots, slot = _enter(key)
+        try:
+            await asyncio.wait_for(slot[0].acquire(), getattr(settings, 'TRADES_ASYNC_QUEUE_SECONDS', 5))
+        except asyncio.TimeoutError:
+            _leave(slots, key, slot, acquired=False)
+            return JsonResponse({'error': 'Too many concurrent requests'}, status=429, headers={'Retry-After': '1'})
+        try:
+            response = await view(request, *args, **kwargs)
+        except BaseException:
+            _leave(slots, key, slot)
+            raise
+        if response.streaming and response.is_async:
+            release = _once(lambda: _leave(slots, key, slot))
+            response.streaming_content = _release_after(response.streaming_content, release)
+            response._resource_closers.append(release)  # the handler always closes the response
+        else:
+            _leave(slots, key, slot)
+        return response
+    return _wrapped
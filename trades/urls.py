@@ -1,7 +1,9 @@
 from django.urls import path
-from .apis import ExcelUploadAPIView
+from .apis import ExcelUploadAPIView, ImportJobStatusAPIView
 from .admin import CustomUploadView
-from .views import DailyPlanView,trade_news_api, transactions_create_api,transactions_list_api
+from .views import DailyPlanView,trade_news_api, transactions_create_api,transactions_list_api, accuracy_api, export_parquet_api, plan_search_api
+from .views import news_edit_api
+from .views import trade_news_api_async, transactions_create_api_async, transactions_list_api_async
 
 from django.contrib import admin
 admin.site.index_template = 'admin/custom_index.html'
@@ -9,10 +11,19 @@ admin.site.index_template = 'admin/custom_index.html'
 
 urlpatterns = [
     path('api/upload/', ExcelUploadAPIView.as_view(), name='api-upload-excel'),
+    path('api/upload/jobs/<int:pk>/', ImportJobStatusAPIView.as_view(), name='import_job_status'),
     path('admin/upload/', CustomUploadView.as_view(), name='admin-upload'),
     path('plans/daily/', DailyPlanView.as_view(), name='daily-plan'),
     path('api/trade-news/', trade_news_api, name='trade_news_api'),
     path('api/transactions/', transactions_list_api, name='transactions_list_api'),
     path('api/transactions/create/', transactions_create_api, name='transactions_create_api'),
     path('api/excel-upload/', ExcelUploadAPIView.as_view(), name='excel_upload_api'),
+    path('api/trade-news/edit/', news_edit_api, name='news_edit_api'),
+    path('api/plans/search/', plan_search_api, name='plan_search_api'),
+    path('api/analytics/accuracy/', accuracy_api, name='accuracy_api'),
+    path('api/export/<str:dataset>.parquet', export_parquet_api, name='export_parquet_api'),
+    # async variants, for ASGI deployments (WEB_MODE=asgi, see gunicorn.conf.py)
+    path('api/async/trade-news/', trade_news_api_async, name='trade_news_api_async'),
+    path('api/async/transactions/', transactions_list_api_async, name='transactions_list_api_async'),
+    path('api/async/transactions/create/', transactions_create_api_async, name='transactions_create_api_async'),
 ]
@@ -1,45 +1,72 @@
 # trades/views.py
+import itertools
+import json
+
 from django.views.generic import ListView
-from django.db.models import F, ExpressionWrapper, DecimalField
 from django.utils import timezone
-from .models import TradeMaster, TradeTransaction
+from asgiref.sync import sync_to_async
+from .models import TradeMaster, TradeTransaction, fills_model, tm_choices_today
+from .forms import TradeTransactionFormPost
+from .ledger import pl_fields
 from .filter import TradePlanFilter
-from django.http import JsonResponse
-from datetime import datetime
+from .analytics import accuracy_stats, parse_groups
+from .export import DATASETS, dataset_queryset, stream_parquet
+from .pagination import akeyset_response, decode_offset, encode_cursor, keyset_response, page_size
+from .search import search_plans
+from .news import NewsConflict, apply_news_edits, parse_edits
+from .throttle import limit_per_user
+from .cache import cached_by_day
+from django.utils.decorators import method_decorator
+from django.http import JsonResponse, StreamingHttpResponse
+from datetime import datetime, time, timedelta
+from decimal import Decimal, ROUND_HALF_UP
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth.decorators import login_required
 
+def _plan_dates(request):
+    # the day DailyPlanView shows: ?date=, today when absent, every day when blank/invalid
+    d = request.GET.get('date')
+    if d is None:
+        today = timezone.localdate()
+        return today, today
+    try:
+        day = datetime.strptime(d, '%Y-%m-%d').date()
+    except ValueError:
+        return None, None
+    return day, day
+
+
+def _range_dates(request):
+    fmt = '%Y-%m-%d'
+    today = timezone.localdate()
+    s = request.GET.get('start')
+    e = request.GET.get('end')
+    start = datetime.strptime(s, fmt).date() if s else today
+    end = datetime.strptime(e, fmt).date() if e else today
+    return start, end
+
+
+@method_decorator(cached_by_day(_plan_dates), name='get')
 class DailyPlanView(ListView):
     model = TradeMaster
-    template_name = 'plans/daily_plan.html'
+    template_name = 'plan/daily_plan.html'
     context_object_name = 'rows'
     paginate_by = 50  # optional pagination
 
     def get_queryset(self):
-        # Base queryset
+        # risk_per_share / lot_quantity / reward_risk_ratio are stored columns (set at import)
         qs = TradeMaster.objects.all()
 
-        # Derived fields:
-        # Risk/Share = Entry - Stop Loss
-        risk_expr = ExpressionWrapper(
-            F('option_buy_price') - F('stop_loss_price'),
-            output_field=DecimalField(max_digits=12, decimal_places=2)
-        )
-        # Qty ≈ floor(Capital Required / Entry)
-        # Note: floor is applied in template for portability
-        qty_expr = ExpressionWrapper(
-            F('capital_required') / F('option_buy_price'),
-            output_field=DecimalField(max_digits=12, decimal_places=2)
-        )
-        qs = qs.annotate(risk_per_share=risk_expr, raw_qty=qty_expr)
-
         # Default date = today if none supplied
         if 'date' not in self.request.GET:
             qs = qs.filter(created_at=timezone.now().date())
 
         # Apply django-filter
         self.filterset = TradePlanFilter(self.request.GET or None, queryset=qs)
-        return self.filterset.qs.order_by('-created_at', 'stock_name')
+        qs = self.filterset.qs
+        if not self.request.GET.get('o'):
+            qs = qs.order_by('-created_at', 'stock_name')
+        return qs
 
     def get_context_data(self, **kwargs):
         ctx = super().get_context_data(**kwargs)
@@ -51,50 +78,178 @@ class DailyPlanView(ListView):
         return ctx
 
 
+def _news_qs(start, end):
+    return (TradeMaster.objects
+            .filter(created_at__gte=start, created_at__lte=end)
+            .values('id', 'stock_name', 'news_catalyst_summary', 'created_at', 'version'))
+
+
+NEWS_ORDER = ('created_at', 'stock_name', 'id')  # matches tm_created_stock
+
+
+@require_http_methods(["GET"])
+@cached_by_day(_range_dates)
 def trade_news_api(request):
-    fmt = '%Y-%m-%d'
-    today = timezone.localdate()
-    s = request.GET.get('start')
-    e = request.GET.get('end')
-    start = datetime.strptime(s, fmt).date() if s else today
-    end = datetime.strptime(e, fmt).date() if e else today
+    return keyset_response(request, _news_qs(*_range_dates(request)), NEWS_ORDER)
 
-    qs = (TradeMaster.objects
-          .filter(created_at__gte=start, created_at__lte=end)
-          .order_by('stock_name')
-          .values('stock_name', 'news_catalyst_summary', 'created_at'))
-    data = list(qs)
-    return JsonResponse({'results': data})
+
+def _fills_qs(user, start, end):
+    return (fills_model(start).objects  # hot table unless the range reaches archived days
+            .select_related('trade')
+            .filter(created_at__gte=timezone.make_aware(datetime.combine(start, time.min)),
+                    created_at__lt=timezone.make_aware(datetime.combine(end + timedelta(days=1), time.min)),
+                    created_by=user)  # half-open range, not __date, so tx_user_created applies
+            .values('id', 'trade_id', 'trade__stock_name',
+                    'buy_price', 'sell_price', 'quantity',
+                    'is_ai_correct', 'profit_or_loss', 'created_at'))
+
+
+FILLS_ORDER = ('-created_at', '-id')  # newest first
 
 
 @login_required
 @require_http_methods(["GET"])
 def transactions_list_api(request):
-    fmt = '%Y-%m-%d'
-    today = timezone.localdate()
-    s = request.GET.get('start'); e = request.GET.get('end')
-    start = datetime.strptime(s, fmt).date() if s else today
-    end = datetime.strptime(e, fmt).date() if e else today
-    qs = (TradeTransaction.objects
-          .select_related('trade')
-          .filter(created_at__date__gte=start,
-                  created_at__date__lte=end,
-                  created_by=request.user)
-          .order_by('-created_at')
-          .values('id', 'trade_id', 'trade__stock_name',
-                  'buy_price', 'sell_price', 'quantity',
-                  'is_ai_correct', 'profit_or_loss', 'created_at'))
-    return JsonResponse({'results': list(qs)})
+    return keyset_response(request, _fills_qs(request.user, *_range_dates(request)), FILLS_ORDER)
+
+
+def _fill_form(data):
+    # same choices as TradeTransaction.trade's limit_choices_to: today's plans
+    form = TradeTransactionFormPost(data)
+    form.fields['trade'].queryset = TradeMaster.objects.filter(**tm_choices_today())
+    return form
+
+
+def _fill_values(form, user):
+    d = form.cleaned_data
+    net = ((d['sell_price'] - d['buy_price']) * d['quantity']).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+    return {
+        'trade': d['trade'], 'buy_price': d['buy_price'], 'sell_price': d['sell_price'], 'quantity': d['quantity'],
+        'is_ai_correct': net >= 0, **pl_fields(net),  # same flags as the admin transactions page
+        'created_by': user, 'updated_by': user,
+    }
+
 
 @login_required
 @require_http_methods(["POST"])
 def transactions_create_api(request):
-    # Expect standard form-encoded body; if JSON, parse accordingly
-    form = TradeTransactionForm(request.POST)
+    # form-encoded body: trade, buy_price, sell_price, quantity
+    form = _fill_form(request.POST)
     if form.is_valid():
-        obj = form.save(commit=False)
-        obj.created_by = request.user
-        obj.updated_by = request.user
-        obj.save()
+        obj = TradeTransaction.objects.create(**_fill_values(form, request.user))
+        return JsonResponse({'id': obj.id}, status=201)
+    return JsonResponse({'errors': form.errors}, status=400)
+
+
+# Async variants (api/async/...): same responses, async ORM, per-user concurrency limit (trades/throttle.py)
+
+@require_http_methods(["GET"])
+@cached_by_day(_range_dates)
+@limit_per_user
+async def trade_news_api_async(request):
+    return await akeyset_response(request, _news_qs(*_range_dates(request)), NEWS_ORDER)
+
+
+@login_required
+@require_http_methods(["GET"])
+@limit_per_user
+async def transactions_list_api_async(request):
+    user = await request.auser()
+    return await akeyset_response(request, _fills_qs(user, *_range_dates(request)), FILLS_ORDER)
+
+
+@login_required
+@require_http_methods(["POST"])
+@limit_per_user
+async def transactions_create_api_async(request):
+    form = _fill_form(request.POST)
+    if await sync_to_async(form.is_valid)():  # the trade choice is checked with a query
+        obj = await TradeTransaction.objects.acreate(**_fill_values(form, await request.auser()))
         return JsonResponse({'id': obj.id}, status=201)
-    return JsonResponse({'errors': form.errors}, status=400)
\ No newline at end of file
+    return JsonResponse({'errors': form.errors}, status=400)
+
+
+@login_required
+@require_http_methods(["GET"])
+def accuracy_api(request):
+    # ?start=&end= (default: last 90 days), ?by=stock|strike plus day|week|month|year, comma separated
+    fmt = '%Y-%m-%d'
+    s = request.GET.get('start'); e = request.GET.get('end')
+    try:
+        end = datetime.strptime(e, fmt).date() if e else timezone.localdate()
+        start = datetime.strptime(s, fmt).date() if s else end - timedelta(days=89)
+        groups = parse_groups(request.GET.get('by'))
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    return JsonResponse({'start': start, 'end': end, **accuracy_stats(request.user, start, end, groups)})
+
+
+@login_required
+@require_http_methods(["POST"])
+def news_edit_api(request):
+    # JSON body {"changes": [{"id", "news_catalyst_summary", "version"}, ...]}: only the edited rows, each with
+    # the version it was read at (api/trade-news/ returns it); all or nothing, 409 with current rows on conflict
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Staff only'}, status=403)
+    try:
+        body = json.loads(request.body or b'{}')
+        edits = parse_edits(body.get('changes') if isinstance(body, dict) else None)
+    except ValueError as exc:  # bad JSON or malformed changes
+        return JsonResponse({'error': str(exc)}, status=400)
+    try:
+        versions = apply_news_edits(edits)
+    except NewsConflict as exc:
+        return JsonResponse({'error': str(exc), 'conflicts': exc.conflicts, 'duplicate': exc.duplicate}, status=409)
+    return JsonResponse({'updated': [{'id': pk, 'version': v} for pk, v in versions.items()]})
+
+
+SEARCH_PAGE_SIZE = 50
+
+
+@require_http_methods(["GET"])
+def plan_search_api(request):
+    # ?q=earnings rbi (every word must match, stemmed), optional ?start=&end= created_at days;
+    # best match first, {"results": [...], "next": token|null}, pass ?cursor=<next> for more
+    q = request.GET.get('q', '').strip()
+    if not q:
+        return JsonResponse({'error': 'q is required'}, status=400)
+    fmt = '%Y-%m-%d'
+    s = request.GET.get('start'); e = request.GET.get('end'); token = request.GET.get('cursor')
+    try:
+        start = datetime.strptime(s, fmt).date() if s else None
+        end = datetime.strptime(e, fmt).date() if e else None
+        offset = decode_offset(token) if token else 0
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    limit = min(page_size({'limit': request.GET.get('limit') or SEARCH_PAGE_SIZE}), 500)
+    hits, more = search_plans(q, start, end, limit=limit, offset=offset)
+    return JsonResponse({'results': hits, 'next': encode_cursor([offset + limit]) if more else None})
+
+
+@login_required
+@require_http_methods(["GET"])
+def export_parquet_api(request, dataset):
+    # ?start=&end= created_at days, ?since=<ISO datetime> only rows updated after it;
+    # transactions are the caller's own (every trader is staff here) unless superuser
+    if dataset not in DATASETS:
+        return JsonResponse({'error': f'Unknown dataset: {dataset}'}, status=404)
+    fmt = '%Y-%m-%d'
+    s = request.GET.get('start'); e = request.GET.get('end'); since = request.GET.get('since')
+    try:
+        start = datetime.strptime(s, fmt).date() if s else None
+        end = datetime.strptime(e, fmt).date() if e else None
+        since = datetime.fromisoformat(since) if since else None
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    if since is not None and timezone.is_naive(since):
+        since = timezone.make_aware(since)
+    user = None if request.user.is_superuser else request.user
+    qs = dataset_queryset(dataset, since=since, user=user, start=start, end=end)
+    try:
+        chunks = stream_parquet(dataset, qs)
+        first = next(chunks)  # fail before the response starts if pyarrow is missing
+    except ImportError as exc:
+        return JsonResponse({'error': str(exc)}, status=501)
+    resp = StreamingHttpResponse(itertools.chain([first], chunks), content_type='application/vnd.apache.parquet')
+    resp['Content-Disposition'] = f'attachment; filename="{dataset}.parquet"'
+    return resp